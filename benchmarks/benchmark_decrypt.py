@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Measure the decryption throughput of the Izneo pages.
+
+Usage:
+    python benchmarks/benchmark_decrypt.py [--pages 2000] [--workers N]
+
+The page of `tests/resources/crypted_image.bin` is decrypted `--pages` times,
+with the key and iv decoded for each page (previous behaviour) or once per
+book, then by the page worker pool of the downloads.
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from Crypto.Cipher import AES
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from izneo_get.plugins.izneo import Izneo  # noqa: E402
+from izneo_get.plugins.site_processor import PAGE_WORKERS  # noqa: E402
+
+KEY = "0t3WeNQ1HrrxJKo8qNTQQg=="
+IV = "YQqHDniN+GSVSga02sekIA=="
+
+
+def decrypt_per_page(content: bytes) -> bytes:
+    aes = AES.new(base64.b64decode(KEY), AES.MODE_CBC, base64.b64decode(IV))
+    return aes.decrypt(content)
+
+
+def measure(name: str, decrypt: Callable[[bytes], bytes], content: bytes, nb_pages: int, workers: int) -> None:
+    started = time.perf_counter()
+    if workers == 1:
+        for _ in range(nb_pages):
+            decrypt(content)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(decrypt, [content] * nb_pages))
+    pages_per_sec = nb_pages / (time.perf_counter() - started)
+    print(f"{name:30} {workers:3} threads {pages_per_sec:10.0f} pages/s {pages_per_sec / workers:10.0f} pages/s/thread")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000, help="Number of pages to decrypt")
+    parser.add_argument("--workers", type=int, default=PAGE_WORKERS, help="Number of threads of the pool")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, "tests", "resources", "crypted_image.bin"), "rb") as f:
+        content = f.read()
+    key, iv = base64.b64decode(KEY), base64.b64decode(IV)
+    print(f"Page of {len(content) / 1024:.0f} KiB, {os.cpu_count()} CPUs")
+    measure("key decoded for each page", decrypt_per_page, content, args.pages, 1)
+    measure("key decoded once", lambda page: Izneo.decrypt_page(page, key, iv), content, args.pages, 1)
+    measure("key decoded once", lambda page: Izneo.decrypt_page(page, key, iv), content, args.pages, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Compare the HTTP/1.1 (requests) and HTTP/2 (httpx) transports of the page downloads.
+
+Usage:
+    python benchmarks/benchmark_download.py URL [URL ...] [--requests 200] [--concurrency 32]
+
+The URLs are requested in turn, `--concurrency` at a time, through the same
+functions as the page downloads. HTTP/2 needs `pip install izneo-get[http2]`.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import requests
+import urllib3.connectionpool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import http2  # noqa: E402
+from izneo_get.tools import http_get  # noqa: E402
+
+_new_connections = 0
+_new_connections_lock = threading.Lock()
+
+
+def count_connections(pool_class: type) -> None:
+    """Count the connections opened by the `urllib3` pools of `pool_class`."""
+    new_conn = pool_class._new_conn
+
+    def counting_new_conn(pool):
+        global _new_connections
+        with _new_connections_lock:
+            _new_connections += 1
+        return new_conn(pool)
+
+    pool_class._new_conn = counting_new_conn
+
+
+def run(get: Callable[[str], requests.Response], urls: List[str], nb_requests: int, concurrency: int) -> List[float]:
+    def request(index: int) -> float:
+        started = time.perf_counter()
+        response = get(urls[index % len(urls)])
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(request, range(nb_requests)))
+
+
+def report(name: str, latencies: List[float], elapsed: float, connections: int) -> None:
+    latencies = sorted(latencies)
+    print(
+        f"{name:10} {len(latencies) / elapsed:8.1f} req/s"
+        f"   p50 {statistics.median(latencies) * 1000:7.1f} ms"
+        f"   p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms"
+        f"   {connections} connections"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="+", help="URLs of pages to download")
+    parser.add_argument("--requests", type=int, default=200, help="Number of requests per transport")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of simultaneous requests")
+    args = parser.parse_args()
+
+    count_connections(urllib3.connectionpool.HTTPConnectionPool)
+    count_connections(urllib3.connectionpool.HTTPSConnectionPool)
+    session = requests.Session()
+    started = time.perf_counter()
+    latencies = run(lambda url: http_get(url, session), args.urls, args.requests, args.concurrency)
+    report("HTTP/1.1", latencies, time.perf_counter() - started, _new_connections)
+
+    if not http2.is_available():
+        print('HTTP/2     skipped ("httpx[http2]" is not installed)')
+        return
+    started = time.perf_counter()
+    latencies = run(lambda url: http2.http2_get(url, session), args.urls, args.requests, args.concurrency)
+    report("HTTP/2", latencies, time.perf_counter() - started, len(http2.get_client()._transport._pool.connections))
+
+
+if __name__ == "__main__":
+    main()
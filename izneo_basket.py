@@ -6,18 +6,19 @@ Source : https://github.com/izneo-get/izneo-get
 Ce script permet de récupérer une liste d'URLS sur https://www.izneo.com/fr/ en
 fonction d'une page de panier fin.
 
-usage: izneo_basket.py [-h] [--session-id SESSION_ID] [--config CONFIG] url
+usage: izneo_basket.py [-h] [--session-id SESSION_ID] [--config CONFIG] [--workers WORKERS] url [url ...]
 
 Script pour obtenir une liste de BDs Izneo.
 
 positional arguments:
-  url                La page de panier fin qui contient une liste de BDs
+  url                Les pages de panier fin (ou leurs numéros) qui contiennent une liste de BDs ("-" pour l'entrée standard)
 
 options:
   -h, --help            show this help message and exit
   --session-id SESSION_ID, -s SESSION_ID
                         L'identifiant de session
   --config CONFIG       Fichier de configuration
+  --workers WORKERS     Nombre de paniers récupérés simultanément (défaut : 8)
 """
 import requests
 from requests.adapters import HTTPAdapter
@@ -27,15 +28,23 @@ import os
 import sys
 import argparse
 import configparser
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from bs4 import BeautifulSoup
 import json
 
+# Délai (en secondes) entre deux vérifications des paniers terminés, pendant la lecture des suivants.
+POLL_DELAY = 0.1
+
 
 def requests_retry_session(
     retries=3,
     backoff_factor=1,
     status_forcelist=(500, 502, 504),
     session=None,
+    pool_maxsize=10,
 ):
     """Permet de gérer les cas simples de problèmes de connexions."""
     session = session or requests.Session()
@@ -46,29 +55,113 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
 
+def get_basket_id(value):
+    """Permet de récupérer le numéro de commande d'une URL de panier fin (ou d'un numéro seul).
+
+    Parameters
+    ----------
+    value : str
+        L'URL de la page de panier fin ou le numéro de commande.
+
+    Returns
+    -------
+    str
+        Le numéro de commande (vide s'il n'a pas été trouvé).
+    """
+    value = value.strip()
+    if re.match(r"^\d+$", value):
+        return value
+    if res := re.match(r"^http[s]?://www.izneo.com/[a-z]{2}/panier-fin/(\d+)", value):
+        return res[1]
+    return ""
+
+
 def parse_from_id(session, id):
+    """Permet de récupérer la liste des liens des BDs d'un panier.
+
+    Returns
+    -------
+    list
+        La liste des liens (vide en cas d'erreur).
+    """
     url = f"https://www.izneo.com/fr/api/web/purchase-complete-details/{id}"
-    r = requests_retry_session(session=session).get(url, allow_redirects=True)
+    r = session.get(url, allow_redirects=True)
     content = json.loads(r.text)
-    new_results = 0
+    links = []
 
     if 'error' in content:
-        print(f'Error: {content["error"]}')
-        return 0
+        print(f'Error: {content["error"]}', file=sys.stderr)
+        return links
 
     for vol in content["albums"]:
         link = root_path + vol["url"]
         title = vol["title"]
         if title and link:
-            print(link)
-            new_results += 1
-    return new_results
+            links.append(link)
+    return links
+
+
+def iter_basket_ids(values):
+    """Permet de lire les numéros de commande, sans doublon, au fur et à mesure.
+
+    L'entrée standard ("-") est lue ligne par ligne : un panier est traité sans attendre la fin de l'entrée.
+    """
+    seen = set()
+    for value in values:
+        for line in sys.stdin if value == "-" else [value]:
+            for url in line.split():
+                id = get_basket_id(url)
+                if not id:
+                    print(f'Error: "{url}" n\'est pas une page de panier fin', file=sys.stderr)
+                elif id not in seen:
+                    seen.add(id)
+                    yield id
+
+
+def parse_from_ids(session, ids, workers=8):
+    """Permet de récupérer les liens des BDs de plusieurs paniers en parallèle.
+
+    Les paniers sont demandés dès qu'ils arrivent dans `ids` (au plus `workers` à la fois).
+    Les liens sont renvoyés dans l'ordre des paniers, au fur et à mesure, sans doublon.
+    """
+    seen = set()
+    new_ids = queue.Queue()
+    end = object()
+
+    def read_ids():
+        # `ids` peut attendre l'entrée standard : il est lu à part pour renvoyer les liens déjà obtenus.
+        for id in ids:
+            new_ids.put(id)
+        new_ids.put(end)
+
+    threading.Thread(target=read_ids, daemon=True).start()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        reading = True
+        while reading or pending:
+            while pending and pending[0].done():
+                for link in pending.popleft().result():
+                    if link not in seen:
+                        seen.add(link)
+                        yield link
+            if not reading or len(pending) >= workers:
+                if pending:
+                    wait([pending[0]])
+                continue
+            try:
+                id = new_ids.get(timeout=POLL_DELAY if pending else None)
+            except queue.Empty:
+                continue
+            if id is end:
+                reading = False
+            else:
+                pending.append(executor.submit(parse_from_id, session, id))
 
 
 if __name__ == "__main__":
@@ -77,9 +170,17 @@ if __name__ == "__main__":
 
     # Parse des arguments passés en ligne de commande.
     parser = argparse.ArgumentParser(description="""Script pour obtenir une liste de BDs Izneo.""")
-    parser.add_argument("url", type=str, default=None, help="La page de panier qui contient une liste de BDs")
+    parser.add_argument(
+        "url",
+        type=str,
+        nargs="+",
+        help="Les pages de panier (ou leurs numéros) qui contiennent une liste de BDs (\"-\" pour l'entrée standard)",
+    )
     parser.add_argument("--session-id", "-s", type=str, default=None, help="L'identifiant de session")
     parser.add_argument("--config", type=str, default=None, help="Fichier de configuration")
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Nombre de paniers récupérés simultanément (défaut : 8)"
+    )
     args = parser.parse_args()
 
     # Lecture de la config.
@@ -99,7 +200,6 @@ if __name__ == "__main__":
             return cli_value
 
     session_id = get_param_or_default(config, "session_id", "", args.session_id)
-    url = args.url
 
     # Création d'une session et création du cookie.
     s = requests.Session()
@@ -109,11 +209,8 @@ if __name__ == "__main__":
         domain=".izneo.com", name="c03aab1711dbd2a02ea11200dde3e3d1", value=session_id
     )
     s.cookies.set_cookie(cookie_obj)
+    workers = max(1, args.workers)
+    s = requests_retry_session(session=s, pool_maxsize=workers)
 
-    if re.match(r"^http[s]://www.izneo.com/fr/panier-fin/(\d+)", url):
-        # On est dans un cas où on a une URL de panier.
-        id = re.findall(r"(\d+)/", url)
-        if not id:
-            id = re.findall(r"(\d+)", url)
-        id = id[0]
-        parse_from_id(s, id)
+    for link in parse_from_ids(s, iter_basket_ids(args.url), workers):
+        print(link, flush=True)
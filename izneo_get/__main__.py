@@ -11,7 +11,13 @@ import os
 import re
 import shutil
 import sys
-from typing import List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from types import ModuleType
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from requests import Session
 
 from .action import Action
 from .action_from_query import ActionQuery
@@ -19,11 +25,15 @@ from .config import Config, ImageFormat, OutputFormat
 from .config_from_args import get_args
 from .config_from_file import get_config_from_file
 from .config_from_query import ConfigQuery
+from .job_queue import CONVERTING, DONE, DOWNLOADING, FAILED, METADATA, PACKING, BookJob, JobQueue
+from .listing import expand_listing_sources, is_listing_source
 from .no_plugin_found_exception import NoPluginFOundException
+from .plugins.izneo import Izneo
 from .plugins.site_processor import SiteProcessor
-from .tools import check_version, convert_images_in_folder, create_cbz
-
-# from .plugins.izneo import Izneo  # Force import for PyInstaller
+from .sharding import LeaseQueue, get_shard, parse_shard
+from .tools import DEFAULT_TIMEOUT, check_version, convert_images_in_folder, create_cbz, iterate_in_background
+from .watch import FolderWatcher
+from .watermark import Watermark
 
 CONFIG_FILE = "izneo_get.cfg"
 
@@ -37,14 +47,32 @@ def get_config(args_config: Config, config_file: Optional[str]) -> Config:
     return get_config_from_file(CONFIG_FILE if os.path.exists(CONFIG_FILE) else "", args_config)
 
 
-def action_infos_and_download(url: str, config: Config, do_download: bool, forced_title: str = "") -> str:
+def action_infos_and_download(
+    url: str,
+    config: Config,
+    do_download: bool,
+    forced_title: str = "",
+    priority: int = 0,
+    job: Optional[BookJob] = None,
+) -> str:
     processor = get_site_processor(url=url, config=config)
     if not processor:
         raise NoPluginFOundException(f'No plugin found for "{url}".')
+    processor.priority = priority
+    processor.job = job
+    if job:
+        job.set_stage(METADATA)
     processor.authenticate()
     infos = processor.get_book_infos()
     print(infos)
-    return processor.download(forced_title) if do_download else ""
+    if not do_download:
+        return ""
+    if job:
+        job.set_stage(DOWNLOADING)
+    save_path = processor.download(forced_title)
+    if job and save_path:
+        job.set_stage(CONVERTING, save_path)
+    return save_path
 
 
 def main() -> None:
@@ -52,7 +80,7 @@ def main() -> None:
     is_command_line = False
     args_config, action, url, config_file = get_args()
     config = get_config(args_config, config_file)
-    if not url:
+    if not url and not config.watch_folder:
         is_command_line = True
         config_query = ConfigQuery(config, CONFIG_FILE)
         config = config_query.update_config_by_command()
@@ -61,75 +89,316 @@ def main() -> None:
             return
 
     input_prompt = "Folder: " if action in [Action.CONVERT, Action.PACK] else "URL: "
-    while not url:
+    while not url and not config.watch_folder:
         url = input(input_prompt)
 
     # List of all URLs to process.
-    url_list = get_all_urls(url)
+    watermark = None
+    watcher: Optional[FolderWatcher] = None
+    if config.watch_folder:
+        # The lists dropped in the folder are processed as they arrive, until the script is stopped.
+        watcher = FolderWatcher(
+            config.watch_folder,
+            partial(get_watched_urls, config=config),
+            config.cache_folder,
+        )
+        url_list: Iterable[Tuple[str, str]] = watcher
+    else:
+        url_list = get_all_urls(url, config)
+    if action in [Action.INFOS, Action.DOWNLOAD, Action.PROCESS]:
+        # Lists of books are fetched in background while the first books are downloaded.
+        # With "sync", only the albums unknown from the previous runs are listed.
+        watermark = Watermark(config.cache_folder) if config.sync else None
+        timeout = (
+            config.connect_timeout_sec or DEFAULT_TIMEOUT[0],
+            config.read_timeout_sec or DEFAULT_TIMEOUT[1],
+        )
+        url_list = iterate_in_background(
+            expand_listing_sources(
+                url_list, lambda: get_listing_session(config), bool(config.full_only), watermark, timeout
+            )
+        )
 
-    for url, forced_title in url_list:
-        if url[0] == '"' and url[-1] == '"':
-            url = url[1:-1]
-        print(f"Processing {url}")
-        # print("Download started")
-        result = ""
-        save_path = url
-        if action in [Action.INFOS, Action.DOWNLOAD, Action.PROCESS]:
-            do_download = action in [Action.DOWNLOAD, Action.PROCESS]
-            try:
-                save_path = action_infos_and_download(url, config, do_download, forced_title)
-            except NoPluginFOundException as e:
-                print(e)
-                continue
-            if do_download and not save_path:
-                print("WARNING: Nothing was downloaded.")
-                continue
-        result = save_path
-        # print("Download completed")
+    # The same book may come from several URLs (or from a list and a series).
+    # A book which failed is removed from `seen_books`, to be processed again if it comes back.
+    seen_books: Set[str] = set()
+    url_list = iter_unique_books(url_list, config, seen_books)
 
-        # If needed, we convert the images.
-        if action in [Action.CONVERT, Action.PROCESS] and (
-            config.image_format and config.image_format != ImageFormat.ORIGIN
-        ):
-            if os.path.isdir(save_path):
-                convert_images_in_folder(save_path, config.image_format, config.image_quality)
-            else:
-                print(f'ERROR: "{save_path}" is not a folder.')
-
-        # If needed, we create an archive.
-        if action in [Action.PACK, Action.PROCESS] and config.output_format in [
-            OutputFormat.CBZ,
-            OutputFormat.BOTH,
-        ]:
-            if os.path.isdir(save_path):
-                expected_cbz_name = f"{save_path}.cbz"
-                if config.continue_from_existing and os.path.exists(expected_cbz_name):
-                    print(f'File "{expected_cbz_name}" already exists.')
-                else:
-                    create_cbz(save_path)
-                result = expected_cbz_name
-                # If needed, we delete the folder.
-                if config.output_format == OutputFormat.CBZ:
-                    shutil.rmtree(save_path)
-            else:
-                print(f'ERROR: "{save_path}" is not a folder.')
+    # Part of the list processed by this node, with "shard" and "lease_folder".
+    try:
+        shard = parse_shard(config.shard) if config.shard else None
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    leases = LeaseQueue(config.lease_folder) if config.lease_folder else None
+    selected: Optional[Callable[[str], bool]] = None
+    if shard or leases:
+        selected = partial(is_selected, config=config, shard=shard, leases=leases)
 
-            # if action in [Action.DOWNLOAD, Action.CONVERT, Action.PACK, Action.PROCESS]:
-            #     print(f'{url} processed as "{result}"')
+    # With "job_queue", the progress of each book is saved to resume the run if it is interrupted.
+    job_queue = JobQueue(config.cache_folder) if config.job_queue else None
+    if selected and not job_queue:
+        # With the job queue, the books are selected once those already done are skipped (see `JobQueue.iter_jobs`).
+        url_list = ((url, forced_title) for url, forced_title in url_list if selected(unquote_url(url)))
+    # The books of the synced lists and of the watched folder are known once done, not when they are listed.
+    watermarks = [book_watermark for book_watermark in [watermark, watcher and watcher.watermark] if book_watermark]
+    for url, save_path, job in iter_books(url_list, config, action, job_queue, selected):
+        # print("Download started")
+        if save_path is None:
+            if job:
+                job.set_stage(FAILED, error="No plugin found.")
+            if leases:
+                leases.release(get_book_key(url, config), done=False)
+            seen_books.discard(get_book_key(url, config))
+            continue
+        if action in [Action.DOWNLOAD, Action.PROCESS] and not save_path:
+            print("WARNING: Nothing was downloaded.")
+            if job:
+                job.set_stage(FAILED, error="Nothing was downloaded.")
+            if leases:
+                leases.release(get_book_key(url, config), done=False)
+            seen_books.discard(get_book_key(url, config))
+            continue
+        # print("Download completed")
+        process_book(save_path, config, action, job)
+        if job:
+            job.set_stage(DONE)
+        if leases:
+            leases.release(get_book_key(url, config), done=True)
+        for book_watermark in watermarks:
+            # Only the books done are skipped by the next syncs (or when their list is dropped again).
+            book_watermark.complete(url)
+        # if action in [Action.DOWNLOAD, Action.CONVERT, Action.PACK, Action.PROCESS]:
+        #     print(f'{url} processed as "{result}"')
+    if job_queue:
+        job_queue.close()
+    if leases:
+        leases.close()
 
     print("Done!")
     if is_command_line:
         input("Press [ENTER] to exit...")
 
 
-def get_all_urls(url: str) -> List[Tuple[str, str]]:
-    return get_urls_from_file(url) if os.path.exists(url) and os.path.isfile(url) else [(url, "")]
+def process_book(save_path: str, config: Config, action: Action, job: Optional[BookJob] = None) -> str:
+    """Convert and pack a downloaded book, as needed by `action`, and return the path of the result.
+
+    With `job`, the stage of the book is saved, and the conversion is not done
+    again if a previous run was interrupted while packing the book.
+    """
+    result = save_path
+    packing_resumed = job is not None and job.stage == PACKING
+    # If needed, we convert the images.
+    if (
+        not packing_resumed
+        and action in [Action.CONVERT, Action.PROCESS]
+        and (config.image_format and config.image_format != ImageFormat.ORIGIN)
+    ):
+        if job:
+            job.set_stage(CONVERTING, save_path)
+        if os.path.isdir(save_path):
+            convert_images_in_folder(save_path, config.image_format, config.image_quality)
+        else:
+            print(f'ERROR: "{save_path}" is not a folder.')
+
+    # If needed, we create an archive.
+    if action in [Action.PACK, Action.PROCESS] and config.output_format in [
+        OutputFormat.CBZ,
+        OutputFormat.BOTH,
+    ]:
+        if job:
+            job.set_stage(PACKING, save_path)
+        expected_cbz_name = f"{save_path}.cbz"
+        if packing_resumed and not os.path.isdir(save_path) and os.path.exists(expected_cbz_name):
+            # Interrupted after the folder was deleted.
+            return expected_cbz_name
+        if os.path.isdir(save_path):
+            if packing_resumed and os.path.exists(f"{save_path}.zip"):
+                # Archive left incomplete by the interrupted run.
+                os.remove(f"{save_path}.zip")
+            # The CBZ is renamed once complete: if it exists, the interrupted run only had to delete the folder.
+            if (config.continue_from_existing or packing_resumed) and os.path.exists(expected_cbz_name):
+                print(f'File "{expected_cbz_name}" already exists.')
+            else:
+                create_cbz(save_path)
+            result = expected_cbz_name
+            # If needed, we delete the folder.
+            if config.output_format == OutputFormat.CBZ:
+                shutil.rmtree(save_path)
+        else:
+            print(f'ERROR: "{save_path}" is not a folder.')
+    return result
+
+
+def iter_books(
+    url_list: Iterable[Tuple[str, str]],
+    config: Config,
+    action: Action,
+    job_queue: Optional[JobQueue] = None,
+    selected: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[str, Optional[str], Optional[BookJob]]]:
+    """Yield the URL, the path and the persistent job (with `job_queue`) of each book, in the order of `url_list`.
+
+    With `books_ahead`, the next books are downloaded in background while the
+    current one is converted and packed. Their pages only get the connections
+    left free by the books before them, so the books are completed in order.
+    The path is None if no plugin handles the URL.
+    With `job_queue`, the books left unfinished by the previous runs are resumed
+    (if they are `selected` for this node) and the books already done are skipped.
+    """
+    books = iter_jobs(url_list, action, job_queue, selected)
+    if action not in [Action.INFOS, Action.DOWNLOAD, Action.PROCESS]:
+        for url, _, job in books:
+            print(f"Processing {url}")
+            yield url, url, job
+        return
+
+    do_download = action in [Action.DOWNLOAD, Action.PROCESS]
+    books_ahead = (config.books_ahead or 0) if do_download else 0
+    if not books_ahead:
+        for rank, (url, forced_title, job) in enumerate(books):
+            print(f"Processing {url}")
+            yield url, get_book(url, config, do_download, forced_title, rank, job), job
+        return
+
+    with ThreadPoolExecutor(max_workers=books_ahead + 1) as executor:
+        pending: Deque[Tuple[str, Future, Optional[BookJob]]] = deque()
+        for rank, (url, forced_title, job) in enumerate(books):
+            print(f"Processing {url}")
+            pending.append((url, executor.submit(get_book, url, config, do_download, forced_title, rank, job), job))
+            if len(pending) > books_ahead:
+                url, book, job = pending.popleft()
+                yield url, book.result(), job
+        while pending:
+            url, book, job = pending.popleft()
+            yield url, book.result(), job
+
+
+def iter_jobs(
+    url_list: Iterable[Tuple[str, str]],
+    action: Action,
+    job_queue: Optional[JobQueue] = None,
+    selected: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[str, str, Optional[BookJob]]]:
+    """Yield the URL, the forced title and the persistent job (with `job_queue`) of each book."""
+    books = ((unquote_url(url), forced_title) for url, forced_title in url_list)
+    if job_queue is None:
+        for url, forced_title in books:
+            yield url, forced_title, None
+        return
+    for job in job_queue.iter_jobs(books, action, selected):
+        yield job.url, job.forced_title, job
+
+
+def get_book(
+    url: str, config: Config, do_download: bool, forced_title: str, rank: int, job: Optional[BookJob] = None
+) -> Optional[str]:
+    if job and job.stage in [CONVERTING, PACKING]:
+        # Downloaded by a previous run.
+        return job.save_path
+    try:
+        return action_infos_and_download(url, config, do_download, forced_title, rank, job)
+    except NoPluginFOundException as e:
+        print(e)
+        return None
+
+
+def is_selected(
+    url: str, config: Config, shard: Optional[Tuple[int, int]] = None, leases: Optional[LeaseQueue] = None
+) -> bool:
+    """Return True if the book is in the `shard` of this node and if the node could claim it in `leases`."""
+    book_key = get_book_key(url, config)
+    if shard and get_shard(book_key, shard[1]) != shard[0]:
+        return False
+    if leases and not leases.claim(book_key):
+        print(f'"{url}" is done or processed by another node, skipping.')
+        return False
+    return True
+
+
+def get_book_key(url: str, config: Config) -> str:
+    """Return the canonical key of the book of `url` (the URL itself for a list of books)."""
+    if is_listing_source(url):
+        return f"list:{url.strip()}"
+    processor = get_site_processor(url=url, config=config)
+    return processor.get_book_key() if processor else url
+
+
+def has_credentials(url: str, config: Config) -> bool:
+    processor = get_site_processor(url=url, config=config)
+    return bool(processor and processor.has_credentials())
+
+
+def dedupe_books(url_list: Iterable[Tuple[str, str]], config: Config) -> List[Tuple[str, str]]:
+    """Keep one URL per book, at the place of its first occurrence.
+
+    The URL kept is the first one with credentials (signed URL) if any, and
+    the forced title the first one given.
+    """
+    books: Dict[str, Tuple[str, str]] = {}
+    nb_duplicates = 0
+    for url, forced_title in url_list:
+        book_key = get_book_key(unquote_url(url), config)
+        if book_key not in books:
+            books[book_key] = (url, forced_title)
+            continue
+        nb_duplicates += 1
+        kept_url, kept_title = books[book_key]
+        if not has_credentials(unquote_url(kept_url), config) and has_credentials(unquote_url(url), config):
+            kept_url = url
+        books[book_key] = (kept_url, kept_title or forced_title)
+    if nb_duplicates:
+        print(f"INFO: {nb_duplicates} duplicate URLs ignored.")
+    return list(books.values())
+
+
+def iter_unique_books(
+    url_list: Iterable[Tuple[str, str]], config: Config, seen: Optional[Set[str]] = None
+) -> Iterator[Tuple[str, str]]:
+    """Yield the books of `url_list` as they come, skipping the books already yielded.
+
+    The keys of the books yielded are added to `seen`: a key removed from it is yielded again.
+    """
+    seen = set() if seen is None else seen
+    for url, forced_title in url_list:
+        book_key = get_book_key(unquote_url(url), config)
+        if book_key in seen:
+            print(f'"{url}" is a duplicate, skipping.')
+            continue
+        seen.add(book_key)
+        yield url, forced_title
+
+
+def unquote_url(url: str) -> str:
+    return url[1:-1] if url[0] == '"' and url[-1] == '"' else url
+
 
+def get_all_urls(url: str, config: Optional[Config] = None) -> Iterable[Tuple[str, str]]:
+    if url == "-":
+        # URLs are read from the standard input as they come.
+        return iter_urls_from_lines(sys.stdin)
+    return get_urls_from_file(url, config=config) if os.path.exists(url) and os.path.isfile(url) else [(url, "")]
 
-def get_urls_from_file(url: str, encoding: str = "utf-8") -> List[tuple[str, str]]:
-    url_list: List[tuple[str, str]] = []
+
+def get_listing_session(config: Config) -> Session:
+    processor = Izneo(config=config)
+    processor.authenticate()
+    return processor.session
+
+
+def get_urls_from_file(url: str, encoding: str = "utf-8", config: Optional[Config] = None) -> List[tuple[str, str]]:
     with open(url, "r", encoding=encoding) as f:
         lines = f.readlines()
+    # The whole list is known: the duplicates are removed before any request.
+    return dedupe_books(iter_urls_from_lines(lines), config or Config())
+
+
+def get_watched_urls(lines: Iterable[str], config: Config) -> List[Tuple[str, str]]:
+    """Return the books of a list dropped in the watched folder, with the URLs given as when they are done."""
+    return [(unquote_url(url), forced_title) for url, forced_title in dedupe_books(iter_urls_from_lines(lines), config)]
+
+
+def iter_urls_from_lines(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
     next_forced_title = ""
     for line in lines:
         line = line.strip()
@@ -141,18 +410,24 @@ def get_urls_from_file(url: str, encoding: str = "utf-8") -> List[tuple[str, str
         if res:
             next_forced_title = res
         if line and line[0] != "#":
-            url_list.append((line, next_forced_title))
+            yield line, next_forced_title
             next_forced_title = ""
-    return url_list
 
 
-def get_site_processor(url: str, config: Config) -> Optional[SiteProcessor]:
-    parser = None
-    # Load all modules in the plugin directory.
-    for module in os.listdir(f"{os.path.dirname(__file__)}/plugins"):
+@lru_cache(maxsize=None)
+def get_plugin_modules() -> List[ModuleType]:
+    """Load all modules in the plugin directory (once)."""
+    modules = []
+    for module in sorted(os.listdir(f"{os.path.dirname(__file__)}/plugins")):
         if module == "__init__.py" or module[-3:] != ".py":
             continue
-        module = importlib.import_module(f"izneo_get.plugins.{module[:-3]}")
+        modules.append(importlib.import_module(f"izneo_get.plugins.{module[:-3]}"))
+    return modules
+
+
+def get_site_processor(url: str, config: Config) -> Optional[SiteProcessor]:
+    parser = None
+    for module in get_plugin_modules():
         parser = module.init(url, config)
         if parser.is_valid_url(url):
             return parser
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Adaptive limit on the number of concurrent requests sent to a host.
+
+The limit follows an AIMD (additive increase, multiplicative decrease) scheme:
+it grows by about one request per round trip while responses are fast and
+successful, and is cut on throttling signals (429, 5xx, `Retry-After`,
+timeouts). Controllers are shared by all the downloads of the run, one per host.
+Waiting requests get the free slots by priority (e.g. book rank, then page
+number), so that books are completed one after the other.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+INITIAL_LIMIT = 4.0
+MIN_LIMIT = 1.0
+MAX_LIMIT = 32.0  # Default size of the thread pool used by `asyncio.to_thread`.
+DECREASE_FACTOR = 0.5
+LATENCY_TOLERANCE = 2.0  # Above this factor of the best latency, the limit stops growing.
+LATENCY_FLOOR = 0.1  # Latencies below this value (in seconds) are always considered healthy.
+LATENCY_SMOOTHING = 0.2
+THROTTLE_STATUS = {429, 502, 503, 504}
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit, usable from several threads and event loops."""
+
+    def __init__(
+        self,
+        initial: float = INITIAL_LIMIT,
+        minimum: float = MIN_LIMIT,
+        maximum: float = MAX_LIMIT,
+        decrease_factor: float = DECREASE_FACTOR,
+        latency_tolerance: float = LATENCY_TOLERANCE,
+    ) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.latency: Optional[float] = None  # Smoothed latency.
+        self.best_latency: Optional[float] = None
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+        # Heap of (priority, arrival order, loop, future) of the waiting requests.
+        self._waiters: List[Tuple[Tuple[int, ...], int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+    def slot(self, priority: Tuple[int, ...] = ()) -> "RequestSlot":
+        """Reserve a slot for one request: `async with controller.slot() as slot: ...; slot.record(response)`.
+
+        Args:
+            priority (Tuple[int, ...]): lowest priorities get the free slots first.
+        """
+        return RequestSlot(self, priority)
+
+    async def acquire(self, priority: Tuple[int, ...] = ()) -> float:
+        """Wait for a free slot and return the time at which it was obtained."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                delay = self.blocked_until - time.monotonic()
+                # A free slot is left to the waiting requests which come first.
+                if delay <= 0 and self.in_flight < int(self.limit) and not self._has_waiter_before(priority):
+                    self.in_flight += 1
+                    return time.monotonic()
+                waiter = None
+                if delay <= 0:
+                    waiter = loop.create_future()
+                    heapq.heappush(self._waiters, (priority, next(self._arrivals), loop, waiter))
+            if waiter is None:
+                await asyncio.sleep(delay)
+                continue
+            # The slot may have been freed before the waiter was queued.
+            self._wake()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    self._waiters = [item for item in self._waiters if item[3] is not waiter]
+                    heapq.heapify(self._waiters)
+                # The wake up may have been meant for this waiter.
+                self._wake()
+                raise
+
+    def release(self, started: float, response: Optional[requests.Response] = None, error: bool = False) -> None:
+        """Free a slot and adapt the limit to the outcome of the request.
+
+        Args:
+            started (float): value returned by `acquire`.
+            response (Optional[requests.Response]): the response, if any.
+            error (bool): the request failed with a timeout or a connection error.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            retry_after = get_retry_after(response) if response is not None else None
+            if error or retry_after is not None or (response is not None and response.status_code in THROTTLE_STATUS):
+                self._decrease(started, now, retry_after)
+            elif response is not None:
+                self._increase(now - started)
+        self._wake()
+
+    def _increase(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else self.latency + LATENCY_SMOOTHING * (latency - self.latency)
+        self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+        if self.latency > max(self.best_latency * self.latency_tolerance, LATENCY_FLOOR):
+            return
+        # About one more request for each window of successful requests.
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def _decrease(self, started: float, now: float, retry_after: Optional[float]) -> None:
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        # Requests sent before the last cut were already accounted for.
+        if started < self.last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self.last_decrease = now
+
+    def _has_waiter_before(self, priority: Tuple[int, ...]) -> bool:
+        return bool(self._waiters) and self._waiters[0][0] < priority
+
+    def _wake(self) -> None:
+        with self._lock:
+            free = int(self.limit) - self.in_flight
+            waiters = [heapq.heappop(self._waiters) for _ in range(min(max(free, 0), len(self._waiters)))]
+        for _, _, loop, waiter in waiters:
+            loop.call_soon_threadsafe(_set_done, waiter)
+
+
+class RequestSlot:
+    """Async context manager holding one slot of an `AdaptiveConcurrency`."""
+
+    def __init__(self, controller: AdaptiveConcurrency, priority: Tuple[int, ...] = ()) -> None:
+        self.controller = controller
+        self.priority = priority
+        self.started = 0.0
+        self.response: Optional[requests.Response] = None
+
+    def record(self, response: requests.Response) -> None:
+        self.response = response
+
+    async def __aenter__(self) -> "RequestSlot":
+        self.started = await self.controller.acquire(self.priority)
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        error = exc_type is not None and issubclass(exc_type, (requests.Timeout, requests.ConnectionError))
+        self.controller.release(self.started, self.response, error)
+
+
+def _set_done(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def get_retry_after(response: requests.Response) -> Optional[float]:
+    """Return the delay (in seconds) asked by the `Retry-After` header of `response`, if any."""
+    value = (getattr(response, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_controllers: Dict[str, AdaptiveConcurrency] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(url: str) -> AdaptiveConcurrency:
+    """Return the controller of the host of `url`, created at first use and kept for the run."""
+    host = urlparse(url).netloc
+    with _controllers_lock:
+        if host not in _controllers:
+            _controllers[host] = AdaptiveConcurrency()
+        return _controllers[host]
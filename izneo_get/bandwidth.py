@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Global limit of the download bandwidth, shared by all the pages and books."""
+import threading
+import time
+from typing import Optional
+
+CHUNK_SIZE = 64 * 1024  # Size of the chunks read from the responses.
+
+
+class TokenBucket:
+    """Byte rate limit, usable from several threads.
+
+    Every reader takes the bytes it received from the bucket and sleeps if
+    the bucket is empty, so the total rate stays below `rate` bytes per second
+    (after an initial burst of `burst` bytes).
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nb_bytes: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # The bytes are already received: the bucket can go into debt, later readers will wait.
+            self.tokens -= nb_bytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class ThroughputMeter:
+    """Number of bytes received since the meter was started."""
+
+    def __init__(self) -> None:
+        self.nb_bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, nb_bytes: int) -> None:
+        with self._lock:
+            self.nb_bytes += nb_bytes
+
+    def get_rate(self) -> float:
+        """Average throughput (in bytes per second)."""
+        elapsed = time.monotonic() - self.started
+        return self.nb_bytes / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.nb_bytes / 1024 / 1024:.1f} MiB at {self.get_rate() / 1024 / 1024:.2f} MiB/s"
+
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def get_bandwidth_limiter(limit_kib: Optional[int]) -> Optional[TokenBucket]:
+    """Return the limiter shared by the whole run for `limit_kib` KiB/s (None if unlimited)."""
+    global _limiter
+    if not limit_kib:
+        return None
+    with _limiter_lock:
+        if _limiter is None or _limiter.rate != limit_kib * 1024:
+            _limiter = TokenBucket(limit_kib * 1024)
+        return _limiter
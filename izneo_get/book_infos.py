@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, Optional, Sequence, Union, overload
 
 
 class ReadDirection(Enum):
@@ -8,6 +8,72 @@ class ReadDirection(Enum):
     RTOL = 2
 
 
+class PageUrls(Sequence[str]):
+    """URLs of the pages of a book, generated on demand.
+
+    The URL of a page is `prefix + item + suffix`, `item` being the page index,
+    or `items[index]` when the pages have their own path (e.g. archive.org).
+    """
+
+    __slots__ = ("prefix", "suffix", "items", "start", "count")
+
+    def __init__(
+        self,
+        prefix: str = "",
+        suffix: str = "",
+        count: int = 0,
+        items: Optional[Sequence[str]] = None,
+        start: int = 0,
+    ) -> None:
+        self.prefix = prefix
+        self.suffix = suffix
+        self.items = items
+        self.start = start
+        self.count = len(items) if items is not None else count
+
+    def __len__(self) -> int:
+        return self.count
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "PageUrls": ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, "PageUrls"]:
+        if isinstance(index, slice):
+            pages = range(self.count)[index]
+            if pages.step != 1:
+                raise ValueError("Only contiguous slices of pages are supported.")
+            if self.items is not None:
+                return PageUrls(self.prefix, self.suffix, items=self.items[index])
+            return PageUrls(self.prefix, self.suffix, count=len(pages), start=self.start + pages.start)
+        page = range(self.count)[index]  # Raises IndexError, handles negative indexes.
+        item = self.items[page] if self.items is not None else self.start + page
+        return f"{self.prefix}{item}{self.suffix}"
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[page] for page in range(self.count))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str) or len(other) != len(self):
+            return False
+        return all(url == other_url for url, other_url in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"PageUrls({self.count} pages: {self[0] if self.count else ''}...)"
+
+
+@dataclass(slots=True)
+class PageKey:
+    """Decoded AES key and iv of an encrypted page."""
+
+    key: bytes
+    iv: bytes
+
+
 @dataclass
 class BookInfos:
     title: str
@@ -24,7 +90,7 @@ class BookInfos:
     description: str = ""
     publisher: str = ""
     read_direction: ReadDirection = ReadDirection.LTOR
-    page_urls: List[str] = field(default_factory=list)
+    page_urls: Sequence[str] = field(default_factory=list)
     custom_fields: Optional[Dict[str, Any]] = None
 
     def __str__(self) -> str:
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Stop downloading a book when the server keeps refusing its pages.
+
+An expired session or a preview-only book makes every remaining page fail
+with 401/403/404 (or a redirection loop to the login page). After a few
+consecutive failures of that kind, the circuit of the book opens: the
+pending pages are cancelled and the download either resumes with a renewed
+session or stops right away.
+"""
+
+AUTH_FAILURE_STATUS = {401, 403, 404}
+FAILURE_THRESHOLD = 5  # Number of consecutive refused pages opening the circuit.
+
+
+class CircuitOpen(Exception):
+    """Raised by a page download once the circuit of its book is open."""
+
+
+class CircuitBreaker:
+    """Count of consecutive refused pages of one book."""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.failures = 0
+        self.is_open = False
+        self.reauthenticated = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Count a refused page and raise `CircuitOpen` when the threshold is reached."""
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.is_open = True
+        if self.is_open:
+            raise CircuitOpen(f"{self.failures} pages refused in a row")
+
+    def reset(self) -> None:
+        self.failures = 0
+        self.is_open = False
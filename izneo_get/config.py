@@ -58,6 +58,18 @@ class Config:
     continue_from_existing: Optional[bool] = False
     authentication_from_cache: Optional[bool] = True
     cache_folder: Optional[str] = ".cache"
+    full_only: Optional[bool] = False
+    sync: Optional[bool] = False
+    connect_timeout_sec: Optional[float] = 10
+    read_timeout_sec: Optional[float] = 60
+    book_deadline_sec: Optional[int] = 0
+    bandwidth_limit: Optional[int] = 0  # In KiB/s, 0 = unlimited.
+    books_ahead: Optional[int] = 0  # Number of books downloaded in advance.
+    http2: Optional[bool] = False
+    job_queue: Optional[bool] = False  # Progress of the books saved in the cache folder, to resume a run.
+    shard: Optional[str] = ""  # "i/n": part of the list processed by this node.
+    lease_folder: Optional[str] = ""  # Folder shared by the nodes to claim the books.
+    watch_folder: Optional[str] = ""  # Folder where the URL lists to process are dropped.
 
     def to_dict(self):
         value: Dict[str, Any] = {key: str(val) for key, val in self.__dict__.items() if val is not None}
@@ -19,7 +19,8 @@ def get_args() -> tuple[Config, Action, str, str]:
         type=str,
         default=None,
         nargs="?",
-        help="L'URL de la BD à récupérer ou le chemin vers un fichier local contenant une liste d'URLs",
+        help="L'URL de la BD à récupérer, le chemin vers un fichier local contenant une liste d'URLs "
+        "ou une liste de BDs (bibliothèque, série, panier ou \"search:texte\")",
     )
     parser.add_argument("--config", type=str, default=None, help="Fichier de configuration")
     # parser.add_argument("--session-id", "-s", type=str, default=None, help="L'identifiant de session")
@@ -78,6 +79,83 @@ def get_args() -> tuple[Config, Action, str, str]:
         default=None,
         help="Pour ne pas utiliser le cache de session",
     )
+    parser.add_argument(
+        "--full-only",
+        action="store_true",
+        dest="full_only",
+        default=None,
+        help="Ne prend que les BDs disponibles dans l'abonnement (pour les listes de séries)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        dest="sync",
+        default=None,
+        help="Pour les listes de BDs, ne prend que les albums nouveaux depuis la dernière synchronisation",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=None,
+        help="Temps maximum (en secondes) pour établir une connexion (défaut : 10)",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=None,
+        help="Temps maximum (en secondes) d'attente d'une réponse (défaut : 60)",
+    )
+    parser.add_argument(
+        "--book-deadline",
+        type=int,
+        default=None,
+        help="Temps maximum (en secondes) de téléchargement d'une BD (0 = illimité)",
+    )
+    parser.add_argument(
+        "--bandwidth-limit",
+        type=int,
+        default=None,
+        help="Débit maximum de téléchargement (en Kio/s), partagé par toutes les pages (0 = illimité)",
+    )
+    parser.add_argument(
+        "--books-ahead",
+        type=int,
+        default=None,
+        help="Nombre de BDs téléchargées à l'avance pendant le traitement de la BD en cours (défaut : 0)",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        dest="http2",
+        default=None,
+        help="Télécharge les pages en HTTP/2 (nécessite izneo-get[http2])",
+    )
+    parser.add_argument(
+        "--job-queue",
+        action="store_true",
+        dest="job_queue",
+        default=None,
+        help="Enregistre l'avancement de chaque BD dans le cache pour reprendre une liste interrompue",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        help="Ne traite que la part i/n des BDs de la liste (ex. : 1/3), répartie selon l'identifiant des BDs",
+    )
+    parser.add_argument(
+        "--lease-folder",
+        type=str,
+        default=None,
+        help="Répertoire partagé dans lequel plusieurs machines réservent les BDs à traiter",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        dest="watch_folder",
+        default=None,
+        help="Répertoire surveillé : les listes d'URLs qui y sont déposées sont traitées à leur arrivée",
+    )
     parsed = parser.parse_args()
     # Si on n'a pas mis d'action valide, on considère que c'est une URL.
     if parsed.action is not None and parsed.action.lower() not in action_choices:
@@ -96,5 +174,17 @@ def get_args() -> tuple[Config, Action, str, str]:
         user_agent=parsed.user_agent,
         continue_from_existing=parsed.continue_from_existing,
         authentication_from_cache=False if parsed.ignore_cache == True else None,
+        full_only=parsed.full_only,
+        sync=parsed.sync,
+        connect_timeout_sec=parsed.connect_timeout,
+        read_timeout_sec=parsed.read_timeout,
+        book_deadline_sec=parsed.book_deadline,
+        bandwidth_limit=parsed.bandwidth_limit,
+        books_ahead=parsed.books_ahead,
+        http2=parsed.http2,
+        job_queue=parsed.job_queue,
+        shard=parsed.shard,
+        lease_folder=parsed.lease_folder,
+        watch_folder=parsed.watch_folder,
     )
     return config, action, parsed.url, parsed.config
@@ -87,6 +87,112 @@ def get_config_from_file(config_file: str, args_config: Optional[Config] = None)
         "yes",
         "y",
     }
+    full_only = get_param_or_default(
+        config,
+        "full_only",
+        default_config.full_only,
+        args_config.full_only if args_config else None,
+    )
+    full_only = str(full_only).lower() in {
+        "true",
+        "1",
+        "yes",
+        "y",
+    }
+    sync = get_param_or_default(
+        config,
+        "sync",
+        default_config.sync,
+        args_config.sync if args_config else None,
+    )
+    sync = str(sync).lower() in {
+        "true",
+        "1",
+        "yes",
+        "y",
+    }
+    connect_timeout_sec = float(
+        get_param_or_default(
+            config,
+            "connect_timeout_sec",
+            default_config.connect_timeout_sec,
+            args_config.connect_timeout_sec if args_config else None,
+        )
+    )
+    read_timeout_sec = float(
+        get_param_or_default(
+            config,
+            "read_timeout_sec",
+            default_config.read_timeout_sec,
+            args_config.read_timeout_sec if args_config else None,
+        )
+    )
+    book_deadline_sec = int(
+        get_param_or_default(
+            config,
+            "book_deadline_sec",
+            default_config.book_deadline_sec,
+            args_config.book_deadline_sec if args_config else None,
+        )
+    )
+    bandwidth_limit = int(
+        get_param_or_default(
+            config,
+            "bandwidth_limit",
+            default_config.bandwidth_limit,
+            args_config.bandwidth_limit if args_config else None,
+        )
+    )
+    books_ahead = int(
+        get_param_or_default(
+            config,
+            "books_ahead",
+            default_config.books_ahead,
+            args_config.books_ahead if args_config else None,
+        )
+    )
+    http2 = get_param_or_default(
+        config,
+        "http2",
+        default_config.http2,
+        args_config.http2 if args_config else None,
+    )
+    http2 = str(http2).lower() in {
+        "true",
+        "1",
+        "yes",
+        "y",
+    }
+    job_queue = get_param_or_default(
+        config,
+        "job_queue",
+        default_config.job_queue,
+        args_config.job_queue if args_config else None,
+    )
+    job_queue = str(job_queue).lower() in {
+        "true",
+        "1",
+        "yes",
+        "y",
+    }
+    shard = get_param_or_default(
+        config,
+        "shard",
+        default_config.shard,
+        args_config.shard if args_config else None,
+    )
+    lease_folder = get_param_or_default(
+        config,
+        "lease_folder",
+        default_config.lease_folder,
+        args_config.lease_folder if args_config else None,
+    )
+    watch_folder = get_param_or_default(
+        config,
+        "watch_folder",
+        default_config.watch_folder,
+        args_config.watch_folder if args_config else None,
+    )
 
     # session_id = get_param_or_default(config, "session_id", "", args_config.session_id)
     # nb_page_limit = args_config.limit
@@ -108,4 +214,16 @@ def get_config_from_file(config_file: str, args_config: Optional[Config] = None)
         user_agent=user_agent,
         continue_from_existing=continue_from_existing,
         authentication_from_cache=authentication_from_cache,
+        full_only=full_only,
+        sync=sync,
+        connect_timeout_sec=connect_timeout_sec,
+        read_timeout_sec=read_timeout_sec,
+        book_deadline_sec=book_deadline_sec,
+        bandwidth_limit=bandwidth_limit,
+        books_ahead=books_ahead,
+        http2=http2,
+        job_queue=job_queue,
+        shard=shard,
+        lease_folder=lease_folder,
+        watch_folder=watch_folder,
     )
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""AES decryption of the pages, through a single crypto library.
+
+Izneo pages use AES-CBC and obfuscated archive.org pages use AES-CTR. Both
+are available from `cryptography` and from `pycryptodome`; only the backend
+in use is imported, at first use. The backend is the one chosen by the last
+benchmark (`python -m izneo_get.crypto --benchmark`, saved in the cache
+folder), or the first installed one.
+"""
+import argparse
+import json
+from abc import ABC, abstractmethod
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .config import Config
+
+BACKENDS = ["cryptography", "pycryptodome"]  # Default order.
+CACHE_FILE = "crypto.json"
+CBC_PAGE_SIZE = 512 * 1024  # Size of the pages of the benchmark.
+CTR_FRAGMENT_SIZE = 1024  # Size of the encrypted fragment of the obfuscated archive.org pages.
+
+
+class CryptoBackend(ABC):
+    """AES decryption with one crypto library, imported when the backend is created."""
+
+    name: str = ""
+
+    def decrypt_cbc(self, data: bytes, key: bytes, iv: bytes) -> bytearray:
+        """AES-CBC decryption (without padding) of `data`, into a new buffer."""
+        decrypted = bytearray(len(data))
+        self.decrypt_cbc_into(data, key, iv, decrypted)
+        return decrypted
+
+    def decrypt_ctr(self, data: bytes, key: bytes, counter: bytes) -> bytearray:
+        """AES-CTR decryption of `data`, `counter` being the initial 128-bit counter block."""
+        decrypted = bytearray(len(data))
+        self.decrypt_ctr_into(data, key, counter, decrypted)
+        return decrypted
+
+    @abstractmethod
+    def decrypt_cbc_into(self, data: bytes, key: bytes, iv: bytes, out: bytearray) -> None:
+        """AES-CBC decryption of `data` into the first `len(data)` bytes of `out` (which may be `data` itself)."""
+
+    @abstractmethod
+    def decrypt_ctr_into(self, data: bytes, key: bytes, counter: bytes, out: bytearray) -> None:
+        """AES-CTR decryption of `data` into the first `len(data)` bytes of `out` (which may be `data` itself)."""
+
+
+class CryptographyBackend(CryptoBackend):
+    name = "cryptography"
+
+    def __init__(self) -> None:
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        self._cipher = lambda key, mode: Cipher(algorithms.AES(key), mode)
+        self._modes = modes
+
+    def decrypt_cbc_into(self, data: bytes, key: bytes, iv: bytes, out: bytearray) -> None:
+        self._update_into(self._cipher(key, self._modes.CBC(iv)).decryptor(), data, out)
+
+    def decrypt_ctr_into(self, data: bytes, key: bytes, counter: bytes, out: bytearray) -> None:
+        self._update_into(self._cipher(key, self._modes.CTR(counter)).decryptor(), data, out)
+
+    @staticmethod
+    def _update_into(decryptor, data: bytes, out: bytearray) -> None:
+        # `update_into` wants 15 spare bytes after the output: the last block goes through a small buffer.
+        data, out = memoryview(data), memoryview(out)
+        head_size = max(len(data) - 16, 0)
+        written = decryptor.update_into(data[:head_size], out) if head_size else 0
+        tail = bytearray(len(data) - head_size + 15)
+        tail_size = decryptor.update_into(data[head_size:], tail)
+        out[written : written + tail_size] = tail[:tail_size]
+        decryptor.finalize()
+
+
+class PycryptodomeBackend(CryptoBackend):
+    name = "pycryptodome"
+
+    def __init__(self) -> None:
+        from Crypto.Cipher import AES
+
+        self._aes = AES
+
+    def decrypt_cbc_into(self, data: bytes, key: bytes, iv: bytes, out: bytearray) -> None:
+        self._aes.new(key, self._aes.MODE_CBC, iv).decrypt(data, output=memoryview(out)[: len(data)])
+
+    def decrypt_ctr_into(self, data: bytes, key: bytes, counter: bytes, out: bytearray) -> None:
+        if len(counter) != 16:
+            raise ValueError(f"Invalid counter length: {len(counter)} bytes (expected 16).")
+        cipher = self._aes.new(key, self._aes.MODE_CTR, nonce=b"", initial_value=counter)
+        cipher.decrypt(data, output=memoryview(out)[: len(data)])
+
+
+BACKEND_CLASSES: Dict[str, Callable[[], CryptoBackend]] = {
+    CryptographyBackend.name: CryptographyBackend,
+    PycryptodomeBackend.name: PycryptodomeBackend,
+}
+
+_backend: Optional[CryptoBackend] = None
+_backend_lock = threading.Lock()
+
+
+def load_backend(name: str) -> Optional[CryptoBackend]:
+    """Return the backend `name`, or None if its library is not installed."""
+    try:
+        return BACKEND_CLASSES[name]()
+    except (ImportError, KeyError):
+        return None
+
+
+def get_backend(cache_folder: Optional[str] = None) -> CryptoBackend:
+    """Return the backend of the run, chosen at first call (benchmarked one first, then default order)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            for name in [read_benchmarked_backend(cache_folder), *BACKENDS]:
+                if name and (backend := load_backend(name)):
+                    _backend = backend
+                    break
+            else:
+                raise ImportError(f"No crypto library found, install one of: {', '.join(BACKENDS)}.")
+        return _backend
+
+
+def decrypt_cbc(data: bytes, key: bytes, iv: bytes) -> bytes:
+    return get_backend().decrypt_cbc(data, key, iv)
+
+
+def decrypt_ctr(data: bytes, key: bytes, counter: bytes) -> bytes:
+    return get_backend().decrypt_ctr(data, key, counter)
+
+
+def get_cache_path(cache_folder: Optional[str] = None) -> str:
+    if cache_folder is None:
+        cache_folder = Config().cache_folder
+    return f"{cache_folder or '.'}/{CACHE_FILE}"
+
+
+def read_benchmarked_backend(cache_folder: Optional[str] = None) -> str:
+    cache_path = get_cache_path(cache_folder)
+    if not os.path.exists(cache_path):
+        return ""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("backend", "")
+    except (OSError, ValueError, AttributeError):
+        return ""
+
+
+def benchmark(names: Optional[List[str]] = None, duration: float = 1.0) -> Dict[str, Dict[str, float]]:
+    """Measure the decryption throughput of the installed backends.
+
+    Returns:
+        Dict[str, Dict[str, float]]: for each backend, "cbc" in MiB/s (Izneo pages)
+            and "ctr" in pages/s (1 KiB fragments of archive.org pages).
+    """
+    key, iv = os.urandom(16), os.urandom(16)
+    page = os.urandom(CBC_PAGE_SIZE)
+    fragment = os.urandom(CTR_FRAGMENT_SIZE)
+    results = {}
+    for name in names or BACKENDS:
+        backend = load_backend(name)
+        if backend is None:
+            continue
+        nb_pages = _measure(lambda: backend.decrypt_cbc(page, key, iv), duration)
+        nb_fragments = _measure(lambda: backend.decrypt_ctr(fragment, key, iv), duration)
+        results[name] = {"cbc": nb_pages * CBC_PAGE_SIZE / 1024 / 1024, "ctr": nb_fragments}
+    return results
+
+
+def _measure(function: Callable[[], object], duration: float) -> float:
+    """Return the number of calls of `function` per second."""
+    count = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < duration:
+        function()
+        count += 1
+    return count / elapsed
+
+
+def get_fastest_backend(results: Dict[str, Dict[str, float]]) -> str:
+    """Return the backend with the best throughput, relative to the best one on each mode."""
+    best_cbc = max(result["cbc"] for result in results.values())
+    best_ctr = max(result["ctr"] for result in results.values())
+    return max(results, key=lambda name: results[name]["cbc"] / best_cbc + results[name]["ctr"] / best_ctr)
+
+
+def save_benchmarked_backend(
+    backend: str, results: Dict[str, Dict[str, float]], cache_folder: Optional[str] = None
+) -> None:
+    cache_path = get_cache_path(cache_folder)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump({"backend": backend, "results": results}, f, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backend de déchiffrement des pages")
+    parser.add_argument(
+        "--benchmark", action="store_true", help="Mesure les backends disponibles et enregistre le plus rapide"
+    )
+    parser.add_argument("--cache-folder", type=str, default=None, help="Répertoire du cache (défaut : .cache)")
+    parser.add_argument("--duration", type=float, default=1.0, help="Durée (en secondes) de chaque mesure")
+    args = parser.parse_args()
+    if not args.benchmark:
+        print(f"Backend: {get_backend(args.cache_folder).name}")
+        return
+    results = benchmark(duration=args.duration)
+    if not results:
+        print(f"ERROR: No crypto library found, install one of: {', '.join(BACKENDS)}.")
+        return
+    for name, result in results.items():
+        print(f"{name:15} AES-CBC {result['cbc']:8.1f} MiB/s   AES-CTR {result['ctr']:10.0f} fragments/s")
+    fastest = get_fastest_backend(results)
+    save_benchmarked_backend(fastest, results, args.cache_folder)
+    print(f'Backend "{fastest}" saved in "{get_cache_path(args.cache_folder)}"')
+
+
+if __name__ == "__main__":
+    main()
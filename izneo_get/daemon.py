@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""Long-running mode: books are processed as jobs submitted through a local HTTP API.
+
+    python -m izneo_get.daemon [--config izneo_get.cfg] [--port 8765 | --socket izneo_get.sock] [--workers 1]
+
+The interpreter, the imports and the configuration stay loaded between jobs,
+and the version check is done once.
+
+API (JSON, on 127.0.0.1 or on a Unix socket):
+    POST /jobs              {"url": "...", "action": "process", "title": "", "config": {"image_format": "webp"}}
+    GET  /jobs              all the jobs
+    GET  /jobs/<id>         one job
+    GET  /events?since=<n>  NDJSON stream of the events: job updates and lines printed by the jobs
+                            (add "&follow=false" to get the past events only)
+"""
+import argparse
+import dataclasses
+import io
+import itertools
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, get_args, get_type_hints
+from urllib.parse import parse_qs, urlparse
+
+from .__main__ import __version__, action_infos_and_download, get_config, process_book
+from .action import Action
+from .config import Config, ImageFormat, OutputFormat
+from .tools import check_version
+
+DEFAULT_PORT = 8765
+MAX_EVENTS = 10000  # Events kept for the clients which connect later.
+EVENTS_TIMEOUT = 15  # Delay (in seconds) between two heartbeats of the event stream.
+
+
+@dataclass
+class Job:
+    id: int
+    url: str
+    action: Action
+    config: Config
+    title: str = ""
+    status: str = "queued"  # queued, running, done or failed.
+    result: str = ""
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "url": self.url,
+            "action": self.action.name.lower(),
+            "title": self.title,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+def run_job(job: Job) -> str:
+    """Process the book of `job` and return the path of the result."""
+    if job.action not in [Action.INFOS, Action.DOWNLOAD, Action.PROCESS]:
+        return process_book(job.url, job.config, job.action)
+    do_download = job.action in [Action.DOWNLOAD, Action.PROCESS]
+    # The first jobs get their pages first.
+    save_path = action_infos_and_download(job.url, job.config, do_download, job.title, priority=job.id)
+    if not do_download:
+        return ""
+    if not save_path:
+        raise RuntimeError("Nothing was downloaded.")
+    return process_book(save_path, job.config, job.action)
+
+
+def get_job_config(config: Config, overrides: Dict[str, Any]) -> Config:
+    """Return `config` with the values of `overrides` (names of the fields of `Config`)."""
+    if not isinstance(overrides, dict):
+        raise ValueError('"config" must be an object.')
+    unknown = set(overrides) - {config_field.name for config_field in dataclasses.fields(Config)}
+    if unknown:
+        raise ValueError(f"Unknown config options: {', '.join(sorted(unknown))}")
+    field_types = get_type_hints(Config)
+    values = {name: get_config_value(name, value, field_types[name]) for name, value in overrides.items()}
+    return dataclasses.replace(config, **values)
+
+
+def get_config_value(name: str, value: Any, field_type: Any) -> Any:
+    """Return `value` as the type of the field `name` of `Config` (raises `ValueError` if it is not of that type)."""
+    # The fields are all `Optional[...]`, but None would only make the job fail later.
+    value_type = next(arg for arg in get_args(field_type) or [field_type] if arg is not type(None))
+    if value_type in [ImageFormat, OutputFormat]:
+        result = value_type.from_str(value) if isinstance(value, str) else None
+        if result is None:
+            choices = ", ".join(member.value.lower() for member in value_type)
+            raise ValueError(f'"{name}" must be one of: {choices}.')
+        return result
+    # A JSON boolean is also a Python int, and a JSON integer is a valid float.
+    valid = isinstance(value, value_type) and not (value_type is int and isinstance(value, bool))
+    if value_type is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if not valid:
+        raise ValueError(f'"{name}" must be a {value_type.__name__}, not {json.dumps(value)}.')
+    return value
+
+
+class JobManager:
+    """Queue of the jobs, processed by worker threads, and log of their events."""
+
+    def __init__(self, config: Config, workers: int = 1, run: Callable[[Job], str] = run_job) -> None:
+        self.config = config
+        self.workers = workers
+        self.run = run
+        self._jobs: Dict[int, Job] = {}
+        self._queue: "queue.Queue[Job]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=MAX_EVENTS)
+        self._event_ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def start(self) -> None:
+        for _ in range(self.workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        """Queue the job described by `payload` (raises `ValueError` if it is invalid)."""
+        if not isinstance(payload, dict) or not isinstance(payload.get("url"), str) or not payload["url"]:
+            raise ValueError('"url" is missing.')
+        action = payload.get("action") or "process"
+        if not isinstance(action, str) or action.upper() not in Action.__members__:
+            raise ValueError(f'Unknown action "{action}".')
+        job = Job(
+            id=next(self._ids),
+            url=payload["url"],
+            action=Action.from_str(action),
+            config=get_job_config(self.config, payload.get("config") or {}),
+            title=payload.get("title") or "",
+        )
+        with self._condition:
+            self._jobs[job.id] = job
+        self.add_event("job", job=job.to_dict())
+        self._queue.put(job)
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def get_jobs(self) -> List[Job]:
+        with self._condition:
+            return list(self._jobs.values())
+
+    def get_current_job(self) -> Optional[Job]:
+        """Return the job processed by the current thread, if any."""
+        return getattr(self._local, "job", None)
+
+    def add_event(self, event_type: str, **values: Any) -> None:
+        with self._condition:
+            self._events.append({"id": next(self._event_ids), "type": event_type, "time": time.time(), **values})
+            self._condition.notify_all()
+
+    def get_events(self, since: int = 0, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return the events after the event `since`, waiting up to `timeout` seconds for new ones."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._events and self._events[-1]["id"] > since, timeout=timeout)
+            return [event for event in self._events if event["id"] > since]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            self._local.job = job
+            job.status = "running"
+            job.started = time.time()
+            self.add_event("job", job=job.to_dict())
+            try:
+                job.result = self.run(job) or ""
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e) or e.__class__.__name__
+                job.status = "failed"
+            finally:
+                self._local.job = None
+                job.finished = time.time()
+                self.add_event("job", job=job.to_dict())
+
+
+class JobOutput(io.TextIOBase):
+    """Standard output which also sends the lines printed by the jobs as events."""
+
+    def __init__(self, manager: JobManager, stream: Any) -> None:
+        self.manager = manager
+        self.stream = stream
+        self._local = threading.local()
+
+    def write(self, text: str) -> int:
+        self.stream.write(text)
+        job = self.manager.get_current_job()
+        if job is None:
+            return len(text)
+        lines = (getattr(self._local, "buffer", "") + text).split("\n")
+        self._local.buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.manager.add_event("log", job_id=job.id, message=line)
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    manager: JobManager
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["jobs"]:
+            return self._send_json(200, [job.to_dict() for job in self.manager.get_jobs()])
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.manager.get_job(int(parts[1])) if parts[1].isdigit() else None
+            if job is None:
+                return self._send_json(404, {"error": f"Unknown job {parts[1]}."})
+            return self._send_json(200, job.to_dict())
+        if parts == ["events"]:
+            query = parse_qs(url.query)
+            since = int(query.get("since", ["0"])[0] or 0)
+            follow = query.get("follow", ["true"])[0].lower() not in {"false", "0", "no"}
+            return self._stream_events(since, follow)
+        self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self) -> None:
+        if urlparse(self.path).path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found."})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            job = self.manager.submit(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(201, job.to_dict())
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_events(self, since: int, follow: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                events = self.manager.get_events(since, timeout=EVENTS_TIMEOUT if follow else 0)
+                for event in events:
+                    self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+                    since = event["id"]
+                if not follow:
+                    return
+                if not events:
+                    # Heartbeat, to detect the disconnected clients.
+                    self.wfile.write(json.dumps({"type": "ping", "time": time.time()}).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def address_string(self) -> str:
+        # Unix sockets have no client address.
+        return str(self.client_address[0]) if self.client_address else "local"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        ...
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def create_server(manager: JobManager, port: int = DEFAULT_PORT, socket_path: str = "") -> socketserver.BaseServer:
+    """Create the HTTP server of the API, on 127.0.0.1:`port` or on the Unix socket `socket_path`."""
+    handler = type("Handler", (JobRequestHandler,), {"manager": manager})
+    if socket_path:
+        if not hasattr(socketserver, "UnixStreamServer"):
+            raise ValueError("Unix sockets are not available on this system.")
+        if os.path.exists(socket_path):
+            # Left by a daemon which was killed.
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Service de téléchargement de BDs, piloté par une API HTTP locale.")
+    parser.add_argument("--config", type=str, default=None, help="Fichier de configuration")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"Port d'écoute sur 127.0.0.1 (défaut : {DEFAULT_PORT})"
+    )
+    parser.add_argument("--socket", type=str, default="", help="Socket Unix à utiliser à la place du port")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de BDs traitées simultanément (défaut : 1)")
+    args = parser.parse_args()
+
+    check_version(__version__)
+    # Options which are not set in the file keep their default values.
+    config = get_config(Config(**{config_field.name: None for config_field in dataclasses.fields(Config)}), args.config)
+    manager = JobManager(config, max(1, args.workers))
+    sys.stdout = JobOutput(manager, sys.stdout)
+    # Jobs can't ask questions.
+    sys.stdin = io.StringIO()
+    server = create_server(manager, args.port, args.socket)
+    manager.start()
+    print(f"Listening on {args.socket or f'http://127.0.0.1:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Optional HTTP/2 transport of the page downloads.
+
+With `httpx[http2]` installed (`pip install izneo-get[http2]`), the page
+requests to a host are multiplexed over a few shared connections instead of
+one HTTP/1.1 connection per request in flight. Responses are converted to
+`requests.Response`, so the rest of the download code does not depend on the
+transport.
+"""
+import asyncio
+import threading
+from typing import Any, Optional, Tuple, Union
+
+import requests
+from requests import Session
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .bandwidth import CHUNK_SIZE, TokenBucket
+from .tools import DEFAULT_TIMEOUT
+
+try:
+    import h2  # noqa: F401 (needed by httpx for HTTP/2)
+    import httpx
+except ImportError:
+    httpx = None
+
+MAX_CONNECTIONS = 8  # Connections of the client, for all the hosts.
+RETRIES = 3  # Retries of the failed connections.
+# Connection-specific headers, forbidden in HTTP/2.
+HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade", "host"}
+
+_client: Optional["httpx.Client"] = None
+_client_lock = threading.Lock()
+_warned = False
+
+
+def is_available() -> bool:
+    return httpx is not None
+
+
+def use_http2(requested: Optional[bool]) -> bool:
+    """Return True if HTTP/2 is requested and available (with a warning, once, if it is not)."""
+    global _warned
+    if not requested:
+        return False
+    if not is_available():
+        if not _warned:
+            print('WARNING: HTTP/2 needs "httpx[http2]" (pip install izneo-get[http2]), using HTTP/1.1.')
+            _warned = True
+        return False
+    return True
+
+
+def get_client() -> "httpx.Client":
+    """Return the HTTP/2 client shared by the whole run."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                follow_redirects=True,
+                transport=httpx.HTTPTransport(
+                    http2=True, retries=RETRIES, limits=httpx.Limits(max_connections=MAX_CONNECTIONS)
+                ),
+            )
+        return _client
+
+
+def http2_get(
+    url: str,
+    session: Optional[Session] = None,
+    headers: Optional[Any] = None,
+    bandwidth: Optional[TokenBucket] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> requests.Response:
+    """GET request over HTTP/2, with the headers and cookies of `session`.
+
+    Errors are raised as the matching `requests` exceptions.
+    """
+    # The session gives its headers, cookies and authentication, as with `requests`.
+    prepared = (session or Session()).prepare_request(requests.Request("GET", url, headers=headers))
+    request_headers = {key: value for key, value in prepared.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS}
+    connect_timeout, read_timeout = timeout
+    try:
+        with get_client().stream(
+            "GET",
+            prepared.url or url,
+            headers=request_headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        ) as response:
+            content = bytearray()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                if bandwidth is not None:
+                    bandwidth.consume(len(chunk))
+                content += chunk
+    except httpx.TooManyRedirects as e:
+        raise requests.TooManyRedirects(e) from e
+    except httpx.TimeoutException as e:
+        raise requests.Timeout(e) from e
+    except httpx.TransportError as e:
+        raise requests.ConnectionError(e) from e
+    # The body is left mutable, to avoid copying the page again.
+    return to_requests_response(response, content)
+
+
+async def async_http2_get(
+    url: str,
+    session: Optional[Session] = None,
+    headers: Optional[Any] = None,
+    bandwidth: Optional[TokenBucket] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> requests.Response:
+    return await asyncio.to_thread(http2_get, url, session, headers, bandwidth, timeout)
+
+
+def to_requests_response(response: "httpx.Response", content: Union[bytes, bytearray]) -> requests.Response:
+    result = requests.Response()
+    result.status_code = response.status_code
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.url = str(response.url)
+    result.reason = response.reason_phrase
+    result.encoding = get_encoding_from_headers(result.headers)
+    result._content = content
+    return result
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Persistent queue of the books of a run, to resume it after a crash.
+
+Each book goes through the stages queued, metadata, downloading, converting,
+packing and done (or failed). The stage of each book and the pages already
+written are saved in a SQLite database of the cache folder, so when a list is
+processed again, the books of the list left unfinished are resumed from their
+last stage, and the finished books and stages are not done again. The books
+of the previous runs which are not in the list are left as they are. The metadata of
+a resumed download is fetched again, the page URLs and keys being temporary.
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from .action import Action
+
+QUEUED = "queued"
+METADATA = "metadata"
+DOWNLOADING = "downloading"
+CONVERTING = "converting"  # Pages downloaded, images converted if needed.
+PACKING = "packing"
+DONE = "done"
+FAILED = "failed"
+STAGES = [QUEUED, METADATA, DOWNLOADING, CONVERTING, PACKING, DONE, FAILED]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    action TEXT NOT NULL,
+    forced_title TEXT NOT NULL DEFAULT '',
+    stage TEXT NOT NULL,
+    save_path TEXT NOT NULL DEFAULT '',
+    error TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL,
+    UNIQUE (url, action)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    page INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (book_id, page)
+);
+"""
+COLUMNS = "id, url, action, forced_title, stage, save_path, error"
+
+
+@dataclass
+class BookJob:
+    id: int
+    url: str
+    action: Action
+    forced_title: str = ""
+    stage: str = QUEUED
+    save_path: str = ""
+    error: str = ""
+    queue: Optional["JobQueue"] = field(default=None, repr=False, compare=False)
+
+    def set_stage(self, stage: str, save_path: Optional[str] = None, error: str = "") -> None:
+        self.stage = stage
+        if save_path is not None:
+            self.save_path = save_path
+        self.error = error
+        if self.queue:
+            self.queue.save(self)
+
+    def add_page(self, page: int, path: str) -> None:
+        """Save that `page` is written in `path`."""
+        if self.queue:
+            self.queue.add_page(self.id, page, path)
+
+    def get_pages(self) -> Dict[int, str]:
+        """Return the path of the pages written by the previous runs."""
+        return self.queue.get_pages(self.id) if self.queue else {}
+
+
+class JobQueue:
+    """Books of the runs and their progress, stored in `<cache_folder>/jobs.sqlite`.
+
+    Usable from several threads. Each change is committed at once: the
+    database stays consistent if the process is killed.
+    """
+
+    file_name: str = "jobs.sqlite"
+
+    def __init__(self, cache_folder: Optional[str] = None) -> None:
+        self.path = f"{cache_folder or '.'}/{self.file_name}"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            # With WAL, a commit doesn't wait for the disk (only a power loss can undo the last ones).
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    def add(self, url: str, action: Action, forced_title: str = "") -> BookJob:
+        """Return the job of the book, queued if it is new or if it failed in a previous run."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO books (url, action, forced_title, stage, updated) VALUES (?, ?, ?, ?, ?)",
+                (url, action.value, forced_title, QUEUED, time.time()),
+            )
+            self._connection.execute(
+                "UPDATE books SET stage = ?, forced_title = ?, error = '', updated = ? "
+                "WHERE url = ? AND action = ? AND stage = ?",
+                (QUEUED, forced_title, time.time(), url, action.value, FAILED),
+            )
+            row = self._connection.execute(
+                f"SELECT {COLUMNS} FROM books WHERE url = ? AND action = ?", (url, action.value)
+            ).fetchone()
+        return self._to_job(row)
+
+    def get(self, url: str, action: Action) -> Optional[BookJob]:
+        """Return the job of the book if it was already queued, without queuing it."""
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {COLUMNS} FROM books WHERE url = ? AND action = ?", (url, action.value)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def iter_jobs(
+        self,
+        url_list: Iterable[Tuple[str, str]],
+        action: Action,
+        selected: Optional[Callable[[str], bool]] = None,
+    ) -> Iterator[BookJob]:
+        """Yield the books of `url_list` not done yet, in order, those left unfinished by a previous run resumed.
+
+        The books are resumed or queued only if `selected` accepts their URL. It is called after the books
+        already done are skipped, as it may claim the book for this node.
+        """
+        seen = set()
+        for url, forced_title in url_list:
+            if url in seen:
+                continue
+            seen.add(url)
+            job = self.get(url, action)
+            if job and job.stage == DONE:
+                print(f'"{url}" already processed, skipping.')
+                continue
+            if selected and not selected(url):
+                continue
+            if job and job.stage not in [QUEUED, FAILED]:
+                print(f'Resuming "{url}" ({job.stage})')
+            yield self.add(url, action, forced_title)
+
+    def save(self, job: BookJob) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE books SET stage = ?, save_path = ?, error = ?, updated = ? WHERE id = ?",
+                (job.stage, job.save_path, job.error, time.time(), job.id),
+            )
+
+    def add_page(self, book_id: int, page: int, path: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages (book_id, page, path) VALUES (?, ?, ?)", (book_id, page, path)
+            )
+
+    def get_pages(self, book_id: int) -> Dict[int, str]:
+        with self._lock:
+            rows = self._connection.execute("SELECT page, path FROM pages WHERE book_id = ?", (book_id,)).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _to_job(self, row: Tuple) -> BookJob:
+        job_id, url, action, forced_title, stage, save_path, error = row
+        return BookJob(job_id, url, Action(action), forced_title, stage, save_path, error, queue=self)
@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""Sources of book URLs: library, series, search and basket.
+
+Each source is a generator of `(url, forced_title)` tuples, the same format as
+the one returned by `get_urls_from_file`, so that albums can be downloaded
+while the following listing pages are still being fetched.
+"""
+import json
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from requests import Session
+
+from .tools import DEFAULT_TIMEOUT, iterate_in_background, requests_retry_session, strip_tags
+from .watermark import Watermark
+
+ROOT_PATH = "https://www.izneo.com"
+SEARCH_PREFIX = "search:"
+LIBRARY_KEYWORD = "bibliotheque"
+
+ALBUMS_PER_PAGE = 20  # Number of albums per page of a series.
+LIBRARY_ALBUMS_PER_PAGE = 30  # Number of albums per page of the whole library.
+SHELF_ALBUMS_PER_PAGE = 24  # Number of albums per page of a library shelf.
+SERIES_PER_SEARCH_PAGE = 18  # Number of series per page of search results.
+PREFETCH_PAGES = 2  # Number of pages requested ahead for each series category.
+BASKET_WORKERS = 8  # Number of baskets fetched at the same time.
+BASKET_BATCH_DELAY = 0.5  # Delay (in seconds) after which the baskets read are fetched without waiting for the next.
+
+LIBRARY_DETAIL_PATTERN = r"^https?://www\.izneo\.com/[a-z]{2}/bibliotheque/detail/.+-(\d+)"
+LIBRARY_PATTERN = r"^https?://www\.izneo\.com/[a-z]{2}/bibliotheque/?$"
+BASKET_PATTERN = r"^https?://www\.izneo\.com/[a-z]{2}/panier-fin/(\d+)"
+SERIE_PATTERN = r"^https?://www\.izneo\.com/[a-z]{2}/[^/]+/[^/]+/[^/?#]+-(\d+)/?(\?.*)?$"
+
+
+def is_listing_source(source: str) -> bool:
+    """Tell if `source` designates a list of books rather than a single book."""
+    source = source.strip()
+    return (
+        source.lower() == LIBRARY_KEYWORD
+        or source.lower().startswith(SEARCH_PREFIX)
+        or any(
+            re.match(pattern, source) is not None
+            for pattern in (LIBRARY_DETAIL_PATTERN, LIBRARY_PATTERN, BASKET_PATTERN, SERIE_PATTERN)
+        )
+    )
+
+
+def iter_urls_from_source(
+    source: str,
+    session: Session,
+    full_only: bool = False,
+    watermark: Optional[Watermark] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the book URLs of a listing source.
+
+    Args:
+        source (str): "bibliotheque", "search:<text>" or an izneo library, shelf, basket or series URL.
+        session (Session): authenticated izneo session.
+        full_only (bool): only keep the albums available in the subscription.
+        watermark (Optional[Watermark]): if set, only yield the albums not done by the previous syncs.
+        timeout (Tuple[float, float]): connect and read timeouts of the requests.
+    """
+    source = source.strip()
+    if res := re.match(LIBRARY_DETAIL_PATTERN, source):
+        yield from iter_library(session, res[1], watermark, timeout=timeout)
+    elif source.lower() == LIBRARY_KEYWORD or re.match(LIBRARY_PATTERN, source):
+        yield from iter_library(session, watermark=watermark, timeout=timeout)
+    elif res := re.match(BASKET_PATTERN, source):
+        yield from iter_basket(session, res[1], timeout=timeout)
+    elif res := re.match(SERIE_PATTERN, source):
+        yield from iter_serie(session, res[1], full_only, watermark, timeout=timeout)
+    elif source.lower().startswith(SEARCH_PREFIX):
+        yield from iter_search(session, source[len(SEARCH_PREFIX) :].strip(), full_only, watermark, timeout=timeout)
+
+
+def expand_listing_sources(
+    url_list: Iterable[Tuple[str, str]],
+    get_session: Callable[[], Session],
+    full_only: bool = False,
+    watermark: Optional[Watermark] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Replace every listing source of `url_list` by the books it contains.
+
+    Args:
+        url_list (Iterable[Tuple[str, str]]): `(url, forced_title)` tuples.
+        get_session (Callable[[], Session]): called once, at the first listing source met.
+        full_only (bool): only keep the albums available in the subscription.
+        watermark (Optional[Watermark]): if set, only yield the albums not done by the previous syncs.
+        timeout (Tuple[float, float]): connect and read timeouts of the requests.
+    """
+    session: Optional[Session] = None
+    # Consecutive baskets are fetched together, by batches of `BASKET_WORKERS` at most. A batch is not
+    # held back when the next line is slow to come (standard input): the item is None after the delay.
+    basket_ids: List[str] = []
+    for item in iterate_in_background(url_list, timeout=BASKET_BATCH_DELAY):
+        res = re.match(BASKET_PATTERN, item[0].strip()) if item is not None else None
+        if res:
+            basket_ids.append(res[1])
+            if len(basket_ids) < BASKET_WORKERS:
+                continue
+        if basket_ids:
+            session = session or get_session()
+            yield from iter_baskets(session, basket_ids, timeout=timeout)
+            basket_ids = []
+        if item is None or res:
+            continue
+        url, forced_title = item
+        if is_listing_source(url):
+            session = session or get_session()
+            yield from iter_urls_from_source(url, session, full_only, watermark, timeout)
+        else:
+            yield url, forced_title
+    if basket_ids:
+        yield from iter_baskets(session or get_session(), basket_ids, timeout=timeout)
+
+
+def iter_library(
+    session: Session,
+    library_id: str = "",
+    watermark: Optional[Watermark] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the albums of the library (or of one of its shelves).
+
+    With a watermark, the whole library (sorted by purchase date) is only read
+    until the first page containing an already known album.
+    The albums listed by the previous syncs but not done are yielded at the end.
+    """
+    session = requests_retry_session(session=session)
+    url = f"{ROOT_PATH}/fr/api/web/library-v2/albums/order-date/"
+    items_per_page = LIBRARY_ALBUMS_PER_PAGE
+    source_key = "library"
+    if library_id:
+        url = f"{ROOT_PATH}/fr/api/web/library/{library_id}/albums/last-open/"
+        items_per_page = SHELF_ALBUMS_PER_PAGE
+        source_key = f"library-{library_id}"
+    step = 0
+    expected_albums = 1
+    new_urls = []
+    while step * items_per_page < expected_albums:
+        r = session.post(
+            f"{url}{step * items_per_page}/{items_per_page}", allow_redirects=True, data={"search": ""}, timeout=timeout
+        )
+        data = json.loads(r.text)
+        if "totalAlbums" not in data and "albumsCount" not in data:
+            break
+        expected_albums = data["totalAlbums"] if "totalAlbums" in data else data["albumsCount"]
+        if not data["albums"]:
+            break
+        known_album_found = False
+        for album in data["albums"]:
+            album_id = _get_album_id(album)
+            if watermark and watermark.is_known(source_key, album_id):
+                known_album_found = True
+                continue
+            if album.get("title") and album.get("url"):
+                new_urls.append(_add_pending(watermark, source_key, album))
+                yield new_urls[-1], ""
+        # Shelves are sorted by last opening, not by purchase date: they are always fully read.
+        if known_album_found and not library_id:
+            break
+        step += 1
+    yield from _iter_pending(watermark, source_key, new_urls)
+
+
+def iter_serie(
+    session: Session,
+    serie_id: str,
+    full_only: bool = False,
+    watermark: Optional[Watermark] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the volumes, then the others, then the chapters of a series.
+
+    With a watermark, each category (sorted from the newest) is only read
+    until the first page containing an already known album.
+    The albums listed by the previous syncs but not done are yielded at the end.
+    """
+    session = requests_retry_session(session=session)
+    url_bases = [
+        f"{ROOT_PATH}/fr/api/web/serie/{serie_id}/volumes/new",
+        f"{ROOT_PATH}/fr/api/web/serie/{serie_id}/others/new",
+        f"{ROOT_PATH}/fr/api/web/serie/{serie_id}/chapters/new",
+    ]
+    source_key = f"serie-{serie_id}"
+    is_known = (lambda album: watermark.is_known(source_key, _get_album_id(album))) if watermark else None
+    new_urls = []
+    for album in iter_albums(session, url_bases, is_known=is_known, timeout=timeout):
+        if full_only and not album.get("inSubscription"):
+            continue
+        if album.get("title") and album.get("url"):
+            new_urls.append(_add_pending(watermark, source_key, album))
+            yield new_urls[-1], ""
+    yield from _iter_pending(watermark, source_key, new_urls)
+
+
+def iter_search(
+    session: Session,
+    text: str,
+    full_only: bool = False,
+    watermark: Optional[Watermark] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the albums of all the series matching `text`."""
+    session = requests_retry_session(session=session)
+    step = 0
+    while True:
+        data = {"limit_start": step * SERIES_PER_SEARCH_PAGE, "limit_end": str(SERIES_PER_SEARCH_PAGE), "text": text}
+        r = session.post(f"{ROOT_PATH}/fr/search-series-list", allow_redirects=True, data=data, timeout=timeout)
+        serie_urls = _parse_search_results(r.text.replace("\n", "").replace("\r", ""))
+        if not serie_urls:
+            return
+        for serie_url in serie_urls:
+            if res := re.match(SERIE_PATTERN, serie_url):
+                yield from iter_serie(session, res[1], full_only, watermark, timeout)
+        step += 1
+
+
+def iter_basket(
+    session: Session, basket_id: str, timeout: Tuple[float, float] = DEFAULT_TIMEOUT
+) -> Iterator[Tuple[str, str]]:
+    """Yield the albums bought in a basket ("panier fin" page)."""
+    yield from iter_baskets(session, [basket_id], timeout=timeout)
+
+
+def iter_baskets(
+    session: Session,
+    basket_ids: List[str],
+    workers: int = BASKET_WORKERS,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Tuple[str, str]]:
+    """Yield the albums bought in several baskets, fetched concurrently.
+
+    Albums are yielded in the order of the baskets, each one only once.
+    """
+    session = requests_retry_session(session=session)
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(basket_ids)))) as executor:
+        for album_urls in executor.map(lambda basket_id: _get_basket_albums(session, basket_id, timeout), basket_ids):
+            for album_url in album_urls:
+                if album_url not in seen:
+                    seen.add(album_url)
+                    yield album_url, ""
+
+
+def _get_basket_albums(session: Session, basket_id: str, timeout: Tuple[float, float]) -> List[str]:
+    r = session.get(
+        f"{ROOT_PATH}/fr/api/web/purchase-complete-details/{basket_id}", allow_redirects=True, timeout=timeout
+    )
+    content = json.loads(r.text)
+    if "error" in content:
+        print(f'ERROR: Basket {basket_id}: {content["error"]}')
+        return []
+    return [ROOT_PATH + album["url"] for album in content["albums"] if album.get("title") and album.get("url")]
+
+
+def _get_album_id(album: Dict) -> str:
+    if album.get("id"):
+        return str(album["id"])
+    res = re.search(r"-(\d+)/?$", album.get("url", "").split("?")[0])
+    return res[1] if res else album.get("url", "")
+
+
+def _add_pending(watermark: Optional[Watermark], source_key: str, album: Dict) -> str:
+    url = ROOT_PATH + album["url"]
+    if watermark is not None:
+        # The album is known once its book is done (see `Watermark.complete`).
+        watermark.add_pending(source_key, _get_album_id(album), url)
+    return url
+
+
+def _iter_pending(watermark: Optional[Watermark], source_key: str, new_urls: List[str]) -> Iterator[Tuple[str, str]]:
+    """Yield the albums of the previous syncs which were not done (failed or interrupted), and save the watermark."""
+    if watermark is None:
+        return
+    print(f"{len(new_urls)} new album(s) found for {source_key}")
+    listed = set(new_urls)
+    pending_urls = [url for url in watermark.get_pending(source_key) if url not in listed]
+    if pending_urls:
+        print(f"{len(pending_urls)} album(s) not done by the previous syncs for {source_key}")
+    watermark.save()
+    for url in pending_urls:
+        yield url, ""
+
+
+def _parse_search_results(html: str) -> List[str]:
+    serie_urls = []
+    soup = BeautifulSoup(html, features="html.parser")
+    for div in soup.find_all("div", class_="product-list-serie"):
+        link = div.find_all("a")
+        title = div.find_all("span", class_="product_title")
+        if link and title and strip_tags(title[0].text).strip():
+            serie_urls.append(ROOT_PATH + link[0].get("href"))
+    return serie_urls
+
+
+def _get_albums_page(session: Session, url: str, timeout: Tuple[float, float]) -> List[Dict]:
+    r = session.get(url, allow_redirects=True, timeout=timeout)
+    return json.loads(r.text)["albums"]
+
+
+def iter_albums(
+    session: Session,
+    url_bases: List[str],
+    page_size: int = ALBUMS_PER_PAGE,
+    prefetch: int = PREFETCH_PAGES,
+    is_known: Optional[Callable[[Dict], bool]] = None,
+    timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+) -> Iterator[Dict]:
+    """Yield the albums of several paginated categories, in order.
+
+    Each category is fetched independently, `prefetch` pages ahead: as soon
+    as one of its pages is received, its next page is requested, so the
+    listing takes the time of the longest category. Each category stops at
+    its first empty page. The pages received ahead are kept until their
+    turn comes.
+    If `is_known` is set, known albums are skipped and a category stops
+    at its first page containing a known album.
+    """
+    with ThreadPoolExecutor(max_workers=len(url_bases) * prefetch) as executor:
+        next_index = {url_base: 0 for url_base in url_bases}
+        pending: Dict[Future, Tuple[str, int]] = {}
+        pages: Dict[str, Dict[int, List[Dict]]] = {url_base: {} for url_base in url_bases}
+        # Offset after the last page of each category, once known.
+        ends: Dict[str, int] = {}
+
+        def submit(url_base: str) -> None:
+            url = f"{url_base}/{next_index[url_base]}/{page_size}"
+            pending[executor.submit(_get_albums_page, session, url, timeout)] = (url_base, next_index[url_base])
+            next_index[url_base] += page_size
+
+        for url_base in url_bases:
+            for _ in range(prefetch):
+                submit(url_base)
+
+        # Category and offset of the next page to yield.
+        current, index = 0, 0
+        while True:
+            while current < len(url_bases):
+                url_base = url_bases[current]
+                if url_base in ends and index >= ends[url_base]:
+                    current, index = current + 1, 0
+                elif index in pages[url_base]:
+                    albums = pages[url_base].pop(index)
+                    index += page_size
+                    yield from (album for album in albums if not (is_known and is_known(album)))
+                else:
+                    break
+            if current >= len(url_bases):
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url_base, page_index = pending.pop(future)
+                albums = future.result()
+                if url_base in ends and page_index >= ends[url_base]:
+                    continue
+                if not albums or (is_known and any(is_known(album) for album in albums)):
+                    # The page with known albums is the last one: its unknown albums are still yielded.
+                    end = page_index + (page_size if albums else 0)
+                    ends[url_base] = min(end, ends.get(url_base, end))
+                    for other_future, (other_url_base, other_index) in list(pending.items()):
+                        if other_url_base == url_base and other_index >= ends[url_base] and other_future.cancel():
+                            del pending[other_future]
+                elif url_base not in ends:
+                    submit(url_base)
+                if albums:
+                    pages[url_base][page_index] = albums
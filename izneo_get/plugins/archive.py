@@ -10,11 +10,11 @@ from http.cookiejar import LWPCookieJar
 from typing import Dict, List, Optional
 
 import requests
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
-from ..book_infos import BookInfos, ReadDirection
+from ..book_infos import BookInfos, PageUrls, ReadDirection
 from ..config import Config, OutputFormat
+from ..crypto import CryptoBackend, get_backend
+from ..session_pool import get_session_pool
 from ..tools import (
     BAR_FORMAT,
     async_http_get,
@@ -28,7 +28,7 @@ from ..tools import (
     question_yes_no,
     requests_retry_session,
 )
-from .site_processor import SiteProcessor
+from .site_processor import PageContent, SiteProcessor
 
 
 class Archive(SiteProcessor):
@@ -51,11 +51,25 @@ class Archive(SiteProcessor):
             re.match(pattern, url) is not None for pattern in Archive.URL_PATTERNS
         )
 
+    def get_book_key(self) -> str:
+        res = re.match(r"https://archive\.org/details/([^/?#]+)", self.url)
+        return f"archive:{res[1] if res else self.url}"
+
     def authenticate(self) -> None:
+        # The login is done once for all the books, their processors share the session.
+        self.session = get_session_pool().get("archive", self._get_credentials(), self._create_session)
+
+    def _get_credentials(self) -> str:
+        if self.config.authentication_from_cache:
+            return f"cache:{self.config.cache_folder or '.'}/{self.cache_file}"
+        return "prompt"
+
+    def _create_session(self) -> requests.Session:
         if self.config.authentication_from_cache:
             self._authenticate_from_cache()
         else:
             self._authenticate_from_prompt()
+        return requests_retry_session(session=self.session)
 
     def _authenticate_from_prompt(self) -> None:
         print('INFO: Authentication to "archive.org" required.')
@@ -90,7 +104,7 @@ class Archive(SiteProcessor):
         if not self.session:
             self._init_session()
         response = self.session.post(
-            "https://archive.org/account/login", data=data, headers=headers
+            "https://archive.org/account/login", data=data, headers=headers, timeout=self.timeout
         )
         if response.status_code != 200:
             print("ERROR: Can't authenticate")
@@ -129,11 +143,10 @@ class Archive(SiteProcessor):
             if book_infos["brOptions"].get("pageProgression", "") == "rl"
             else ReadDirection.LTOR
         )
-        page_urls = [
-            page["uri"] + "&rotate=0&scale=0"
-            for item in book_infos["brOptions"]["data"]
-            for page in item
-        ]
+        page_urls = PageUrls(
+            suffix="&rotate=0&scale=0",
+            items=[page["uri"] for item in book_infos["brOptions"]["data"] for page in item],
+        )
 
         self._book_infos = BookInfos(
             title=title,
@@ -166,12 +179,18 @@ class Archive(SiteProcessor):
     def after_download(self, files_downloaded: List[str]) -> None:
         self.return_loan()
 
+    def reauthenticate(self) -> bool:
+        # The loan token of the pages has probably expired.
+        print("INFO: Renewing the loan.")
+        self.loan()
+        return bool(self._book_infos and self._book_infos.page_urls)
+
     def loan(self):
         book_id = self._get_book_id()
 
         data = {"action": "grant_access", "identifier": book_id}
         response = self.session.post(
-            "https://archive.org/services/loans/loan/searchInside.php", data=data
+            "https://archive.org/services/loans/loan/searchInside.php", data=data, timeout=self.timeout
         )
         if response.status_code != 200 or not response.json()["success"]:
             print(f"ERROR: Can't loan: {response.status_code}")
@@ -181,18 +200,19 @@ class Archive(SiteProcessor):
         data = {"action": "browse_book", "identifier": book_id}
         data = self.data_to_boundary(boundary, data)
         response = self.session.post(
-            "https://archive.org/services/loans/loan/", headers=headers, data=data
+            "https://archive.org/services/loans/loan/", headers=headers, data=data, timeout=self.timeout
         )
 
         if response.status_code == 401 and response.reason == "Unauthorized":
             print("ERROR: Can't loan. Session expired?")
             self._authenticate_from_prompt()
+            get_session_pool().put("archive", self._get_credentials(), self.session)
             return self.loan()
 
         data = {"action": "create_token", "identifier": book_id}
         data = self.data_to_boundary(boundary, data)
         response = self.session.post(
-            "https://archive.org/services/loans/loan/", data=data, headers=headers
+            "https://archive.org/services/loans/loan/", data=data, headers=headers, timeout=self.timeout
         )
         if "token" in response.text:
             self._book_infos = None
@@ -203,7 +223,7 @@ class Archive(SiteProcessor):
         book_id = self._get_book_id()
         data = {"action": "return_loan", "identifier": book_id}
         response = self.session.post(
-            "https://archive.org/services/loans/loan/", data=data
+            "https://archive.org/services/loans/loan/", data=data, timeout=self.timeout
         )
         if response.status_code == 200 and response.json()["success"]:
             print(f"INFO: Book returned: {self._book_infos.title}")
@@ -215,6 +235,7 @@ class Archive(SiteProcessor):
             cookies=cookies,
             allow_redirects=True,
             headers=self.headers,
+            timeout=self.timeout,
         )
         if r.status_code != 200:
             print(f"ERROR: Can't get book infos: {r.status_code}")
@@ -229,6 +250,7 @@ class Archive(SiteProcessor):
             cookies=cookies,
             allow_redirects=True,
             headers=self.headers,
+            timeout=self.timeout,
         )
         if r.status_code != 200:
             print(f"ERROR: Can't get book infos: {r.status_code}")
@@ -246,7 +268,7 @@ class Archive(SiteProcessor):
 
     def post_process_image_content(
         self, response: requests.models.Response, page_num: int = 0
-    ) -> bytes:
+    ) -> PageContent:
         obfuscation_header = response.headers.get("x-obfuscate")
         if not obfuscation_header:
             return response.content
@@ -262,27 +284,40 @@ class Archive(SiteProcessor):
         aes_key = "/" + "/".join(response.url.split("/")[3:])
         image_buffer = response.content
 
-        DECRYPT_SIZE = 1024
-
         if len(image_buffer) < DECRYPT_SIZE:
             print(f"Error: Image too small ({len(image_buffer)} octets)")
             return
 
-        encrypted_fragment = image_buffer[:DECRYPT_SIZE]
-        remaining_image = image_buffer[DECRYPT_SIZE:]
-
+        # Only the first bytes are encrypted: they are decrypted into a small buffer, and the page is
+        # written as this header followed by the rest of the response, which is not copied.
+        header = bytearray(DECRYPT_SIZE)
         try:
-            decrypted_fragment = decrypt_data(encrypted_fragment, aes_key, counter_b64)
+            decrypt_data_into(
+                memoryview(image_buffer)[:DECRYPT_SIZE],
+                header,
+                aes_key,
+                counter_b64,
+                backend=get_backend(self.config.cache_folder),
+            )
         except Exception as e:
             print(f"Error: {e}")
             return
 
-        decrypted_image_buffer = decrypted_fragment + remaining_image
+        return [header, memoryview(image_buffer)[DECRYPT_SIZE:]]
+
+
+DECRYPT_SIZE = 1024  # Size of the encrypted fragment at the start of the obfuscated pages.
 
-        return decrypted_image_buffer
 
+@lru_cache(maxsize=1024)
+def get_aes_key(aes_key: str) -> bytes:
+    """Return the AES-128 key derived from the key string (first 16 bytes of its SHA-1), memoized."""
+    return hashlib.sha1(aes_key.encode("utf-8")).digest()[:16]
 
-def decrypt_data(buffer_fragment: bytes, aes_key: str, counter_b64: str) -> bytes:
+
+def decrypt_data(
+    buffer_fragment: bytes, aes_key: str, counter_b64: str, backend: Optional[CryptoBackend] = None
+) -> bytearray:
     """
     Decrypts a data fragment using AES-CTR, reproducing the JS logic.
 
@@ -290,15 +325,27 @@ def decrypt_data(buffer_fragment: bytes, aes_key: str, counter_b64: str) -> byte
         buffer_fragment: The binary fragment to decrypt (the first 1024 bytes).
         aes_key: The AES key string (the URI path).
         counter_b64: The counter encoded in Base64 from the X-Obfuscate header.
+        backend: The crypto backend (the one of the run by default).
 
     Returns:
         The decrypted binary data.
     """
+    decrypted = bytearray(len(buffer_fragment))
+    decrypt_data_into(buffer_fragment, decrypted, aes_key, counter_b64, backend)
+    return decrypted
+
+
+def decrypt_data_into(
+    buffer_fragment: bytes,
+    out: bytearray,
+    aes_key: str,
+    counter_b64: str,
+    backend: Optional[CryptoBackend] = None,
+) -> None:
+    """Same as `decrypt_data`, the decrypted data being written into `out` (which may be `buffer_fragment`)."""
     # 1. Hash the key with SHA-1 and truncate
-    sha1_hash = hashlib.sha1(aes_key.encode("utf-8")).digest()
-
-    # 2. Use the first 16 bytes of the SHA-1 hash as AES key
-    key = sha1_hash[:16]  # Key of 16 bytes for AES-128
+    # 2. Use the first 16 bytes of the SHA-1 hash as AES key (AES-128)
+    key = get_aes_key(aes_key)
 
     # 3. Decode the counter Base64
     try:
@@ -321,14 +368,7 @@ def decrypt_data(buffer_fragment: bytes, aes_key: str, counter_b64: str) -> byte
     # 4. AES-CTR decryption
     # length: 64 in JS indicates a 64-bit segment to use as counter,
     # which is the default for many 16-byte IVs.
-    cipher = Cipher(
-        algorithms.AES(key), modes.CTR(iv_counter), backend=default_backend()
-    )
-
-    decryptor = cipher.decryptor()
-    decrypted_data = decryptor.update(buffer_fragment) + decryptor.finalize()
-
-    return decrypted_data
+    (backend or get_backend()).decrypt_ctr_into(buffer_fragment, key, iv_counter, out)
 
 
 def init(url: str = "", config: Optional[Config] = None) -> Archive:
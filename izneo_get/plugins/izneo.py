@@ -9,11 +9,12 @@ from functools import lru_cache
 from typing import Dict, List, Optional
 
 import requests
-from Crypto.Cipher import AES
 from tqdm.asyncio import tqdm
 
-from ..book_infos import BookInfos, ReadDirection
+from ..book_infos import BookInfos, PageKey, PageUrls, ReadDirection
 from ..config import Config, ImageFormat, OutputFormat
+from ..crypto import decrypt_cbc, get_backend
+from ..session_pool import get_session_pool
 from ..tools import (
     BAR_FORMAT,
     async_http_get,
@@ -54,14 +55,50 @@ class Izneo(SiteProcessor):
     def is_valid_url(url: str) -> bool:
         return any(re.match(pattern, url) is not None for pattern in Izneo.URL_PATTERNS)
 
+    def get_book_key(self) -> str:
+        # Reader, description and signed URLs of an album, with or without "exiturl", share the album id.
+        return f"izneo:{self._get_book_id() or self.url}"
+
+    def has_credentials(self) -> bool:
+        return bool(self._get_signature())
+
     def authenticate(self) -> None:
+        # The books with the same credentials share the session, authenticated once.
+        self.session = get_session_pool().get("izneo", self._get_credentials(), self._create_session)
+
+    def _get_credentials(self) -> str:
         if sign := self._get_signature():
-            return self._init_session_from_url()
+            return sign
+        if self.config.authentication_from_cache:
+            return f"cache:{self.config.cache_folder or '.'}/{self.cache_file}"
+        return "prompt"
+
+    def _create_session(self) -> requests.Session:
+        if self._get_signature():
+            self._init_session_from_url()
+            return self.session
         if self.config.authentication_from_cache:
             session_id = self._authenticate_from_cache()
         else:
             session_id = self._authenticate_from_prompt()
-        return self._init_session(session_id)
+        self._init_session(session_id)
+        return self.session
+
+    def reauthenticate(self) -> bool:
+        if self._get_signature():
+            # Signed URLs give a new session by themselves.
+            self._init_session_from_url()
+            get_session_pool().put("izneo", self._get_credentials(), self.session)
+            return True
+        # The session ID may have been renewed in the cache since the download started.
+        session_id = self._read_cache()
+        current_session_id = self.session.cookies.get("c03aab1711dbd2a02ea11200dde3e3d1") if self.session else None
+        if not session_id or session_id == current_session_id:
+            print("ERROR: Session expired? Update the session ID in the cache and try again.")
+            return False
+        self._init_session(session_id)
+        get_session_pool().put("izneo", self._get_credentials(), self.session)
+        return True
 
     def _authenticate_from_prompt(self) -> str:
         session_id = ""
@@ -73,14 +110,15 @@ class Izneo(SiteProcessor):
         return session_id
 
     def _authenticate_from_cache(self) -> str:
-        session_id = None
         os.makedirs(self.config.cache_folder, exist_ok=True)
-        cache_file = f"{self.config.cache_folder}/{self.cache_file}"
+        return self._read_cache() or self._authenticate_from_prompt()
+
+    def _read_cache(self) -> str:
+        cache_file = f"{self.config.cache_folder or '.'}/{self.cache_file}"
         if os.path.exists(cache_file):
             with open(cache_file, "r") as f:
-                session_id = f.read()
-            return session_id
-        return self._authenticate_from_prompt()
+                return f.read()
+        return ""
 
     def _save_cache(self, session_id: str) -> None:
         cache_folder = self.config.cache_folder or "."
@@ -104,7 +142,7 @@ class Izneo(SiteProcessor):
             session_id (str): value found in the cookie named "c03aab1711dbd2a02ea11200dde3e3d1".
         """
         # Create session and cookie.
-        self.session = requests.Session()
+        self.session = requests_retry_session(session=requests.Session())
         self.session.max_redirects = 10
         cookie_obj = requests.cookies.create_cookie(
             domain=".izneo.com", name="lang", value="fr"
@@ -123,6 +161,7 @@ class Izneo(SiteProcessor):
         r = requests_retry_session(session=self.session).get(
             self.url,
             allow_redirects=True,
+            timeout=self.timeout,
         )
 
     def download(self, forced_title: Optional[str] = None) -> str:
@@ -145,14 +184,26 @@ class Izneo(SiteProcessor):
             return response.content
         if not book_infos or not book_infos.custom_fields:
             return response.content
-        key = book_infos.custom_fields["pages"][page_num]["key"]
-        iv = book_infos.custom_fields["pages"][page_num]["iv"]
-        return Izneo.uncrypt_image(response.content, key, iv)
+        page_keys = book_infos.custom_fields.get("pages") or []
+        page_key = page_keys[page_num] if page_num < len(page_keys) else None
+        if not page_key:
+            return response.content
+        return get_backend(self.config.cache_folder).decrypt_cbc(response.content, page_key.key, page_key.iv)
 
     @staticmethod
     def uncrypt_image(crypted_content: bytes, key: str, iv: str) -> bytes:
-        aes = AES.new(base64.b64decode(key), AES.MODE_CBC, base64.b64decode(iv))
-        return aes.decrypt(crypted_content)
+        return Izneo.decrypt_page(crypted_content, base64.b64decode(key), base64.b64decode(iv))
+
+    @staticmethod
+    def decrypt_page(crypted_content: bytes, key: bytes, iv: bytes) -> bytes:
+        """Decrypt a page with its decoded key and iv."""
+        return decrypt_cbc(crypted_content, key, iv)
+
+    @staticmethod
+    def _decode_page_key(page: Dict[str, str]) -> Optional[PageKey]:
+        if not isinstance(page, dict) or not page.get("key") or not page.get("iv"):
+            return None
+        return PageKey(base64.b64decode(page["key"]), base64.b64decode(page["iv"]))
 
     def get_book_infos(self) -> BookInfos:
         if self._book_infos:
@@ -169,17 +220,12 @@ class Izneo(SiteProcessor):
             if book_infos.get("readDirection", "") == "rtl"
             else ReadDirection.LTOR
         )
-        page_urls = []
-        for page_num, _ in enumerate(book_infos.get("pages", None)):
-            url = f"https://www.izneo.com/book/{book_id}/{page_num}?type=full" + (
-                f"&{sign}" if sign else ""
-            )
-            if sign:
-                url = (
-                    f"https://reader.izneo.com/read/{book_id}/{page_num}?quality=HD"
-                    + (f"&{sign}" if sign else "")
-                )
-            page_urls.append(url)
+        pages = book_infos.get("pages", None) or []
+        # The URLs only differ by the page number: they are generated when needed.
+        if sign:
+            page_urls = PageUrls(f"https://reader.izneo.com/read/{book_id}/", f"?quality=HD&{sign}", len(pages))
+        else:
+            page_urls = PageUrls(f"https://www.izneo.com/book/{book_id}/", "?type=full", len(pages))
 
         self._book_infos = BookInfos(
             title=title,
@@ -195,7 +241,8 @@ class Izneo(SiteProcessor):
             description=book_infos.get("synopsis", ""),
             page_urls=page_urls,
             custom_fields={
-                "pages": book_infos.get("pages", None),
+                # Only the decoded keys of the pages are kept, not the raw JSON.
+                "pages": [Izneo._decode_page_key(page) for page in pages],
                 "state": book_infos.get("state", ""),
             },
         )
@@ -207,6 +254,7 @@ class Izneo(SiteProcessor):
         r = requests_retry_session(session=self.session).get(
             f"https://www.izneo.com/book/{book_id}" + (f"?{sign}" if sign else ""),
             allow_redirects=True,
+            timeout=self.timeout,
         )
         return json.loads(r.text)["data"]
 
@@ -2,21 +2,48 @@
 import asyncio
 import os
 import re
-from typing import Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 
 import requests
 from tqdm.asyncio import tqdm
 
+from ..adaptive_concurrency import get_controller
+from ..bandwidth import ThroughputMeter, get_bandwidth_limiter
 from ..book_infos import BookInfos
+from ..circuit_breaker import AUTH_FAILURE_STATUS, CircuitBreaker, CircuitOpen
+from ..http2 import async_http2_get, use_http2
+from ..job_queue import BookJob
+from ..retry_queue import RetryQueue
 from ..config import Config, ImageFormat, OutputFormat
 from ..tools import (
     BAR_FORMAT,
+    DEFAULT_TIMEOUT,
     async_http_get,
     clean_name,
     get_image_type,
     get_name_from_pattern,
 )
 
+PAGE_WORKERS = os.cpu_count() or 4  # Threads decoding and writing the pages.
+
+Buffer = Union[bytes, bytearray, memoryview]
+PageContent = Union[Buffer, List[Buffer]]  # A decoded page, or its parts (a patched header and the rest).
+
+_page_executor: Optional[ThreadPoolExecutor] = None
+_page_executor_lock = threading.Lock()
+
+
+def get_page_executor() -> ThreadPoolExecutor:
+    """Return the thread pool decoding and writing the pages, shared by all the books."""
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is None:
+            _page_executor = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="page")
+        return _page_executor
+
 
 class SiteProcessor:
     URL_PATTERNS: List[str] = []
@@ -25,6 +52,12 @@ class SiteProcessor:
     cache_file: str
     session: Optional[requests.Session] = None
     headers: Dict[str, str] = {}
+    circuit_breaker: Optional[CircuitBreaker] = None
+    deadline: Optional[float] = None  # Time (`time.monotonic`) at which the download of the book is abandoned.
+    throughput: Optional[ThroughputMeter] = None
+    priority: int = 0  # Rank of the book in the run: the pages of the first books are downloaded first.
+    job: Optional[BookJob] = None  # Persistent progress of the book (the pages written are not downloaded again).
+    checkpointed_pages: Dict[int, str] = {}
 
     def __init__(self, url: str = "", config: Optional[Config] = None) -> None:
         self.url = url
@@ -38,8 +71,35 @@ class SiteProcessor:
             re.match(pattern, url) is not None for pattern in SiteProcessor.URL_PATTERNS
         )
 
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """Connect and read timeouts of the requests."""
+        return (
+            self.config.connect_timeout_sec or DEFAULT_TIMEOUT[0],
+            self.config.read_timeout_sec or DEFAULT_TIMEOUT[1],
+        )
+
+    def get_book_key(self) -> str:
+        """Canonical identifier of the book, "<plugin>:<id>", from its URL only (without any request).
+
+        All the URLs of a book give the same key.
+        """
+        return f"{type(self).__name__.lower()}:{self.url.split('#')[0]}"
+
+    def has_credentials(self) -> bool:
+        """Tell if the URL gives access to the book by itself (signed URL)."""
+        return False
+
     def authenticate(self) -> None: ...
 
+    def reauthenticate(self) -> bool:
+        """Renew the session after the server refused several pages in a row.
+
+        Returns:
+            bool: True if the download can resume with the new session.
+        """
+        return False
+
     def get_book_infos(self) -> BookInfos: ...
 
     def download(self, forced_title: Optional[str] = None) -> str:
@@ -81,8 +141,12 @@ class SiteProcessor:
             self.after_download([])
             return ""
         self._create_destination_folder(save_path)
+        self.checkpointed_pages = self.job.get_pages() if self.job else {}
 
         files_downloaded: List[str] = []
+        self.circuit_breaker = CircuitBreaker()
+        self.deadline = time.monotonic() + self.config.book_deadline_sec if self.config.book_deadline_sec else None
+        self.throughput = ThroughputMeter()
         if self.config.pause_sec:
             files_downloaded = self._download_all_pages(title_used, save_path)
         else:
@@ -93,6 +157,7 @@ class SiteProcessor:
         print(f"{len(files_downloaded) - count_empty} pages downloaded")
         if count_empty:
             print(f"{count_empty} pages skipped")
+        print(f"Downloaded {self.throughput}")
         self.after_download(files_downloaded)
         return save_path
 
@@ -102,7 +167,8 @@ class SiteProcessor:
 
     def post_process_image_content(
         self, response: requests.models.Response, page_num: int = 0
-    ) -> bytes:
+    ) -> PageContent:
+        """Return the decoded page, in one buffer or in parts to write one after the other."""
         return response.content
 
     async def _async_download_page(
@@ -122,7 +188,6 @@ class SiteProcessor:
 
         # Si la page existe déjà sur le disque, on passe.
         page_txt = f"000000000{str(page_num + 1)}"[-nb_digits:]
-        store_path = f"{save_path}/{title_used} {page_txt}.tmp"
         store_path_converted = ""
         if self.config.image_format == ImageFormat.WEBP:
             store_path_converted = f"{save_path}/{title_used} {page_txt}.webp"
@@ -135,39 +200,93 @@ class SiteProcessor:
             and os.path.getsize(store_path_converted)
         ):
             return store_path_converted
+        checkpointed_path = self.checkpointed_pages.get(page_num)
+        if checkpointed_path and os.path.exists(checkpointed_path) and os.path.getsize(checkpointed_path):
+            return checkpointed_path
+
+        if self.circuit_breaker and self.circuit_breaker.is_open:
+            raise CircuitOpen()
 
         # r = s.get(url, cookies=s.cookies, allow_redirects=True, params=params, headers=headers)
         try:
-            r = await async_http_get(url, session=self.session, headers=self.headers)
+            # The number of simultaneous requests adapts to the responses of the host,
+            # free slots go to the first book, in reading order.
+            async with get_controller(url).slot(priority=(self.priority, page_num)) as slot:
+                http_get = async_http2_get if use_http2(self.config.http2) else async_http_get
+                r = await http_get(
+                    url,
+                    session=self.session,
+                    headers=self.headers,
+                    bandwidth=get_bandwidth_limiter(self.config.bandwidth_limit),
+                    timeout=self.timeout,
+                )
+                slot.record(r)
         except requests.TooManyRedirects as e:
+            print(f"\n[ERROR] Page {page_num} unavailable: {e}")
+            # Usually a redirection loop to the login page.
+            self._record_page_refused()
+            return ""
+        except (requests.ConnectionError, requests.Timeout) as e:
             print(f"\n[ERROR] Page {page_num} unavailable: {e}")
             return ""
 
-        if r.status_code in (403, 404):
+        if r.status_code in AUTH_FAILURE_STATUS:
             if page_num < book_infos.pages:
                 print(
                     f"\n[ERROR] Can't download page {str(page_num + 1)} ({str(book_infos.pages)} pages expected)"
                 )
+            self._record_page_refused()
             return ""
         if r.encoding:
             print(f"\n[ERROR] Page {page_num} unavailable")
             return ""
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success()
+        if self.throughput:
+            self.throughput.add(len(r.content))
+
+        # Decoding (decryption) and writing run in the worker pool, the event loop keeps downloading.
+        store_path_converted = await asyncio.get_running_loop().run_in_executor(
+            get_page_executor(), self._store_page, r, page_num, f"{save_path}/{title_used} {page_txt}"
+        )
 
-        # Decode image.
-        uncrypted = self.post_process_image_content(r, page_num=page_num)
-        store_path = f"{save_path}/{title_used} {page_txt}.tmp"
-        open(store_path, "wb").write(uncrypted)
+        if pause_sec:
+            await asyncio.sleep(pause_sec)
+        return store_path_converted
 
-        image_format = get_image_type(uncrypted)
-        store_path_converted = f"{save_path}/{title_used} {page_txt}.{image_format}"
+    def _store_page(self, response: requests.Response, page_num: int, path_prefix: str) -> str:
+        """Decode a downloaded page and write it to `path_prefix` with the extension of its format."""
+        uncrypted = self.post_process_image_content(response, page_num=page_num)
+        store_path = f"{path_prefix}.tmp"
+        with open(store_path, "wb") as f:
+            # The parts of a page are not joined, to avoid a copy of the whole image.
+            for part in uncrypted if isinstance(uncrypted, list) else [uncrypted]:
+                f.write(part)
+
+        image_format = get_image_type(store_path)
+        store_path_converted = f"{path_prefix}.{image_format}"
         if os.path.exists(store_path_converted):
             os.remove(store_path_converted)
         os.rename(store_path, store_path_converted)
-
-        if pause_sec:
-            await asyncio.sleep(pause_sec)
+        if self.job:
+            self.job.add_page(page_num, store_path_converted)
         return store_path_converted
 
+    def _record_page_refused(self) -> None:
+        if self.circuit_breaker:
+            self.circuit_breaker.record_failure()
+
+    def _resume_after_open_circuit(self, nb_pages_left: int) -> bool:
+        """Try to renew the session once the circuit is open (only once per book)."""
+        print(f"\n[ERROR] Too many pages refused in a row, {nb_pages_left} pages left.")
+        if self.circuit_breaker is None or self.circuit_breaker.reauthenticated or not self.reauthenticate():
+            print("ERROR: Book download stopped.")
+            return False
+        print("INFO: Session renewed, resuming download.")
+        self.circuit_breaker.reset()
+        self.circuit_breaker.reauthenticated = True
+        return True
+
     async def _async_download_all_pages(
         self,
         title_used: str,
@@ -176,44 +295,143 @@ class SiteProcessor:
         book_infos = self.get_book_infos()
         if len(book_infos.page_urls) == 0:
             return []
-        return await tqdm.gather(
-            *[
-                self._async_download_page(
-                    page_num=page,
-                    url=url,
-                    title_used=title_used,
-                    save_path=save_path,
-                    pause_sec=0,
-                )
-                for page, url in enumerate(book_infos.page_urls)
-            ],
-            desc="Download pages",
-            bar_format=BAR_FORMAT,
-        )
+        downloaded_pages: List[str] = [""] * len(book_infos.page_urls)
+        pages_left = list(range(len(book_infos.page_urls)))
+        with tqdm(total=len(pages_left), desc="Download pages", bar_format=BAR_FORMAT) as progress_bar:
+            while pages_left:
+                page_urls = self.get_book_infos().page_urls
+                tasks = {
+                    asyncio.ensure_future(
+                        self._async_download_page(
+                            page_num=page,
+                            url=page_urls[page],
+                            title_used=title_used,
+                            save_path=save_path,
+                            pause_sec=0,
+                        )
+                    ): page
+                    for page in pages_left
+                }
+                for task in tasks:
+                    task.add_done_callback(
+                        lambda task: progress_bar.update() if not task.cancelled() and not task.exception() else None
+                    )
+                # As soon as the circuit opens or the deadline expires, the pending pages are cancelled.
+                await self._async_wait_or_cancel(tasks, return_when=asyncio.FIRST_EXCEPTION)
+
+                pages_left = []
+                for task, page in tasks.items():
+                    if task.cancelled() or isinstance(task.exception(), CircuitOpen):
+                        pages_left.append(page)
+                    elif task.exception():
+                        raise task.exception()
+                    else:
+                        downloaded_pages[page] = task.result()
+                if pages_left and self._is_deadline_exceeded():
+                    print(f"\n[ERROR] Book deadline exceeded, {len(pages_left)} pages left.")
+                    break
+                if pages_left and not self._resume_after_open_circuit(len(pages_left)):
+                    break
+        await self._async_retry_failed_pages(downloaded_pages, title_used, save_path)
+        return downloaded_pages
+
+    async def _async_wait_or_cancel(self, tasks: Dict[asyncio.Future, int], return_when: str) -> None:
+        """Wait for `tasks` until the deadline of the book, then cancel the pending ones."""
+        _, pending = await asyncio.wait(tasks, timeout=self._get_time_left(), return_when=return_when)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _async_retry_failed_pages(self, downloaded_pages: List[str], title_used: str, save_path: str) -> None:
+        """Retry the failed pages after the main pass, each one after its own backoff."""
+        retry_queue = RetryQueue()
+        while self._can_retry() and (pages := retry_queue.schedule(downloaded_pages)):
+            print(f"\nINFO: Retrying {len(pages)} pages")
+            tasks = {
+                asyncio.ensure_future(
+                    self._async_retry_page(retry_queue.get_delay(page), page, title_used, save_path)
+                ): page
+                for page in pages
+            }
+            await self._async_wait_or_cancel(tasks, return_when=asyncio.ALL_COMPLETED)
+            for task, page in tasks.items():
+                if not task.cancelled():
+                    downloaded_pages[page] = task.result()
+
+    async def _async_retry_page(self, delay: float, page_num: int, title_used: str, save_path: str) -> str:
+        await asyncio.sleep(delay)
+        try:
+            return await self._async_download_page(
+                page_num=page_num,
+                url=self.get_book_infos().page_urls[page_num],
+                title_used=title_used,
+                save_path=save_path,
+                pause_sec=0,
+            )
+        except CircuitOpen:
+            return ""
 
     def _download_all_pages(self, title_used: str, save_path: str) -> List[str]:
         book_infos = self.get_book_infos()
         downloaded_pages: List[str] = []
         if len(book_infos.page_urls) == 0:
             return downloaded_pages
-        for page, url in tqdm(
-            enumerate(book_infos.page_urls),
+        for page in tqdm(
+            range(len(book_infos.page_urls)),
             desc="Download pages",
             bar_format=BAR_FORMAT,
             total=len(book_infos.page_urls),
         ):
-            res = asyncio.run(
-                self._async_download_page(
-                    page_num=page,
-                    url=url,
-                    title_used=title_used,
-                    save_path=save_path,
-                    pause_sec=self.config.pause_sec or 0,
-                )
-            )
+            if self._is_deadline_exceeded():
+                print(f"\n[ERROR] Book deadline exceeded, {len(book_infos.page_urls) - page} pages left.")
+                return downloaded_pages + [""] * (len(book_infos.page_urls) - page)
+            while True:
+                try:
+                    res = asyncio.run(
+                        self._async_download_page(
+                            page_num=page,
+                            url=self.get_book_infos().page_urls[page],
+                            title_used=title_used,
+                            save_path=save_path,
+                            pause_sec=self.config.pause_sec or 0,
+                        )
+                    )
+                    break
+                except CircuitOpen:
+                    if not self._resume_after_open_circuit(len(book_infos.page_urls) - page):
+                        return downloaded_pages + [""] * (len(book_infos.page_urls) - page)
             downloaded_pages.append(res)
+        self._retry_failed_pages(downloaded_pages, title_used, save_path)
         return downloaded_pages
 
+    def _retry_failed_pages(self, downloaded_pages: List[str], title_used: str, save_path: str) -> None:
+        """Retry the failed pages after the main pass, one after the other."""
+        retry_queue = RetryQueue()
+        while self._can_retry() and (pages := retry_queue.schedule(downloaded_pages)):
+            print(f"\nINFO: Retrying {len(pages)} pages")
+            for page in pages:
+                delay = retry_queue.get_delay(page)
+                time_left = self._get_time_left()
+                if not self._can_retry() or (time_left is not None and time_left <= delay):
+                    return
+                time.sleep(delay)
+                downloaded_pages[page] = asyncio.run(
+                    self._async_retry_page(0, page, title_used, save_path)
+                )
+
+    def _is_circuit_open(self) -> bool:
+        return bool(self.circuit_breaker and self.circuit_breaker.is_open)
+
+    def _get_time_left(self) -> Optional[float]:
+        """Seconds left before the deadline of the book (None without deadline)."""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def _is_deadline_exceeded(self) -> bool:
+        return self._get_time_left() == 0
+
+    def _can_retry(self) -> bool:
+        return not self._is_circuit_open() and not self._is_deadline_exceeded()
+
     def _create_destination_folder(self, save_path: str) -> None:
         if not os.path.exists(save_path):
             os.mkdir(save_path)
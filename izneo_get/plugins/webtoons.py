@@ -9,6 +9,8 @@ from PIL import Image
 
 from ..book_infos import BookInfos
 from ..config import Config
+from ..session_pool import get_session_pool
+from ..tools import requests_retry_session
 from .site_processor import SiteProcessor
 
 
@@ -33,7 +35,9 @@ class Webtoons(SiteProcessor):
     def is_valid_url(url: str) -> bool:
         return any(re.match(pattern, url) is not None for pattern in Webtoons.URL_PATTERNS)
 
-    def authenticate(self) -> None: ...
+    def authenticate(self) -> None:
+        # No account: a single session keeps the connections alive between the books.
+        self.session = get_session_pool().get("webtoons", "", requests_retry_session)
 
     def before_download(self) -> None: ...
 
@@ -99,7 +103,7 @@ class Webtoons(SiteProcessor):
             return self._book_infos
 
         # Fetch page content
-        response = requests.get(self.url)
+        response = requests.get(self.url, timeout=self.timeout)
         soup = BeautifulSoup(response.content, "html.parser")
 
         # Extract data from JavaScript object
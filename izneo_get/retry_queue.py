@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Deferred retries of the pages that failed during the main download pass.
+
+Failed pages are retried once all the other pages are done, each one after
+its own exponential backoff with jitter, within a retry budget per book.
+"""
+import random
+from typing import Dict, List, Optional
+
+MAX_ATTEMPTS = 3  # Number of retries of a page.
+BOOK_RETRY_BUDGET = 30  # Number of retries of all the pages of a book.
+BASE_DELAY = 1.0  # Delay (in seconds) before the first retry of a page.
+MAX_DELAY = 30.0
+
+
+class RetryQueue:
+    """Retry state of the pages of one book."""
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        budget: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        self.max_attempts = MAX_ATTEMPTS if max_attempts is None else max_attempts
+        self.budget = BOOK_RETRY_BUDGET if budget is None else budget
+        self.base_delay = BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = MAX_DELAY if max_delay is None else max_delay
+        self.attempts: Dict[int, int] = {}
+
+    def schedule(self, downloaded_pages: List[str]) -> List[int]:
+        """Return the failed pages (empty paths) to retry now, and count their attempt."""
+        pages = []
+        for page, path in enumerate(downloaded_pages):
+            if path or self.attempts.get(page, 0) >= self.max_attempts:
+                continue
+            if self.budget <= 0:
+                break
+            self.attempts[page] = self.attempts.get(page, 0) + 1
+            self.budget -= 1
+            pages.append(page)
+        return pages
+
+    def get_delay(self, page: int) -> float:
+        """Return the delay before the next attempt of `page`: exponential backoff, half of it random."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.attempts.get(page, 1) - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
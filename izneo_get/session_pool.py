@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Authenticated sessions shared by the processors of a plugin.
+
+A processor is created for each book, but the books of a run usually share
+the same credentials. The session of a plugin and of its credentials (cache
+file, signed URL...) is created and authenticated by the first processor
+which needs it, then lent to the next ones until it is `SESSION_TTL` seconds
+old or replaced after a refused session. Connections are kept alive between
+the books.
+"""
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from requests import Session
+
+SESSION_TTL = 30 * 60  # Seconds after which the authentication is done again.
+
+
+class SessionPool:
+    """Sessions by plugin and credentials, usable from several threads."""
+
+    def __init__(self, ttl: float = SESSION_TTL) -> None:
+        self.ttl = ttl
+        self._sessions: Dict[Tuple[str, str], Tuple[Session, float]] = {}
+        self._lock = threading.Lock()
+        # Only one processor authenticates for given credentials, the others wait for its session.
+        self._creation_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(self, plugin: str, credentials: str, create: Callable[[], Session]) -> Session:
+        """Return the session of `plugin` for `credentials`, created by `create` if there is none or if it expired."""
+        key = (plugin, credentials)
+        with self._lock:
+            creation_lock = self._creation_locks.setdefault(key, threading.Lock())
+        with creation_lock:
+            with self._lock:
+                session, expires = self._sessions.get(key, (None, 0.0))
+            if session is not None and time.monotonic() < expires:
+                return session
+            session = create()
+            self.put(plugin, credentials, session)
+            return session
+
+    def put(self, plugin: str, credentials: str, session: Session) -> None:
+        """Lend `session` for `credentials` from now on (after a new authentication)."""
+        with self._lock:
+            self._sessions[(plugin, credentials)] = (session, time.monotonic() + self.ttl)
+
+    def invalidate(self, plugin: str, credentials: str) -> None:
+        with self._lock:
+            self._sessions.pop((plugin, credentials), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+_session_pool = SessionPool()
+
+
+def get_session_pool() -> SessionPool:
+    """Return the pool shared by the whole run."""
+    return _session_pool
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Split of a list of books between several nodes.
+
+- `--shard i/n`: each node keeps the books of its shard, chosen from the book
+  identifier, so the nodes can process the same list without coordination.
+- `--lease-folder PATH`: the nodes claim each book in a folder shared by all
+  of them. A lease is renewed while the book is processed; the lease of a
+  node which stopped expires and the book is taken over by another node.
+  A book processed successfully is marked as done and not claimed again.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+LEASE_TTL = 600  # Seconds without renewal after which a lease can be taken over.
+LOCK_FILE = ".lock"
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Return the shard and the number of shards of "i/n" (1 <= i <= n)."""
+    try:
+        shard, nb_shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f'Invalid shard "{value}", expected "i/n" (for example "1/3").')
+    if not 1 <= shard <= nb_shards:
+        raise ValueError(f'Invalid shard "{value}", expected 1 <= i <= n.')
+    return shard, nb_shards
+
+
+def get_shard(book_key: str, nb_shards: int) -> int:
+    """Return the shard (from 1 to `nb_shards`) of a book, the same on every node."""
+    return int(hashlib.sha1(book_key.encode("utf-8")).hexdigest(), 16) % nb_shards + 1
+
+
+def get_node_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseQueue:
+    """Books claimed by the nodes, in a shared folder.
+
+    Each book has a `<hash>.lease` file (node and expiry time) while it is
+    processed and a `<hash>.done` file once done. The files are changed under
+    an exclusive lock of the folder.
+    """
+
+    def __init__(self, folder: str, node: Optional[str] = None, ttl: float = LEASE_TTL) -> None:
+        self.folder = folder
+        self.node = node or get_node_name()
+        self.ttl = ttl
+        self._leases: Dict[str, str] = {}  # Book keys claimed by this node, by lease path.
+        self._leases_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+        os.makedirs(folder, exist_ok=True)
+
+    def claim(self, book_key: str) -> bool:
+        """Claim a book, return False if it is done or claimed by another node."""
+        lease_path, done_path = self._get_paths(book_key)
+        with self._locked():
+            if os.path.exists(done_path):
+                return False
+            lease = self._read_lease(lease_path) or {}
+            if lease.get("node") != self.node and lease.get("expires", 0) > time.time():
+                return False
+            if lease.get("node") not in [None, self.node]:
+                print(f'INFO: Lease of "{book_key}" expired ({lease.get("node")}), taking over.')
+            self._write_lease(lease_path, book_key)
+        with self._leases_lock:
+            self._leases[lease_path] = book_key
+        self._start_renewer()
+        return True
+
+    def release(self, book_key: str, done: bool) -> None:
+        """Release the lease of a book, marking it as done if `done`."""
+        lease_path, done_path = self._get_paths(book_key)
+        with self._leases_lock:
+            if self._leases.pop(lease_path, None) is None:
+                return
+        with self._locked():
+            if done:
+                with open(done_path, "w", encoding="utf-8") as f:
+                    json.dump({"key": book_key, "node": self.node, "time": time.time()}, f)
+            lease = self._read_lease(lease_path)
+            if lease and lease.get("node") == self.node:
+                os.remove(lease_path)
+
+    def renew(self) -> None:
+        """Extend the leases of this node (a lease taken over by another node is given up)."""
+        with self._leases_lock:
+            leases = dict(self._leases)
+        with self._locked():
+            for lease_path, book_key in leases.items():
+                lease = self._read_lease(lease_path)
+                if lease and lease.get("node") != self.node:
+                    print(f'WARNING: Lease of "{book_key}" taken over by {lease.get("node")}.')
+                    with self._leases_lock:
+                        self._leases.pop(lease_path, None)
+                    continue
+                self._write_lease(lease_path, book_key)
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._renewer:
+            self._renewer.join()
+
+    def _start_renewer(self) -> None:
+        if self._renewer is None:
+            self._renewer = threading.Thread(target=self._renew_regularly, daemon=True)
+            self._renewer.start()
+
+    def _renew_regularly(self) -> None:
+        while not self._stopped.wait(self.ttl / 3):
+            self.renew()
+
+    def _get_paths(self, book_key: str) -> Tuple[str, str]:
+        name = hashlib.sha1(book_key.encode("utf-8")).hexdigest()
+        return f"{self.folder}/{name}.lease", f"{self.folder}/{name}.done"
+
+    def _read_lease(self, lease_path: str) -> Optional[Dict]:
+        if not os.path.exists(lease_path):
+            return None
+        try:
+            with open(lease_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Incomplete lease: considered as expired.
+            return {}
+
+    def _write_lease(self, lease_path: str, book_key: str) -> None:
+        tmp_path = f"{lease_path}.{self.node}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": book_key, "node": self.node, "expires": time.time() + self.ttl}, f)
+        os.replace(tmp_path, lease_path)
+
+    def _locked(self) -> "FolderLock":
+        return FolderLock(f"{self.folder}/{LOCK_FILE}")
+
+
+class FolderLock:
+    """Exclusive lock of a file, between processes (and nodes, if the file system supports it)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+
+    def __enter__(self) -> "FolderLock":
+        self._file = open(self.path, "a+b")
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds.
+                    continue
+        return self
+
+    def __exit__(self, *args) -> None:
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
@@ -7,8 +7,10 @@ import io
 import os
 import random
 import re
+import queue
 import shutil
 import string
+import threading
 import cv2
 import inquirer
 import numpy as np
@@ -18,12 +20,16 @@ import requests
 from requests import Session
 from requests.adapters import HTTPAdapter
 from PIL import Image
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
 
 from izneo_get.config import ImageFormat
+from .bandwidth import CHUNK_SIZE, TokenBucket
 from .book_infos import BookInfos
 
 BAR_FORMAT = "{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]"  # Progress bar format
+DEFAULT_TIMEOUT = (10, 60)  # Connect and read timeouts (in seconds) of the HTTP requests.
+
+T = TypeVar("T")
 
 
 def strip_tags(html: str) -> str:
@@ -83,6 +89,11 @@ def requests_retry_session(
     if status_forcelist is None:
         status_forcelist = {500, 502, 504}
     session = session or Session()
+    retry_config = (retries, backoff_factor, frozenset(status_forcelist))
+    # Mounting a new adapter would drop the open connections of the session.
+    adapters = [getattr(session, "adapters", {}).get(prefix) for prefix in ["http://", "https://"]]
+    if all(getattr(adapter, "retry_config", None) == retry_config for adapter in adapters):
+        return session
     retry = Retry(
         total=retries,
         read=retries,
@@ -91,40 +102,66 @@ def requests_retry_session(
         status_forcelist=status_forcelist,
     )
     adapter = HTTPAdapter(max_retries=retry)
+    adapter.retry_config = retry_config
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
 
 
 def http_get(
-    url: str, session: Optional[Session] = None, headers: Optional[Dict[str, str]] = None, **kwargs: Optional[Any]
+    url: str,
+    session: Optional[Session] = None,
+    headers: Optional[Dict[str, str]] = None,
+    bandwidth: Optional[TokenBucket] = None,
+    **kwargs: Optional[Any],
 ) -> requests.Response:
+    """GET request, with the body read through `bandwidth` if a limit is given."""
     cookies = session.cookies if session else None
-    return requests_retry_session(session=session).get(
-        url, cookies=cookies, allow_redirects=True, headers=headers, **kwargs
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if bandwidth is None:
+        return requests_retry_session(session=session).get(
+            url, cookies=cookies, allow_redirects=True, headers=headers, **kwargs
+        )
+    response = requests_retry_session(session=session).get(
+        url, cookies=cookies, allow_redirects=True, headers=headers, stream=True, **kwargs
     )
+    content = bytearray()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        bandwidth.consume(len(chunk))
+        content += chunk
+    # Same as the body read by `response.content` (left mutable, to avoid copying the page again).
+    response._content = content
+    return response
 
 
 def http_post(
     url: str, session: Optional[Session] = None, headers: Optional[Dict[str, str]] = None, **kwargs: Optional[Any]
 ) -> requests.Response:
     cookies = session.cookies if session else None
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
     return requests_retry_session(session=session).post(
         url, cookies=cookies, allow_redirects=True, headers=headers, **kwargs
     )
 
 
 async def async_http_get(
-    url: str, session: Optional[Session] = None, headers: Optional[Dict[str, str]] = None, **kwargs: Optional[Any]
+    url: str,
+    session: Optional[Session] = None,
+    headers: Optional[Dict[str, str]] = None,
+    bandwidth: Optional[TokenBucket] = None,
+    **kwargs: Optional[Any],
 ) -> requests.Response:
-    return await asyncio.to_thread(http_get, url, session, headers, **kwargs)
+    return await asyncio.to_thread(http_get, url, session, headers, bandwidth, **kwargs)
 
 
-def check_version(version: str) -> str:
+def check_version(version: str, timeout: Tuple[float, float] = DEFAULT_TIMEOUT) -> str:
     latest_version_url = "https://raw.githubusercontent.com/izneo-get/izneo-get/master/VERSION"
     latest_version = ""
-    res = requests.get(latest_version_url)
-    if res.status_code != 200:
+    try:
+        res: Optional[requests.Response] = requests.get(latest_version_url, timeout=timeout)
+    except requests.RequestException:
+        res = None
+    if res is None or res.status_code != 200:
         print(f"Version {version} (impossible de vérifier la version officielle)")
     else:
         latest_version = res.text.strip()
@@ -137,9 +174,10 @@ def check_version(version: str) -> str:
     return latest_version
 
 
-def get_image_type(image_bytes: bytes) -> str:
-    image = Image.open(io.BytesIO(image_bytes))
-    return image.format.lower() if image.format else ""
+def get_image_type(image_bytes: Union[bytes, str]) -> str:
+    """Return the format of an image, from its content or from the path of its file."""
+    with Image.open(image_bytes if isinstance(image_bytes, str) else io.BytesIO(image_bytes)) as image:
+        return image.format.lower() if image.format else ""
 
 
 def get_name_from_pattern(pattern: str, infos: BookInfos) -> str:
@@ -339,3 +377,37 @@ def question_yes_no(message: str, default: bool = True, carousel: bool = True) -
 def generate_random_string(length: int) -> str:
     characters = string.ascii_letters + string.digits
     return "".join(random.choice(characters) for _ in range(length))
+
+
+def iterate_in_background(
+    iterable: Iterable[T], maxsize: int = 0, timeout: Optional[float] = None, idle: Any = None
+) -> Iterator[T]:
+    """Consume `iterable` in a background thread and yield its items as soon as they are available.
+
+    Exceptions raised by `iterable` are raised again in the consumer.
+    With `timeout`, `idle` is yielded each time no item came for `timeout` seconds.
+    """
+    items: queue.Queue = queue.Queue(maxsize=maxsize)
+    end = object()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except Exception as e:
+            items.put((end, e))
+            return
+        items.put((end, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        try:
+            item, error = items.get(timeout=timeout)
+        except queue.Empty:
+            yield idle
+            continue
+        if error:
+            raise error
+        if item is end:
+            return
+        yield item
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Watch mode: the URL lists dropped in a folder are processed as they arrive.
+
+A list file is read once it is complete (unchanged for `SETTLE_DELAY`
+seconds), the URLs not done before are queued, and the file is moved to
+the "done" sub-folder. A URL is done once its book is (see
+`Watermark.complete`): a book which failed is queued again if its list is
+dropped again. With `watchdog` installed (`pip install
+izneo-get[watch]`), the new and changed files are notified by the system;
+otherwise the entries of the folder (names, sizes and dates only, not the
+sub-folders nor the content of the files) are listed every `SCAN_INTERVAL`
+seconds.
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .tools import get_unique_name
+from .watermark import Watermark
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+SCAN_INTERVAL = 5.0  # Delay (in seconds) between two listings of the folder, without watchdog.
+SETTLE_DELAY = 2.0  # Delay (in seconds) without change after which a file is considered complete.
+DONE_FOLDER = "done"
+IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload")  # Files being copied.
+
+
+class WatchWatermark(Watermark):
+    """URLs queued from the watched folders, known once their book is done."""
+
+    file_name: str = "watch.json"
+
+
+class FolderWatcher:
+    """URLs of the list files dropped in `folder`, yielded as they arrive.
+
+    Args:
+        folder: the watched folder (its sub-folders are ignored).
+        parse: function returning the URLs and forced titles of the lines of a list file.
+        cache_folder: folder where the URLs done are saved.
+        done_folder: folder where the processed files are moved (default: "done" in `folder`).
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        parse: Callable[[Iterable[str]], Iterable[Tuple[str, str]]],
+        cache_folder: Optional[str] = None,
+        done_folder: Optional[str] = None,
+    ) -> None:
+        self.folder = folder
+        self.parse = parse
+        self.done_folder = done_folder or os.path.join(folder, DONE_FOLDER)
+        self.source = os.path.abspath(folder)
+        self.watermark = WatchWatermark(cache_folder)
+        self._changed: "queue.Queue[str]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._observer = None
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        os.makedirs(self.done_folder, exist_ok=True)
+        self._start()
+        print(f'Watching "{self.folder}"')
+        # Files changed recently: their last size and date, and the time of their last change.
+        pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        try:
+            while not self._stopped.is_set():
+                try:
+                    path = self._changed.get(timeout=SETTLE_DELAY / 2)
+                    pending[path] = (self._get_signature(path), time.monotonic())
+                    continue
+                except queue.Empty:
+                    pass
+                for path, (signature, changed) in list(pending.items()):
+                    current_signature = self._get_signature(path)
+                    if current_signature != signature:
+                        pending[path] = (current_signature, time.monotonic())
+                    elif time.monotonic() - changed >= SETTLE_DELAY:
+                        del pending[path]
+                        if os.path.isfile(path):
+                            yield from self.ingest(path)
+        finally:
+            self.stop()
+
+    def ingest(self, path: str) -> List[Tuple[str, str]]:
+        """Return the URLs of a list file which were not done, and move the file to the done folder."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                books = list(self.parse(f))
+        except (OSError, UnicodeDecodeError) as e:
+            print(f'ERROR: Can\'t read "{path}": {e}')
+            return []
+        new_books = []
+        new_urls = set()
+        for url, forced_title in books:
+            if url not in new_urls and not self.watermark.is_known(self.source, url):
+                new_urls.add(url)
+                new_books.append((url, forced_title))
+        for url, _ in new_books:
+            self.watermark.add_pending(self.source, url, url)
+        self.watermark.save()
+        shutil.move(path, get_unique_name(os.path.join(self.done_folder, os.path.basename(path))))
+        print(f'"{os.path.basename(path)}": {len(new_books)} new URLs, {len(books) - len(new_books)} already done')
+        return new_books
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def _start(self) -> None:
+        # The files already there are processed first.
+        for entry in os.scandir(self.folder):
+            self._notify(entry.path)
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(ListFileHandler(self), self.folder, recursive=False)
+            self._observer.start()
+        else:
+            threading.Thread(target=self._scan_regularly, daemon=True).start()
+
+    def _scan_regularly(self) -> None:
+        signatures = {}
+        while not self._stopped.wait(SCAN_INTERVAL):
+            current_signatures = {entry.path: self._get_signature(entry.path) for entry in os.scandir(self.folder)}
+            for path, signature in current_signatures.items():
+                if signatures.get(path) != signature:
+                    self._notify(path)
+            signatures = current_signatures
+
+    def _notify(self, path: str) -> None:
+        name = os.path.basename(path)
+        if os.path.dirname(os.path.abspath(path)) != self.source or not os.path.isfile(path):
+            # Sub-folders (and the files moved to the done folder) are ignored.
+            return
+        if name.startswith(".") or name.lower().endswith(IGNORED_SUFFIXES):
+            return
+        self._changed.put(path)
+
+    def _get_signature(self, path: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return (-1, -1)
+        return (stat.st_size, stat.st_mtime_ns)
+
+
+class ListFileHandler(FileSystemEventHandler):
+    """Notifies the watcher of the files created, changed or moved into the folder."""
+
+    def __init__(self, watcher: FolderWatcher) -> None:
+        self.watcher = watcher
+
+    def on_created(self, event) -> None:
+        self.watcher._notify(event.src_path)
+
+    def on_modified(self, event) -> None:
+        self.watcher._notify(event.src_path)
+
+    def on_moved(self, event) -> None:
+        self.watcher._notify(event.dest_path)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class Watermark:
+    """Albums already processed by previous syncs, for each listing source.
+
+    The watermark is stored as JSON in the cache folder:
+    `{"library": {"albums": ["1234", ...], "pending": {"<url>": "5678"}, "last_sync": "2024-01-01T00:00:00"}, ...}`.
+    An album listed is pending until its book is done: if it failed or the run
+    was interrupted, it is listed again by the next sync.
+    """
+
+    file_name: str = "sync.json"
+    path: str
+    _sources: Dict[str, Dict]
+    _known: Dict[str, Set[str]]
+
+    def __init__(self, cache_folder: Optional[str] = None) -> None:
+        self.path = f"{cache_folder or '.'}/{self.file_name}"
+        self._sources = {}
+        self._known = {}
+        self._lock = threading.RLock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._sources = json.load(f)
+        for source, infos in self._sources.items():
+            self._known[source] = set(infos.get("albums", []))
+
+    def is_known(self, source: str, album_id: str) -> bool:
+        return album_id in self._known.get(source, set())
+
+    def has_source(self, source: str) -> bool:
+        return source in self._sources
+
+    def add(self, source: str, album_ids: Iterable[str]) -> None:
+        with self._lock:
+            known = self._known.setdefault(source, set())
+            infos = self._sources.setdefault(source, {"albums": []})
+            for album_id in album_ids:
+                if album_id not in known:
+                    known.add(album_id)
+                    infos["albums"].append(album_id)
+            infos["last_sync"] = datetime.now().isoformat(timespec="seconds")
+
+    def add_pending(self, source: str, album_id: str, url: str) -> None:
+        """Remember an album listed from `source`, known once `complete` is called for its `url`."""
+        with self._lock:
+            self._sources.setdefault(source, {"albums": []}).setdefault("pending", {})[url] = album_id
+
+    def get_pending(self, source: str) -> List[str]:
+        """Return the URLs of the albums of `source` listed but not processed yet."""
+        with self._lock:
+            return list(self._sources.get(source, {}).get("pending", {}))
+
+    def complete(self, url: str) -> bool:
+        """Mark the album of `url` as known in all the sources listing it, and save the watermark."""
+        with self._lock:
+            sources = [source for source, infos in self._sources.items() if url in infos.get("pending", {})]
+            for source in sources:
+                self.add(source, [self._sources[source]["pending"].pop(url)])
+            if sources:
+                self.save()
+        return bool(sources)
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._sources, f, indent=2)
+            os.replace(tmp_path, self.path)
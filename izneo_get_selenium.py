@@ -12,7 +12,8 @@ usage: izneo_get_selenium.py [-h] [--session-id SESSION_ID] [--cfduid CFDUID]
                     [--from-page FROM_PAGE] [--limit LIMIT] [--pause PAUSE]
                     [--full-only] [--continue] [--user-agent USER_AGENT]
                     [--webp WEBP] [--tree] [--force-title FORCE_TITLE]
-                    [--encoding ENCODING]
+                    [--encoding ENCODING] [--page-timeout PAGE_TIMEOUT]
+                    [--workers WORKERS]
                     url
 
 Script pour sauvegarder une BD Izneo.
@@ -50,6 +51,11 @@ optional arguments:
                         Le titre à utiliser dans les noms de fichier, à la
                         place de celui trouvé sur la page
   --encoding ENCODING   L'encoding du fichier d'entrée de liste d'URLs (ex : "utf-8")
+  --page-timeout PAGE_TIMEOUT
+                        Temps maximum d'attente (en secondes) du chargement
+                        d'une page (défaut : 10)
+  --workers WORKERS     Nombre de drivers Chrome utilisés en parallèle
+                        (défaut : 1)
 
 CFDUID est la valeur de "cfduid" dans le cookie.
 SESSION_ID est la valeur de "c03aab1711dbd2a02ea11200dde3e3d1" dans le cookie.
@@ -66,6 +72,8 @@ import argparse
 import configparser
 import shutil
 import time
+import queue
+import threading
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.keys import Keys
@@ -75,6 +83,9 @@ import glob
 from io import BytesIO
 import base64
 
+# Nombre de tentatives pour une page annoncée par l'éditeur, avant de considérer que la BD s'arrête là.
+MAX_PAGE_ATTEMPTS = 2
+
 
 def strip_tags(html):
     """Permet de supprimer tous les tags HTML d'une chaine de caractère.
@@ -118,6 +129,7 @@ def requests_retry_session(
     backoff_factor=1,
     status_forcelist=(500, 502, 504),
     session=None,
+    pool_maxsize=10,
 ):
     """Permet de gérer les cas simples de problèmes de connexions."""
     session = session or requests.Session()
@@ -128,7 +140,7 @@ def requests_retry_session(
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
     session.mount("http://", adapter)
     session.mount("https://", adapter)
     return session
@@ -159,10 +171,15 @@ def get_file_content_chrome(driver, uri):
         """
     var uri = arguments[0];
     var callback = arguments[1];
-    var toBase64 = function(buffer){for(var r,n=new Uint8Array(buffer),t=n.length,a=new Uint8Array(4*Math.ceil(t/3)),i=new Uint8Array(64),o=0,c=0;64>c;++c)i[c]="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/".charCodeAt(c);for(c=0;t-t%3>c;c+=3,o+=4)r=n[c]<<16|n[c+1]<<8|n[c+2],a[o]=i[r>>18],a[o+1]=i[r>>12&63],a[o+2]=i[r>>6&63],a[o+3]=i[63&r];return t%3===1?(r=n[t-1],a[o]=i[r>>2],a[o+1]=i[r<<4&63],a[o+2]=61,a[o+3]=61):t%3===2&&(r=(n[t-2]<<8)+n[t-1],a[o]=i[r>>10],a[o+1]=i[r>>4&63],a[o+2]=i[r<<2&63],a[o+3]=61),new TextDecoder("ascii").decode(a)};
     var xhr = new XMLHttpRequest();
-    xhr.responseType = 'arraybuffer';
-    xhr.onload = function(){ callback(toBase64(xhr.response)) };
+    xhr.responseType = 'blob';
+    xhr.onload = function(){
+        // Encodage natif du navigateur, sous forme de "data:...;base64,...".
+        var reader = new FileReader();
+        reader.onload = function(){ callback(reader.result) };
+        reader.onerror = function(){ callback(0) };
+        reader.readAsDataURL(xhr.response);
+    };
     xhr.onerror = function(){ callback(xhr.status) };
     xhr.open('GET', uri);
     xhr.send();
@@ -171,7 +188,711 @@ def get_file_content_chrome(driver, uri):
     )
     if type(result) == int:
         raise Exception("Request failed with status %s" % result)
-    return base64.b64decode(result)
+    return base64.b64decode(result[result.index(",") + 1 :])
+
+
+def get_blob_content_cdp(driver, expression, chunk_size=1 << 20):
+    """Permet de lire le contenu d'un blob JavaScript avec le protocole DevTools de Chrome.
+
+    Le blob est lu directement par le navigateur, sans script intermédiaire
+    ni URL à télécharger.
+
+    Parameters
+    ----------
+    driver : WebDriver
+        Le driver Chrome.
+    expression : str
+        L'expression JavaScript qui désigne le blob (ex : "book.pages[0].jpeg").
+    chunk_size : int
+        La taille des morceaux lus.
+
+    Returns
+    -------
+    bytes
+        Le contenu du blob.
+    """
+    result = driver.execute_cdp_cmd("Runtime.evaluate", {"expression": expression})
+    object_id = result["result"]["objectId"]
+    try:
+        uuid = driver.execute_cdp_cmd("IO.resolveBlob", {"objectId": object_id})["uuid"]
+        handle = "blob:" + uuid
+        content = bytearray()
+        try:
+            while True:
+                chunk = driver.execute_cdp_cmd("IO.read", {"handle": handle, "size": chunk_size})
+                if chunk.get("base64Encoded"):
+                    content += base64.b64decode(chunk["data"])
+                else:
+                    content += chunk["data"].encode("utf-8")
+                if chunk.get("eof"):
+                    break
+        finally:
+            driver.execute_cdp_cmd("IO.close", {"handle": handle})
+    finally:
+        driver.execute_cdp_cmd("Runtime.releaseObject", {"objectId": object_id})
+    return bytes(content)
+
+
+def get_page_content(driver, page):
+    """Permet de récupérer le contenu original de l'image d'une page chargée par le lecteur.
+
+    Le protocole DevTools est utilisé en priorité, sinon le blob est lu par un script.
+    """
+    expression = f"book.pages[{page}].jpeg"
+    try:
+        return get_blob_content_cdp(driver, expression)
+    except Exception:
+        page_js = driver.execute_script(f"return URL.createObjectURL({expression})")
+        return get_file_content_chrome(driver, page_js)
+
+
+def wait_for_book(driver, timeout):
+    """Permet d'attendre que le lecteur ait défini l'objet `book` de la page courante.
+
+    Parameters
+    ----------
+    driver : WebDriver
+        Le driver Chrome.
+    timeout : float
+        Le temps maximum d'attente (en secondes).
+
+    Returns
+    -------
+    dict
+        L'objet `book`, ou None s'il n'est pas apparu à temps.
+    """
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return driver.execute_async_script(
+            """
+        var timeout = arguments[0];
+        var callback = arguments[arguments.length - 1];
+        var getBook = function(){ try { return book; } catch (e) { return null; } };
+        if (getBook() || timeout <= 0) { callback(getBook()); return; }
+        var check = setInterval(function(){ if (getBook()) { clearInterval(check); clearTimeout(timer); callback(getBook()); } }, 50);
+        var timer = setTimeout(function(){ clearInterval(check); callback(null); }, timeout * 1000);
+        """,
+            timeout,
+        )
+    except Exception:
+        return None
+
+
+def wait_for_page(driver, page, timeout):
+    """Permet d'attendre que l'image d'une page soit chargée par le lecteur.
+
+    L'attente est faite dans le navigateur : le script se termine dès que le lecteur
+    affecte le blob de la page (ou immédiatement s'il est déjà présent).
+
+    Parameters
+    ----------
+    driver : WebDriver
+        Le driver Chrome.
+    page : int
+        L'index de la page dans `book.pages`.
+    timeout : float
+        Le temps maximum d'attente (en secondes).
+
+    Returns
+    -------
+    int
+        La taille du blob de la page, ou 0 si la page n'a pas été chargée à temps.
+    """
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return (
+            driver.execute_async_script(
+                """
+        var page = arguments[0];
+        var timeout = arguments[1];
+        var callback = arguments[arguments.length - 1];
+        var done = false;
+        var finish = function(size){ if (!done) { done = true; clearInterval(check); clearTimeout(timer); callback(size); } };
+        var getSize = function(){ try { var jpeg = book.pages[page].jpeg; return jpeg && jpeg.size ? jpeg.size : 0; } catch (e) { return 0; } };
+        var hooked = false;
+        var hook = function(){
+            // On intercepte l'affectation du blob pour être prévenu dès qu'il est chargé.
+            try {
+                var p = book.pages[page];
+                var value = p.jpeg;
+                Object.defineProperty(p, "jpeg", {
+                    configurable: true,
+                    enumerable: true,
+                    get: function(){ return value; },
+                    set: function(v){ value = v; if (v && v.size) { finish(v.size); } }
+                });
+                hooked = true;
+            } catch (e) {}
+        };
+        // Tant que la page n'existe pas encore dans le lecteur, on vérifie régulièrement.
+        var check = setInterval(function(){ if (getSize()) { finish(getSize()); } else if (!hooked) { hook(); } }, 50);
+        var timer = setTimeout(function(){ finish(0); }, timeout * 1000);
+        if (getSize()) { finish(getSize()); } else { hook(); }
+        """,
+                page,
+                timeout,
+            )
+            or 0
+        )
+    except Exception:
+        return 0
+
+
+def create_driver(prefered_driver, dimension):
+    """Permet de démarrer un driver Chrome sans interface.
+
+    Parameters
+    ----------
+    prefered_driver : str
+        Le chemin du driver à essayer en premier.
+    dimension : int
+        La taille de la fenêtre.
+
+    Returns
+    -------
+    tuple
+        Le driver (None si aucun driver n'a fonctionné) et le chemin du driver utilisé.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--log-level=3")  # Seulement les erreurs fatales.
+    chrome_driver = prefered_driver
+    driver = None
+    try:
+        driver = webdriver.Chrome(chrome_driver, options=chrome_options)
+    except:
+        # Ce driver n'est pas compatible.
+        print(f'Impossible de se connecter avec le driver "{chrome_driver}"')
+        for filename in glob.iglob("./**/chromedriver*.exe", recursive=True):
+            chrome_driver = filename
+            try:
+                driver = webdriver.Chrome(chrome_driver, options=chrome_options)
+            except:
+                print(f'Impossible de se connecter avec le driver "{chrome_driver}"')
+                continue
+            if filename != prefered_driver:
+                prefered_driver = filename
+                print(
+                    f"Vous pouvez ajouter / modifier la ligne suivante à votre fichier de configuration :"
+                )
+                print(f"prefered_driver = {prefered_driver}")
+            break
+    if driver:
+        driver.set_window_size(dimension, dimension)
+    return driver, prefered_driver
+
+
+def init_driver_cookies(driver, url, cfduid, session_id):
+    """Permet de définir les cookies de session dans un driver."""
+    driver.get(url)
+    driver.add_cookie({"name": "__cfduid", "value": cfduid, "domain": "izneo.com"})
+    driver.add_cookie({"name": "lang", "value": "fr", "domain": "izneo.com"})
+    driver.add_cookie(
+        {
+            "name": "c03aab1711dbd2a02ea11200dde3e3d1",
+            "value": session_id,
+            "domain": "izneo.com",
+        }
+    )
+
+
+class BookJob:
+    """Une BD en cours de téléchargement, dont les pages sont réparties entre les drivers."""
+
+    def __init__(self, url, url_id, title, save_path, nb_pages, nb_digits, nb_pages_to_grab):
+        self.url = url
+        self.url_id = url_id
+        self.title = title
+        self.save_path = save_path
+        self.nb_pages = nb_pages
+        self.nb_digits = nb_digits
+        self.next_page = 0
+        # Index de la première page à ne pas récupérer (diminue si une page n'est pas trouvée).
+        self.end_page = nb_pages_to_grab
+        self.in_progress = 0
+        # Une page au-delà des pages annoncées est en cours : on cherche la fin de la BD une page à la fois.
+        self.probing = False
+        # Pages en échec, à demander de nouveau, et nombre de tentatives de chaque page.
+        self.retry_pages = []
+        self.attempts = {}
+        # Pages enregistrées pendant cette exécution.
+        self.stored_pages = set()
+        self.progress_bar = ""
+        self.lock = threading.Lock()
+
+    def take_page(self):
+        """Renvoie l'index de la prochaine page à récupérer, ou None s'il n'y en a pas pour le moment."""
+        with self.lock:
+            if self.retry_pages:
+                page = self.retry_pages.pop(0)
+            elif self.next_page >= self.end_page:
+                return None
+            elif self.next_page >= self.nb_pages and self.probing:
+                # Chaque page absente coûte `page_timeout` au driver qui l'attend : les autres drivers
+                # ne cherchent pas au-delà de la fin en même temps.
+                return None
+            else:
+                page = self.next_page
+                self.next_page += 1
+            self.probing = self.probing or page >= self.nb_pages
+            self.attempts[page] = self.attempts.get(page, 0) + 1
+            self.in_progress += 1
+            return page
+
+    def page_done(self, page, status):
+        """Enregistre le résultat d'une page ("x" : déjà présente, "." : récupérée, "" : échec).
+
+        Une page annoncée en échec est demandée de nouveau ; au-delà, ou après `MAX_PAGE_ATTEMPTS`
+        tentatives, la BD s'arrête à cette page.
+
+        Returns
+        -------
+        bool
+            True si c'était la dernière page en cours et qu'il n'y en a plus à récupérer.
+        """
+        with self.lock:
+            self.in_progress -= 1
+            if page >= self.nb_pages:
+                self.probing = False
+            if status:
+                if status == ".":
+                    self.stored_pages.add(page)
+                self.progress_bar += status
+                print_progress(self, page)
+            elif page < min(self.nb_pages, self.end_page) and self.attempts[page] < MAX_PAGE_ATTEMPTS:
+                self.retry_pages.append(page)
+            else:
+                self.end_page = min(self.end_page, page)
+            self.retry_pages = [retry_page for retry_page in self.retry_pages if retry_page < self.end_page]
+            return self.in_progress == 0 and not self.retry_pages and self.next_page >= self.end_page
+
+    def get_extra_pages(self):
+        """Renvoie les pages enregistrées après la fin de la BD (récupérées par un autre driver avant l'échec)."""
+        with self.lock:
+            return sorted(page for page in self.stored_pages if page >= self.end_page)
+
+
+class Scheduler:
+    """Distribue le travail entre les drivers.
+
+    Les pages des BDs en cours sont prioritaires ; quand il n'y en a plus,
+    un driver prend la prochaine URL de la file partagée.
+    """
+
+    def __init__(self, url_list):
+        self.urls = queue.Queue()
+        for url in url_list:
+            self.urls.put(url)
+        self.jobs = []
+        self.resolving = 0
+        self.stopped = False
+        self.condition = threading.Condition()
+
+    def next_task(self):
+        """Renvoie (BookJob, page), ([url, titre forcé], None), ou None quand tout est terminé."""
+        with self.condition:
+            while True:
+                for job in self.jobs:
+                    page = job.take_page()
+                    if page is not None:
+                        return job, page
+                if not self.stopped:
+                    try:
+                        url = self.urls.get_nowait()
+                        self.resolving += 1
+                        return url, None
+                    except queue.Empty:
+                        pass
+                # Une BD en cours d'analyse, ou une BD dont les pages sont en cours, peut encore apporter des pages.
+                if not self.resolving and not self.jobs:
+                    return None
+                self.condition.wait()
+
+    def book_resolved(self, job, stop=False):
+        with self.condition:
+            self.resolving -= 1
+            self.stopped = self.stopped or stop
+            if job:
+                self.jobs.append(job)
+            self.condition.notify_all()
+
+    def page_finished(self):
+        # Une page en échec ou la fin de la recherche des pages supplémentaires libère du travail.
+        with self.condition:
+            self.condition.notify_all()
+
+    def book_finished(self, job):
+        with self.condition:
+            if job in self.jobs:
+                self.jobs.remove(job)
+            self.condition.notify_all()
+
+
+print_lock = threading.Lock()
+# Options de la ligne de commande, renseignées au lancement du script.
+options = argparse.Namespace()
+
+
+def print_progress(job, page):
+    with print_lock:
+        progress_message = (
+            "\r"
+            + "[page "
+            + str(page + options.from_page)
+            + " / ~"
+            + str(job.nb_pages)
+            + "] "
+            + job.progress_bar
+            + " "
+        )
+        print(progress_message, end="")
+        sys.stdout.flush()
+
+
+def get_book_job(driver, s, url, force_title):
+    """Permet de récupérer les informations d'une BD et de préparer son téléchargement.
+
+    Returns
+    -------
+    tuple
+        Le BookJob (None si la BD n'est pas à télécharger) et un booléen
+        indiquant s'il faut arrêter de traiter les URLs suivantes.
+    """
+    print("URL: " + url)
+
+    # On regarde si c'est un lien direct ou une page de description du livre.
+    driver.get(url)
+    # Seul le lecteur définit l'objet "book" : inutile de l'attendre sur une page de description.
+    book = wait_for_book(driver, options.page_timeout if "/read/" in url else 0)
+    if book:
+        # C'est un lien direct.
+        print("[INFO] URL directe")
+        page_sup_to_grab = 0
+        title = book["title"]
+        title = html.unescape(title)
+        title = clean_name(title)
+        subtitle = book["subtitle"]
+        if len(subtitle):
+            title = title + " - " + subtitle
+        nb_pages = len(book["pages"])
+        nb_digits = max(3, len(str(nb_pages + page_sup_to_grab)))
+        categories = book["albumUrl"].split("/")
+        serie = ""
+        tome = ""
+        author = ""
+        url_id = re.search(".+-(.+)/read/(.+)", url)[1]
+        url = re.search("(.+)/read/(.+)", url)[1]
+    else:
+        # C'est la page de description d'une BD
+        page_sup_to_grab = 20
+        # On récupère les informations de la BD à récupérer.
+        # r = s.get(url, cookies=s.cookies, allow_redirects=True)
+        r = requests_retry_session(session=s).get(
+            url, cookies=s.cookies, allow_redirects=True
+        )
+        html_one_line = r.text.replace("\n", "").replace("\r", "")
+
+        soup = BeautifulSoup(html_one_line, features="html.parser")
+
+        is_abo = False
+        div = soup.find("div", id="product_cover")
+        if div:
+            is_abo = div.find_all("div", class_="corner abo")
+            is_abo = True if is_abo else False
+
+        if not is_abo:
+            print("Cette BD n'est pas disponible dans l'abonnement")
+        if options.full_only and not is_abo:
+            return None, False
+
+        # Le titre.
+        title = re.findall(
+            "<title>(.+?)- (.*) à lire en ligne</title>", html_one_line
+        )
+        if title:
+            title = strip_tags(title[0][0]).strip()
+        else:
+            title = re.findall(
+                '<h1 class="product-title" itemprop="name">(.+?)</h1>',
+                html_one_line,
+            )
+            if title:
+                title = strip_tags(title[0]).strip()
+            else:
+                title = re.findall(
+                    '<meta property="og:title" content="(.+?)" />', html_one_line
+                )
+                if len(title) > 0:
+                    title = strip_tags(title[0]).strip()
+                else:
+                    title = ""
+        title = html.unescape(title)
+        title = clean_name(title)
+
+        # Le tome.
+        tome = re.findall('<div class="widget"(.+?)</div>', html_one_line)
+        if tome:
+            tome = re.findall(
+                '<section class="widget__section">(.+?)</section>', tome[0]
+            )
+            if tome:
+                tome = strip_tags(tome[0]).strip() + ""
+                tome = tome.replace(":", " ").replace("/", "-")
+                tome = html.unescape(tome)
+                tome = clean_name(tome)
+                tome = (" - " + tome) if tome != title else ""
+            else:
+                tome = ""
+        else:
+            tome = ""
+
+        # C'est toujours l'auteur qui se trouve dans le champ "série".
+        # La série (si elle est spécifiée).
+        author = re.findall(
+            '<h2 class="product-serie" itemprop="isPartOf">(.+?)</div>',
+            html_one_line,
+        )
+        if author:
+            author = strip_tags(author[0]).strip()
+            author = " (" + re.sub(r"\s+", " ", author) + ")"
+        else:
+            author = ""
+        author = html.unescape(author)
+        author = clean_name(author)
+
+        serie = ""
+
+        # Le nombre de pages annoncé.
+        nb_pages = re.findall("Nb de pages</dt>(.+?)</dd>", html_one_line)
+        if len(nb_pages) > 0:
+            nb_pages = int(strip_tags(nb_pages[0]).strip())
+        else:
+            nb_pages = 999
+        nb_digits = max(3, len(str(nb_pages + page_sup_to_grab)))
+        page_sup_to_grab = 999
+
+        # Si on n'a pas les informations de base, on arrête tout de suite.
+        if not title:
+            print("ERROR Impossible de trouver le livre")
+            return None, True
+
+        url_id = re.search(".+-(.+)", url)[1]
+        categories = url.replace(root_path, "").split("/")
+
+    # Création du répertoire de destination.
+    mid_path = ""
+    if options.tree:
+        for elem in categories[:-1]:
+            res = re.findall(r"(.+)-\d+", elem)
+            if len(res) > 0:
+                elem = res[0]
+            mid_path += elem
+            os.makedirs(options.output_folder + "/" + mid_path, exist_ok=True)
+            mid_path += "/"
+
+    if force_title:
+        print(
+            'Téléchargement de "'
+            + clean_name(title + serie + author)
+            + '" en tant que "'
+            + clean_name(force_title)
+            + '"'
+        )
+        title = clean_name(force_title)
+        save_path = options.output_folder + "/" + mid_path + title
+    else:
+        print(
+            'Téléchargement de "' + clean_name(title + serie + tome + author) + '"'
+        )
+        save_path = (
+            options.output_folder
+            + "/"
+            + mid_path
+            + clean_name(title + serie + tome + author)
+        )
+
+    print("{nb_pages} pages attendues".format(nb_pages=nb_pages))
+
+    # Si l'archive existe déjà, on ne télécharge pas cette BD.
+    if options.continue_from_existing and os.path.exists(save_path + ".cbz"):
+        print(save_path + ".cbz existe déjà, on passe")
+        return None, False
+    os.makedirs(save_path, exist_ok=True)
+    print("Destination : " + save_path)
+
+    # Reset du bookmark
+    data = {"book": url_id, "page": 0}
+    r = requests_retry_session(session=s).post(
+        "https://www.izneo.com/book/updatebookmark",
+        cookies=s.cookies,
+        allow_redirects=True,
+        json=data,
+    )
+
+    return (
+        BookJob(
+            url,
+            url_id,
+            title,
+            save_path,
+            nb_pages,
+            nb_digits,
+            min(nb_pages + page_sup_to_grab, options.nb_page_limit),
+        ),
+        False,
+    )
+
+
+def download_page(driver, job, page):
+    """Permet de récupérer une page d'une BD.
+
+    Returns
+    -------
+    str
+        "x" si la page était déjà présente, "." si elle a été récupérée, "" en cas d'échec.
+    """
+    page_num = page + options.from_page
+    store_path, store_path_webp = get_page_paths(job, page)
+
+    page_url = job.url + "/read/" + str(page_num) + "?exiturl=" + job.url
+    page_url_previous = job.url + "/read/" + str(page_num - 1) + "?exiturl=" + job.url
+    # Si la page existe déjà sur le disque, on passe.
+    if options.continue_from_existing and (
+        (
+            not options.webp
+            and os.path.exists(store_path)
+            and os.path.getsize(store_path)
+        )
+        or (
+            options.webp
+            and os.path.exists(store_path_webp)
+            and os.path.getsize(store_path_webp)
+        )
+    ):
+        return "x"
+
+    driver.get(page_url)
+    loaded = False
+    page_size = wait_for_page(driver, page, options.page_timeout)
+    if page_size:
+        try:
+            bytes = get_page_content(driver, page)
+            if len(bytes) >= page_size:
+                loaded = True
+        except Exception:
+            pass
+
+    if loaded == False or (
+        page_url != driver.current_url
+        and page_url_previous != driver.current_url
+    ):
+        with print_lock:
+            print()
+            if page_url != driver.current_url:
+                print(f"[ERROR] Impossible de récupérer la page {page}")
+            if page < job.nb_pages:
+                print(
+                    "[WARNING] On a récupéré "
+                    + str(page)
+                    + " pages ("
+                    + str(job.nb_pages)
+                    + " annoncées par l'éditeur)"
+                )
+        return ""
+
+    # Si demandé, on converti en webp.
+    if options.webp:
+        im = Image.open(BytesIO(bytes))
+        im.save(store_path_webp, "webp", quality=options.webp)
+    elif bytes[:3] == b"\xff\xd8\xff":
+        # L'image est déjà au format JPEG : on l'enregistre telle quelle.
+        with open(store_path, "wb") as f:
+            f.write(bytes)
+    else:
+        im = Image.open(BytesIO(bytes))
+        im.save(store_path)
+
+    time.sleep(options.pause_sec)
+    return "."
+
+
+def get_page_paths(job, page):
+    """Renvoie les chemins de la page au format JPEG et au format WEBP."""
+    page_txt = ("000000000" + str(page + options.from_page))[-job.nb_digits :]
+    store_path = job.save_path + "/" + job.title + " " + page_txt
+    return store_path + ".jpg", store_path + ".webp"
+
+
+def finish_book(job):
+    """Permet de créer l'archive d'une BD dont toutes les pages ont été traitées."""
+    save_path = job.save_path
+    # La BD s'arrête à la première page manquante : les pages suivantes ne sont pas gardées.
+    for page in job.get_extra_pages():
+        for path in get_page_paths(job, page):
+            if os.path.exists(path):
+                os.remove(path)
+    with print_lock:
+        print("OK")
+
+    # Si besoin, on crée une archive.
+    if options.output_format == "cbz" or options.output_format == "both":
+        print("Création du CBZ")
+        # Dans le cas où un fichier du même nom existe déjà, on change de nom.
+        filler_txt = ""
+        if os.path.exists(save_path + ".zip"):
+            filler_txt += "_"
+            max_attempts = 20
+            while (
+                os.path.exists(save_path + filler_txt + ".zip") and max_attempts > 0
+            ):
+                filler_txt += "_"
+                max_attempts -= 1
+        shutil.make_archive(save_path + filler_txt, "zip", save_path)
+
+        filler_txt2 = ""
+        if os.path.exists(save_path + ".cbz"):
+            filler_txt2 += "_"
+            max_attempts = 20
+            while (
+                os.path.exists(save_path + filler_txt2 + ".cbz")
+                and max_attempts > 0
+            ):
+                filler_txt2 += "_"
+                max_attempts -= 1
+        os.rename(save_path + filler_txt + ".zip", save_path + filler_txt2 + ".cbz")
+
+    # Si besoin, on supprime le répertoire des JPG.
+    if options.output_format == "cbz":
+        shutil.rmtree(save_path)
+
+
+def run_worker(scheduler, driver, s):
+    """Traite les BDs et les pages de la file partagée avec un driver, jusqu'à ce qu'il n'y ait plus rien à faire."""
+    while (task := scheduler.next_task()) is not None:
+        item, page = task
+        if page is None:
+            job, stop = None, False
+            try:
+                job, stop = get_book_job(driver, s, item[0], item[1])
+            except Exception as e:
+                print(f"[ERROR] {item[0]} : {e}")
+            finally:
+                scheduler.book_resolved(job, stop)
+            if job and job.end_page == 0:
+                finish_book(job)
+                scheduler.book_finished(job)
+            continue
+        job = item
+        status = ""
+        try:
+            status = download_page(driver, job, page)
+        except Exception as e:
+            print(f"[ERROR] Page {page} : {e}")
+        if job.page_done(page, status):
+            finish_book(job)
+            scheduler.book_finished(job)
+        else:
+            scheduler.page_finished()
 
 
 if __name__ == "__main__":
@@ -277,6 +998,18 @@ if __name__ == "__main__":
         default=4320,
         help="La taille de l'image attendue (défaut : 2160)",
     )
+    parser.add_argument(
+        "--page-timeout",
+        type=float,
+        default=None,
+        help="Temps maximum d'attente (en secondes) du chargement d'une page (défaut : 10)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Nombre de drivers Chrome utilisés en parallèle (défaut : 1)",
+    )
     args = parser.parse_args()
 
     # Lecture de la config.
@@ -304,6 +1037,8 @@ if __name__ == "__main__":
     user_agent = get_param_or_default(config, "user_agent", "", args.user_agent)
     pause_sec = get_param_or_default(config, "pause", "", args.pause)
     dimension = get_param_or_default(config, "pause", "", args.dimension)
+    page_timeout = float(get_param_or_default(config, "page_timeout", 10, args.page_timeout))
+    workers = max(1, int(get_param_or_default(config, "workers", 1, args.workers)))
     output_folder = get_param_or_default(
         config,
         "output_folder",
@@ -351,46 +1086,19 @@ if __name__ == "__main__":
     else:
         url_list.append([url, force_title])
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--log-level=3")  # Seulement les erreurs fatales.
-    chrome_driver = prefered_driver
-    try:
-        driver = webdriver.Chrome(chrome_driver, options=chrome_options)
-    except:
-        # Ce driver n'est pas compatible.
-        print(f'Impossible de se connecter avec le driver "{chrome_driver}"')
-        for filename in glob.iglob("./**/chromedriver*.exe", recursive=True):
-            chrome_driver = filename
-            try:
-                driver = webdriver.Chrome(chrome_driver, options=chrome_options)
-            except:
-                print(f'Impossible de se connecter avec le driver "{chrome_driver}"')
-                continue
-            if filename != prefered_driver:
-                prefered_driver = filename
-                print(
-                    f"Vous pouvez ajouter / modifier la ligne suivante à votre fichier de configuration :"
-                )
-                print(f"prefered_driver = {prefered_driver}")
-            break
-
-    driver.set_window_size(dimension, dimension)
-    driver.get(url_list[0][0])
-    driver.add_cookie({"name": "__cfduid", "value": cfduid, "domain": "izneo.com"})
-    driver.add_cookie({"name": "lang", "value": "fr", "domain": "izneo.com"})
-    driver.add_cookie(
-        {
-            "name": "c03aab1711dbd2a02ea11200dde3e3d1",
-            "value": session_id,
-            "domain": "izneo.com",
-        }
+    options.__dict__.update(
+        output_folder=output_folder,
+        output_format=output_format,
+        nb_page_limit=nb_page_limit,
+        from_page=from_page,
+        full_only=full_only,
+        continue_from_existing=continue_from_existing,
+        webp=webp,
+        tree=tree,
+        pause_sec=pause_sec,
+        page_timeout=page_timeout,
     )
 
-    config["DEFAULT"]["prefered_driver"] = prefered_driver
-    # with open(config_name, "w") as configfile:
-    #     config.write(configfile)
-
     # Création d'une session et création du cookie.
     s = requests.Session()
     cookie_obj = requests.cookies.create_cookie(
@@ -405,349 +1113,35 @@ if __name__ == "__main__":
         domain=".izneo.com", name="c03aab1711dbd2a02ea11200dde3e3d1", value=session_id
     )
     s.cookies.set_cookie(cookie_obj)
+    requests_retry_session(session=s, pool_maxsize=workers)
 
-    for url in url_list:
-        force_title = url[1]
-        url = url[0]
-        print("URL: " + url)
-
-        # On regarde si c'est un lien direct ou une page de description du livre.
-        driver.get(url)
-        time.sleep(0.5)
-        book = None
-        try:
-            book = driver.execute_script(f"return book")
-        except:
-            pass
-        if book:
-            # C'est un lien direct.
-            print("[INFO] URL directe")
-            page_sup_to_grab = 0
-            title = book["title"]
-            title = html.unescape(title)
-            title = clean_name(title)
-            subtitle = book["subtitle"]
-            if len(subtitle):
-                title = title + " - " + subtitle
-            nb_pages = len(book["pages"])
-            nb_digits = max(3, len(str(nb_pages + page_sup_to_grab)))
-            categories = book["albumUrl"].split("/")
-            serie = ""
-            tome = ""
-            author = ""
-            url_id = re.search(".+-(.+)/read/(.+)", url)[1]
-            url = re.search("(.+)/read/(.+)", url)[1]
-        else:
-            # C'est la page de description d'une BD
-            page_sup_to_grab = 20
-            # On récupère les informations de la BD à récupérer.
-            # r = s.get(url, cookies=s.cookies, allow_redirects=True)
-            r = requests_retry_session(session=s).get(
-                url, cookies=s.cookies, allow_redirects=True
-            )
-            html_one_line = r.text.replace("\n", "").replace("\r", "")
-
-            soup = BeautifulSoup(html_one_line, features="html.parser")
-
-            is_abo = False
-            div = soup.find("div", id="product_cover")
-            if div:
-                is_abo = div.find_all("div", class_="corner abo")
-                is_abo = True if is_abo else False
-
-            if not is_abo:
-                print("Cette BD n'est pas disponible dans l'abonnement")
-            if full_only and not is_abo:
-                continue
-
-            # Le titre.
-            title = re.findall(
-                "<title>(.+?)- (.*) à lire en ligne</title>", html_one_line
-            )
-            if title:
-                title = strip_tags(title[0][0]).strip()
-            else:
-                title = re.findall(
-                    '<h1 class="product-title" itemprop="name">(.+?)</h1>',
-                    html_one_line,
-                )
-                if title:
-                    title = strip_tags(title[0]).strip()
-                else:
-                    title = re.findall(
-                        '<meta property="og:title" content="(.+?)" />', html_one_line
-                    )
-                    if len(title) > 0:
-                        title = strip_tags(title[0]).strip()
-                    else:
-                        title = ""
-            title = html.unescape(title)
-            title = clean_name(title)
-
-            # Le tome.
-            tome = re.findall('<div class="widget"(.+?)</div>', html_one_line)
-            if tome:
-                tome = re.findall(
-                    '<section class="widget__section">(.+?)</section>', tome[0]
-                )
-                if tome:
-                    tome = strip_tags(tome[0]).strip() + ""
-                    tome = tome.replace(":", " ").replace("/", "-")
-                    tome = html.unescape(tome)
-                    tome = clean_name(tome)
-                    tome = (" - " + tome) if tome != title else ""
-                else:
-                    tome = ""
-            else:
-                tome = ""
-
-            # C'est toujours l'auteur qui se trouve dans le champ "série".
-            # La série (si elle est spécifiée).
-            author = re.findall(
-                '<h2 class="product-serie" itemprop="isPartOf">(.+?)</div>',
-                html_one_line,
-            )
-            if author:
-                author = strip_tags(author[0]).strip()
-                author = " (" + re.sub(r"\s+", " ", author) + ")"
-            else:
-                author = ""
-            author = html.unescape(author)
-            author = clean_name(author)
-
-            serie = ""
-
-            # # L'auteur (s'il est spécifié).
-            # author = re.findall("<div class=\"author\" itemprop=\"author\">(.+?)</div>", html_one_line)
-            # if author:
-            #     author = strip_tags(author[0]).strip()
-            #     author = " (" + re.sub(r"\s+", " ", author) + ")"
-            # else:
-            #     author = ""
-            # author = html.unescape(author)
-            # author = clean_name(author)
-
-            # Le nombre de pages annoncé.
-            nb_pages = re.findall("Nb de pages</dt>(.+?)</dd>", html_one_line)
-            if len(nb_pages) > 0:
-                nb_pages = int(strip_tags(nb_pages[0]).strip())
-            else:
-                nb_pages = 999
-            nb_digits = max(3, len(str(nb_pages + page_sup_to_grab)))
-            page_sup_to_grab = 999
-
-            # Si on n'a pas les informations de base, on arrête tout de suite.
-            if not title:
-                print("ERROR Impossible de trouver le livre")
-                break
-
-            url_id = re.search(".+-(.+)", url)[1]
-            categories = url.replace(root_path, "").split("/")
-
-        # Création du répertoire de destination.
-        mid_path = ""
-        if tree:
-            for elem in categories[:-1]:
-                res = re.findall(r"(.+)-\d+", elem)
-                if len(res) > 0:
-                    elem = res[0]
-                mid_path += elem
-                if not os.path.exists(output_folder + "/" + mid_path):
-                    os.mkdir(output_folder + "/" + mid_path)
-                mid_path += "/"
-
-        if force_title:
-            print(
-                'Téléchargement de "'
-                + clean_name(title + serie + author)
-                + '" en tant que "'
-                + clean_name(force_title)
-                + '"'
-            )
-            title = clean_name(force_title)
-            save_path = output_folder + "/" + mid_path + title
-        else:
-            print(
-                'Téléchargement de "' + clean_name(title + serie + tome + author) + '"'
-            )
-            save_path = (
-                output_folder
-                + "/"
-                + mid_path
-                + clean_name(title + serie + tome + author)
-            )
-
-        print("{nb_pages} pages attendues".format(nb_pages=nb_pages))
-
-        # Si l'archive existe déjà, on ne télécharge pas cette BD.
-        if continue_from_existing and os.path.exists(save_path + ".cbz"):
-            print(save_path + ".cbz existe déjà, on passe")
-            continue
-        if not os.path.exists(save_path):
-            os.mkdir(save_path)
-        print("Destination : " + save_path)
-
-        # Les changements sont essentiellement à partir d'ici.
-
-        # Reset du bookmark
-        data = {"book": url_id, "page": 0}
-        r = requests_retry_session(session=s).post(
-            "https://www.izneo.com/book/updatebookmark",
-            cookies=s.cookies,
-            allow_redirects=True,
-            json=data,
-        )
-
-        progress_bar = ""
-        # On boucle sur toutes les pages de la BD.
-        for page in range(min(nb_pages + page_sup_to_grab, nb_page_limit)):
-            page_num = page + from_page
-
-            page_txt = ("000000000" + str(page_num))[-nb_digits:]
-            store_path = save_path + "/" + title + " " + page_txt + ".jpg"
-            store_path_webp = save_path + "/" + title + " " + page_txt + ".webp"
-
-            page_url = url + "/read/" + str(page_num) + "?exiturl=" + url
-            page_url_previous = url + "/read/" + str(page_num - 1) + "?exiturl=" + url
-            # Si la page existe déjà sur le disque, on passe.
-            if continue_from_existing and (
-                (
-                    not webp
-                    and os.path.exists(store_path)
-                    and os.path.getsize(store_path)
-                )
-                or (
-                    webp
-                    and os.path.exists(store_path_webp)
-                    and os.path.getsize(store_path_webp)
-                )
-            ):
-                progress_bar += "x"
-                progress_message = (
-                    "\r"
-                    + "[page "
-                    + str(page_num)
-                    + " / ~"
-                    + str(nb_pages)
-                    + "] "
-                    + progress_bar
-                    + " "
-                )
-                # print("x", end="")
-                print(progress_message, end="")
-                sys.stdout.flush()
-                continue
+    # Chaque driver traite en parallèle les BDs et les pages de la file partagée.
+    drivers = []
+    for _ in range(workers):
+        driver, prefered_driver = create_driver(prefered_driver, dimension)
+        if not driver:
+            break
+        init_driver_cookies(driver, url_list[0][0], cfduid, session_id)
+        drivers.append(driver)
+    if not drivers:
+        print("ERROR Impossible de démarrer un driver Chrome")
+        sys.exit(1)
 
-            driver.get(page_url)
-            time.sleep(0.5)
-            loaded = False
-            attempts = 20
-            while not loaded and attempts > 0:
-                try:
-                    page_size = driver.execute_script(
-                        f"return book.pages[{page}].jpeg.size"
-                    )
-                    page_js = driver.execute_script(
-                        f"return URL.createObjectURL(book.pages[{page}].jpeg)"
-                    )
-                    bytes = get_file_content_chrome(driver, page_js)
-                    if len(bytes) >= page_size:
-                        loaded = True
-                    # canvas = driver.find_element_by_id("iz_canv")
-                    # if len(canvas.screenshot_as_base64) > 10000:
-                    #     # Screenshot of the current page.
-                    #     # Image.open(BytesIO(base64.b64decode(canvas.screenshot_as_base64))).save("tmp.png")
-                    #     loaded = True
-                except:
-                    print("Waiting...")
-                    attempts = attempts - 1
-                    time.sleep(0.5)
-
-            if loaded == False or (
-                page_url != driver.current_url
-                and page_url_previous != driver.current_url
-            ):
-                print()
-                if page_url != driver.current_url:
-                    print(f"[ERROR] Impossible de récupérer la page {page}")
-                if page < nb_pages:
-                    print(
-                        "[WARNING] On a récupéré "
-                        + str(page)
-                        + " pages ("
-                        + str(nb_pages)
-                        + " annoncées par l'éditeur)"
-                    )
-                break
-
-            im = Image.open(BytesIO(bytes))
-            im.save(store_path)
-
-            # canvas_base64 = driver.execute_script(
-            #     "return arguments[0].toDataURL('image/png').substring(21);", canvas
-            # )
-            # # On enlève les 21 premiers caractères qui sont "data:image/png;base64".
-
-            # canvas_png = base64.b64decode(canvas_base64)
-            # im = Image.open(BytesIO(canvas_png))
-            # im = trim(im)
-
-            # Si demandé, on converti en webp.
-            if webp:
-                # im.save(store_path_webp, "webp", quality=webp)
-                im = Image.open(store_path)
-                im.save(store_path_webp, "webp", quality=webp)
-                os.remove(store_path)
-            # else:
-            #     rgb_im = im.convert("RGB")
-            #     rgb_im.save(store_path, quality=100, optimize=True, progressive=True)
-
-            progress_bar += "."
-            progress_message = (
-                "\r"
-                + "[page "
-                + str(page_num)
-                + " / ~"
-                + str(nb_pages)
-                + "] "
-                + progress_bar
-                + " "
-            )
-            # print(".", end="")
-            print(progress_message, end="")
-            sys.stdout.flush()
-            time.sleep(pause_sec)
-        print("OK")
+    config["DEFAULT"]["prefered_driver"] = prefered_driver
+    # with open(config_name, "w") as configfile:
+    #     config.write(configfile)
 
-        # Si besoin, on crée une archive.
-        if output_format == "cbz" or output_format == "both":
-            print("Création du CBZ")
-            # Dans le cas où un fichier du même nom existe déjà, on change de nom.
-            filler_txt = ""
-            if os.path.exists(save_path + ".zip"):
-                filler_txt += "_"
-                max_attempts = 20
-                while (
-                    os.path.exists(save_path + filler_txt + ".zip") and max_attempts > 0
-                ):
-                    filler_txt += "_"
-                    max_attempts -= 1
-            shutil.make_archive(save_path + filler_txt, "zip", save_path)
-
-            filler_txt2 = ""
-            if os.path.exists(save_path + ".cbz"):
-                filler_txt2 += "_"
-                max_attempts = 20
-                while (
-                    os.path.exists(save_path + filler_txt2 + ".cbz")
-                    and max_attempts > 0
-                ):
-                    filler_txt2 += "_"
-                    max_attempts -= 1
-            os.rename(save_path + filler_txt + ".zip", save_path + filler_txt2 + ".cbz")
-
-        # Si besoin, on supprime le répertoire des JPG.
-        if output_format == "cbz":
-            shutil.rmtree(save_path)
-    driver.quit()
+    scheduler = Scheduler(url_list)
+    threads = [
+        threading.Thread(target=run_worker, args=(scheduler, driver, s), daemon=True)
+        for driver in drivers
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        for driver in drivers:
+            driver.quit()
     print("Terminé !")
@@ -3,7 +3,9 @@ __version__ = "0.01"
 """
 Source : https://github.com/izneo-get/izneo-get
 
-usage: izneo_infos.py [-h] [--output OUTPUT_FILE] URL
+usage: izneo_infos.py [-h] [--output OUTPUT_FILE] [--batch BATCH_FILE] [--workers WORKERS] [--rate RATE]
+                      [--cache-folder CACHE_FOLDER]
+                      [URL]
 
 Script pour obtenir les infos sur une BD Izneo.
 
@@ -14,15 +16,68 @@ options:
   -h, --help            show this help message and exit
   --output OUTPUT_FILE, -o OUTPUT_FILE
                         Enregistrer le résultat dans un fichier.
+  --batch BATCH_FILE    Fichier contenant une liste d'URLs ("-" pour l'entrée standard).
+                        Le résultat est écrit au format JSON Lines.
+  --workers WORKERS     Nombre de requêtes simultanées en mode batch (défaut : 8)
+  --rate RATE           Nombre maximum de requêtes par seconde en mode batch (défaut : 10, 0 = illimité)
+  --cache-folder CACHE_FOLDER
+                        Répertoire du cache des informations en mode batch (défaut : .cache)
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+import os
 import re
+import sys
+import time
+import threading
 import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from bs4 import BeautifulSoup
 import json
 from dict2xml import dict2xml
 
 
+class RateLimiter:
+    """Permet de limiter le nombre de requêtes par seconde, entre plusieurs threads."""
+
+    def __init__(self, rate=0):
+        self.interval = 1 / rate if rate else 0
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_until = max(self.next_time, now)
+            self.next_time = wait_until + self.interval
+        time.sleep(wait_until - now)
+
+
+def requests_retry_session(
+    retries=3,
+    backoff_factor=1,
+    status_forcelist=(500, 502, 504),
+    session=None,
+    pool_maxsize=10,
+):
+    """Permet de gérer les cas simples de problèmes de connexions."""
+    session = session or requests.Session()
+    retry = Retry(
+        total=retries,
+        read=retries,
+        connect=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def parse_html(html):
     infos = {}
     soup = BeautifulSoup(html, features="html.parser")
@@ -36,8 +91,10 @@ def parse_html(html):
     return infos
 
 
-def get_infos_from_id(book_id: int, sign: str = ""):
-    r = requests.get(
+def get_infos_from_id(book_id: int, sign: str = "", session=None, limiter=None):
+    if limiter:
+        limiter.wait()
+    r = (session or requests).get(
         f"https://www.izneo.com/book/{book_id}" + (f"?{sign}" if sign else ""),
         allow_redirects=True,
     )
@@ -47,20 +104,146 @@ def get_infos_from_id(book_id: int, sign: str = ""):
     return filtered_infos
 
 
-def get_infos_from_url(url: str):
+def get_infos_from_url(url: str, session=None, limiter=None, verbose=True, raise_errors=False):
     book_infos = {}
-    r = requests.get(url, allow_redirects=True)
+    if limiter:
+        limiter.wait()
+    r = (session or requests).get(url, allow_redirects=True)
     if r.status_code not in [200, 201]:
-        print("Impossible de récupérer la page")
+        if raise_errors:
+            raise requests.HTTPError(f"Impossible de récupérer la page (HTTP {r.status_code})", response=r)
+        if verbose:
+            print("Impossible de récupérer la page")
         return book_infos
     book_infos = parse_html(r.text)
     return book_infos
 
 
+def get_id_and_sign(url: str):
+    """Permet de récupérer l'identifiant du livre et la signature éventuelle d'une URL.
+
+    Parameters
+    ----------
+    url : str
+        L'URL de la BD.
+
+    Returns
+    -------
+    tuple
+        L'identifiant (vide s'il n'a pas été trouvé) et la signature (vide s'il n'y en a pas).
+    """
+    id = re.findall(".+-(\d+)", url)
+    id = id[0] if id else ""
+    sign = ""
+    if re.match("(.+)login=cvs&sign=([^&]*)", url):
+        sign = re.match("(.+)login=cvs&sign=([^&]*)", url)[2]
+        sign = "login=cvs&sign=" + sign
+    return id, sign
+
+
+def read_urls(batch_file: str):
+    """Permet de lire une liste d'URLs dans un fichier ou sur l'entrée standard, au fur et à mesure.
+
+    Les lignes vides et celles qui commencent par "#" sont ignorées.
+    """
+    f = sys.stdin if batch_file == "-" else open(batch_file, "r", encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if line and line[0] != "#":
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# Informations sans lesquelles le résultat n'est pas enregistré dans le cache.
+REQUIRED_INFOS = ["title"]
+
+
+def get_cache_path(cache_folder: str, id: str):
+    return f"{cache_folder}/infos/{id}.json"
+
+
+def wait_for_books(in_progress, cache_folder: str):
+    """Permet d'attendre qu'au moins une des BDs en cours soit terminée.
+
+    Les BDs terminées sont retirées de `in_progress`, enregistrées dans le cache et renvoyées.
+    Un résultat en erreur ou incomplet n'est pas enregistré : il sera demandé de nouveau à la prochaine exécution.
+    """
+    wait([future for book in in_progress for future in book[2:] if not future.done()], return_when=FIRST_COMPLETED)
+    for book in [book for book in in_progress if book[2].done() and book[3].done()]:
+        in_progress.remove(book)
+        url, id, html_future, json_future = book
+        infos = {"url": url, "id": id}
+        try:
+            infos.update(html_future.result())
+            infos.update(json_future.result())
+        except Exception as e:
+            infos["error"] = str(e)
+        if "error" not in infos and (missing := [key for key in REQUIRED_INFOS if not infos.get(key)]):
+            infos["error"] = f"Informations incomplètes (manquantes : {', '.join(missing)})"
+        if "error" not in infos:
+            with open(get_cache_path(cache_folder, id), "w", encoding="utf-8") as f:
+                json.dump(infos, f, ensure_ascii=False)
+        yield infos
+
+
+def batch_infos(urls, workers=8, rate=10, cache_folder=".cache"):
+    """Permet de récupérer les informations d'une liste de BDs en parallèle.
+
+    Pour chaque BD, la page HTML et les informations JSON sont récupérées en même temps,
+    et plusieurs BDs sont traitées simultanément, en respectant une limite de requêtes par seconde.
+    Les informations déjà récupérées sont lues dans le cache.
+
+    Parameters
+    ----------
+    urls : iterable
+        Les URLs des BDs.
+    workers : int
+        Le nombre de requêtes simultanées.
+    rate : float
+        Le nombre maximum de requêtes par seconde (0 = illimité).
+    cache_folder : str
+        Le répertoire du cache.
+
+    Yields
+    ------
+    dict
+        Les informations de chaque BD (avec les clés "url" et "id"), dans l'ordre où elles sont obtenues.
+        En cas de problème, la clé "error" est renseignée.
+    """
+    os.makedirs(f"{cache_folder}/infos", exist_ok=True)
+    session = requests_retry_session(pool_maxsize=workers)
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Pour chaque BD en cours : (url, id, future de la page HTML, future des informations JSON).
+        in_progress = []
+        for url in urls:
+            id, sign = get_id_and_sign(url)
+            if not re.match("^http[s]*://.*", url) or not id:
+                yield {"url": url, "error": "URL invalide"}
+                continue
+            if os.path.exists(get_cache_path(cache_folder, id)):
+                with open(get_cache_path(cache_folder, id), "r", encoding="utf-8") as f:
+                    cached_infos = json.load(f)
+                # Les résultats incomplets enregistrés par les versions précédentes sont demandés de nouveau.
+                if all(cached_infos.get(key) for key in REQUIRED_INFOS):
+                    yield cached_infos
+                    continue
+            html_future = executor.submit(get_infos_from_url, url, session, limiter, False, True)
+            json_future = executor.submit(get_infos_from_id, id, sign, session, limiter)
+            in_progress.append((url, id, html_future, json_future))
+            while len(in_progress) >= workers:
+                yield from wait_for_books(in_progress, cache_folder)
+        while in_progress:
+            yield from wait_for_books(in_progress, cache_folder)
+
+
 def main():
     # Parse des arguments passés en ligne de commande.
     parser = argparse.ArgumentParser(description="""Script pour obtenir les infos sur une BD Izneo.""")
-    parser.add_argument("url", metavar="URL", type=str, default=None, help="L'URL d'une BD.")
+    parser.add_argument("url", metavar="URL", type=str, nargs="?", default=None, help="L'URL d'une BD.")
     parser.add_argument(
         "--output",
         "-o",
@@ -69,23 +252,53 @@ def main():
         default="",
         help="Enregistrer le résultat dans un fichier (JSON ou XML).",
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        metavar="BATCH_FILE",
+        default=None,
+        help='Fichier contenant une liste d\'URLs ("-" pour l\'entrée standard). Le résultat est écrit au format JSON Lines.',
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Nombre de requêtes simultanées en mode batch (défaut : 8)"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=10,
+        help="Nombre maximum de requêtes par seconde en mode batch (défaut : 10, 0 = illimité)",
+    )
+    parser.add_argument(
+        "--cache-folder",
+        type=str,
+        default=".cache",
+        help="Répertoire du cache des informations en mode batch (défaut : .cache)",
+    )
     args = parser.parse_args()
 
     url = args.url
     output_file = args.output
 
+    if args.batch:
+        output = open(output_file, "w", encoding="utf-8") if output_file else sys.stdout
+        try:
+            for infos in batch_infos(read_urls(args.batch), max(1, args.workers), args.rate, args.cache_folder):
+                output.write(json.dumps(infos, ensure_ascii=False) + "\n")
+                output.flush()
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return
+
+    if not url:
+        parser.error("L'URL ou l'option --batch est obligatoire.")
     if not re.match("^http[s]*://.*", url):
         print("URL invalide")
         return
-    id = re.findall(".+-(\d+)", url)
+    id, sign = get_id_and_sign(url)
     if not id:
         print("Impossible de trouver l'identifiant du livre...")
         return
-    id = id[0]
-    sign = ""
-    if re.match("(.+)login=cvs&sign=([^&]*)", url):
-        sign = re.match("(.+)login=cvs&sign=([^&]*)", url)[2]
-        sign = "login=cvs&sign=" + sign
 
     infos = get_infos_from_url(url)
     infos.update(get_infos_from_id(id, sign))
@@ -34,6 +34,8 @@ from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 
+from izneo_get.listing import iter_albums
+
 
 def strip_tags(html):
     """Permet de supprimer tous les tags HTML d'une chaine de caractère.
@@ -151,42 +153,37 @@ def parse_bibliotheque(force_title=False, id: str = ""):
 
 
 def parse_from_id(session, id, force_title=False):
+    session = requests_retry_session(session=session)
     # Infos de la série
     url = f"https://www.izneo.com/fr/api/web/serie/{id}"
-    r = requests_retry_session(session=session).get(url, allow_redirects=True)
+    r = session.get(url, allow_redirects=True)
     content = json.loads(r.text)
     serie_name = content["name"]
 
-    for url_base in [
+    url_bases = [
         f"https://www.izneo.com/fr/api/web/serie/{id}/volumes/new",
         f"https://www.izneo.com/fr/api/web/serie/{id}/others/new",
         f"https://www.izneo.com/fr/api/web/serie/{id}/chapters/new",
-    ]:
-        next_page = True
-        index = 0
-        new_results = 0
-        while next_page:
-            url = f"{url_base}/{index}/20"
-            r = requests_retry_session(session=s).get(url, allow_redirects=True)
-            content = json.loads(r.text)
-            next_page = len(content["albums"])
-            for vol in content["albums"]:
-                is_abo = vol["inSubscription"]
-                link = root_path + vol["url"]
-                title = serie_name + " - "
-                title = title + ("[" + str(vol["volume"]) + "] " if "volume" in vol and vol["volume"] else "")
-                title = title + vol["title"]
-                if not is_abo:
-                    title += " (*)"
-                if title and force_title:
-                    title += " --force-title " + title
-                title = re.sub(r"\s+", " ", title).strip()
-                if title and link and ((not full_only) or (full_only and is_abo)):
-                    print("# " + title)
-                    print(link)
-                if title and link:
-                    new_results += 1
-            index += 20
+    ]
+    new_results = 0
+    # Chaque catégorie est paginée indépendamment : la liste prend le temps de la plus longue,
+    # et les albums sont tout de même affichés dans l'ordre des catégories.
+    for vol in iter_albums(session, url_bases):
+        is_abo = vol["inSubscription"]
+        link = root_path + vol["url"]
+        title = serie_name + " - "
+        title = title + ("[" + str(vol["volume"]) + "] " if "volume" in vol and vol["volume"] else "")
+        title = title + vol["title"]
+        if not is_abo:
+            title += " (*)"
+        if title and force_title:
+            title += " --force-title " + title
+        title = re.sub(r"\s+", " ", title).strip()
+        if title and link and ((not full_only) or (full_only and is_abo)):
+            print("# " + title)
+            print(link)
+        if title and link:
+            new_results += 1
     return new_results
 
 
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.adaptive_concurrency import AdaptiveConcurrency, get_controller, get_retry_after
+
+
+def make_response(status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+def test_get_retry_after():
+    assert get_retry_after(make_response()) is None
+    assert get_retry_after(make_response(429, {"Retry-After": "3"})) == 3
+    assert get_retry_after(make_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert get_retry_after(make_response(429, {"Retry-After": "soon"})) is None
+
+
+def test_aimd():
+    controller = AdaptiveConcurrency(initial=4, maximum=6)
+    for _ in range(4):
+        controller.release(time.monotonic(), make_response())
+    assert 4.9 < controller.limit < 5
+    started = time.monotonic()
+    controller.release(started, make_response(429))
+    assert 2.4 < controller.limit < 2.5
+    # Requests sent before the cut do not cut again.
+    controller.release(started, make_response(503))
+    assert 2.4 < controller.limit < 2.5
+    controller.release(time.monotonic(), error=True)
+    assert 1.2 < controller.limit < 1.25
+    controller.release(time.monotonic(), error=True)
+    assert controller.limit == 1
+    for _ in range(100):
+        controller.release(time.monotonic(), make_response())
+    assert controller.limit == 6
+
+
+def test_retry_after_blocks_requests():
+    controller = AdaptiveConcurrency()
+    controller.release(time.monotonic(), make_response(429, {"Retry-After": "0.2"}))
+
+    async def acquire():
+        started = time.monotonic()
+        await controller.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire()) >= 0.15
+
+
+def test_limit_concurrency():
+    controller = AdaptiveConcurrency(initial=2, maximum=2)
+    running = []
+    max_running = []
+
+    async def request():
+        async with controller.slot() as slot:
+            running.append(1)
+            max_running.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            slot.record(make_response())
+
+    async def main():
+        await asyncio.gather(*[request() for _ in range(10)])
+
+    asyncio.run(main())
+    assert max(max_running) == 2
+    assert controller.in_flight == 0
+
+
+def test_priority():
+    controller = AdaptiveConcurrency(initial=1, maximum=1)
+    order = []
+
+    async def request(priority):
+        async with controller.slot(priority) as slot:
+            order.append(priority)
+            await asyncio.sleep(0.01)
+            slot.record(make_response(429))
+
+    async def main():
+        # The first request holds the only slot while the others are queued.
+        first = asyncio.ensure_future(request((0, 0)))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, *[request(priority) for priority in [(1, 2), (0, 3), (1, 0), (0, 1)]])
+
+    asyncio.run(main())
+    assert order == [(0, 0), (0, 1), (0, 3), (1, 0), (1, 2)]
+    assert controller.in_flight == 0
+
+
+def test_get_controller():
+    assert get_controller("https://www.izneo.com/a") is get_controller("https://www.izneo.com/b")
+    assert get_controller("https://www.izneo.com/a") is not get_controller("https://archive.org/a")
+
+
+if __name__ == "__main__":
+    ...
@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import base64
 import os
 import shutil
 import sys
 from typing import List
+
+import requests
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
 from izneo_get.config import OutputFormat
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from izneo_get.plugins.archive import Archive
+from izneo_get.plugins.archive import Archive, decrypt_data, get_aes_key
 from izneo_get.book_infos import BookInfos
 
 
@@ -67,5 +72,27 @@ def test_get_book_id():
     ...
 
 
+def test_post_process_image_content():
+    with open("tests/resources/uncrypted_image.jpeg", "rb") as f:
+        image = f.read()
+    aes_key = "/BookReader/BookReaderImages.php?zip=/0/items/book/book_jp2.zip&file=0001.jp2"
+    counter = bytes(range(16))
+    counter_b64 = base64.b64encode(counter).decode()
+    encryptor = Cipher(algorithms.AES(get_aes_key(aes_key)), modes.CTR(counter)).encryptor()
+    response = requests.Response()
+    response.url = f"https://ia800000.us.archive.org{aes_key}"
+    response.headers["x-obfuscate"] = f"1|{counter_b64}"
+    response._content = encryptor.update(image[:1024]) + image[1024:]
+
+    # Only the header is decrypted, into its own buffer: the rest of the page is not copied.
+    header, rest = Archive().post_process_image_content(response)
+    assert len(header) == 1024
+    assert header + rest == image
+    assert rest.obj is response.content
+    assert decrypt_data(response.content[:1024], aes_key, counter_b64) == image[:1024]
+    response.headers.pop("x-obfuscate")
+    assert Archive().post_process_image_content(response) is response.content
+
+
 if __name__ == "__main__":
     ...
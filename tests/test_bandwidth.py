@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.bandwidth import ThroughputMeter, TokenBucket, get_bandwidth_limiter
+from izneo_get.tools import http_get
+
+BODY = bytes(range(256)) * 1024  # 256 KiB
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        ...
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=1_000_000, burst=100_000)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(bucket.consume, [50_000] * 8))
+    # 400 000 bytes, 100 000 of them in the initial burst.
+    assert time.monotonic() - started >= 0.28
+
+
+def test_get_bandwidth_limiter():
+    assert get_bandwidth_limiter(0) is None
+    assert get_bandwidth_limiter(None) is None
+    limiter = get_bandwidth_limiter(1024)
+    assert limiter is get_bandwidth_limiter(1024)
+    assert limiter.rate == 1024 * 1024
+
+
+def test_http_get_bandwidth():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/page"
+        meter = ThroughputMeter()
+        started = time.monotonic()
+        response = http_get(url, bandwidth=TokenBucket(rate=1024 * 1024, burst=64 * 1024))
+        meter.add(len(response.content))
+        assert response.content == BODY
+        assert time.monotonic() - started >= 0.15
+        assert meter.nb_bytes == len(BODY)
+        assert http_get(url).content == BODY
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    ...
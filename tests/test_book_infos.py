@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.book_infos import BookInfos, PageKey, PageUrls
+
+
+def test_page_urls():
+    page_urls = PageUrls("https://www.izneo.com/book/4707/", "?type=full", 3)
+    assert len(page_urls) == 3
+    assert page_urls[0] == "https://www.izneo.com/book/4707/0?type=full"
+    assert page_urls[-1] == "https://www.izneo.com/book/4707/2?type=full"
+    assert list(page_urls[1:]) == [
+        "https://www.izneo.com/book/4707/1?type=full",
+        "https://www.izneo.com/book/4707/2?type=full",
+    ]
+    assert page_urls[1:][0] == page_urls[1]
+    assert page_urls == list(page_urls)
+    assert page_urls != list(page_urls)[:2]
+    with pytest.raises(IndexError):
+        page_urls[3]
+
+
+def test_page_urls_items():
+    page_urls = PageUrls(suffix="&scale=0", items=["https://archive.org/a?file=1", "https://archive.org/a?file=3"])
+    assert len(page_urls) == 2
+    assert page_urls[1] == "https://archive.org/a?file=3&scale=0"
+    assert len(page_urls[:1]) == 1
+    assert not PageUrls()
+
+
+def test_book_infos():
+    page_urls = PageUrls("https://www.izneo.com/book/4707/", "", 2)
+    custom_fields = {"pages": [PageKey(b"k", b"i"), None]}
+    book_infos = BookInfos(title="title", pages=2, page_urls=page_urls, custom_fields=custom_fields)
+    assert book_infos == BookInfos(title="title", pages=2, page_urls=list(page_urls), custom_fields=custom_fields)
+    assert "page_urls" not in str(book_infos)
+    assert not hasattr(PageKey(b"k", b"i"), "__dict__")
+
+
+if __name__ == "__main__":
+    ...
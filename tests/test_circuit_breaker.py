@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+    with pytest.raises(CircuitOpen):
+        breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpen):
+        breaker.record_failure()
+    breaker.reset()
+    assert not breaker.is_open
+    breaker.record_failure()
+
+
+if __name__ == "__main__":
+    ...
@@ -19,6 +19,18 @@ EMPTY_CONFIG = Config(
     user_agent=None,
     continue_from_existing=None,
     authentication_from_cache=None,
+    full_only=None,
+    sync=None,
+    connect_timeout_sec=None,
+    read_timeout_sec=None,
+    book_deadline_sec=None,
+    bandwidth_limit=None,
+    books_ahead=None,
+    http2=None,
+    job_queue=None,
+    shard=None,
+    lease_folder=None,
+    watch_folder=None,
 )
 
 DEFAULT_ACTION = Action.from_str("")
@@ -204,6 +216,119 @@ def test_get_args_authentication_from_cache(monkeypatch):
     assert config == expected_config
 
 
+def test_get_args_full_only(monkeypatch):
+    args = ["izneo_get.py", "--full-only"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    assert config.full_only == True
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.full_only = True
+    assert config == expected_config
+
+
+def test_get_args_sync(monkeypatch):
+    args = ["izneo_get.py", "--sync"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    assert config.sync == True
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.sync = True
+    assert config == expected_config
+
+
+def test_get_args_timeouts(monkeypatch):
+    args = ["izneo_get.py", "--connect-timeout", "5", "--read-timeout", "30.5", "--book-deadline", "600"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.connect_timeout_sec = 5
+    expected_config.read_timeout_sec = 30.5
+    expected_config.book_deadline_sec = 600
+    assert config == expected_config
+
+
+def test_get_args_bandwidth_limit(monkeypatch):
+    args = ["izneo_get.py", "--bandwidth-limit", "20480"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.bandwidth_limit = 20480
+    assert config == expected_config
+
+
+def test_get_args_books_ahead(monkeypatch):
+    args = ["izneo_get.py", "--books-ahead", "2"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.books_ahead = 2
+    assert config == expected_config
+
+
+def test_get_args_http2(monkeypatch):
+    args = ["izneo_get.py", "--http2"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.http2 = True
+    assert config == expected_config
+
+
+def test_get_args_job_queue(monkeypatch):
+    args = ["izneo_get.py", "--job-queue"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.job_queue = True
+    assert config == expected_config
+
+
+def test_get_args_shard(monkeypatch):
+    args = ["izneo_get.py", "--shard", "2/3", "--lease-folder", "//nas/izneo"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == DEFAULT_ACTION
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.shard = "2/3"
+    expected_config.lease_folder = "//nas/izneo"
+    assert config == expected_config
+
+
+def test_get_args_watch(monkeypatch):
+    args = ["izneo_get.py", "download", "--watch", "DROP"]
+    monkeypatch.setattr("sys.argv", args)
+    config, action, url, config_file = get_args()
+    assert action == Action.DOWNLOAD
+    assert url is None
+    assert config_file is None
+    expected_config = copy.deepcopy(EMPTY_CONFIG)
+    expected_config.watch_folder = "DROP"
+    assert config == expected_config
+
+
 def test_get_args_multiple(monkeypatch):
     args = [
         "izneo_get.py",
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import crypto
+
+KEY = base64.b64decode("0t3WeNQ1HrrxJKo8qNTQQg==")
+IV = base64.b64decode("YQqHDniN+GSVSga02sekIA==")
+
+
+@pytest.mark.parametrize("name", crypto.BACKENDS)
+def test_backends(name):
+    backend = crypto.load_backend(name)
+    with open("tests/resources/crypted_image.bin", "rb") as f:
+        crypted = f.read()
+    with open("tests/resources/uncrypted_image.jpeg", "rb") as f:
+        uncrypted = f.read()
+    assert backend.decrypt_cbc(crypted, KEY, IV) == uncrypted
+    # Into a preallocated buffer, larger than the data or the data itself.
+    decrypted = bytearray(len(crypted) + 16)
+    backend.decrypt_cbc_into(crypted, KEY, IV, decrypted)
+    assert decrypted[: len(crypted)] == uncrypted
+    decrypted = bytearray(crypted)
+    backend.decrypt_cbc_into(decrypted, KEY, IV, decrypted)
+    assert decrypted == uncrypted
+    # AES-CTR is symmetric, and both backends use the same 128-bit counter.
+    data = os.urandom(1024)
+    reference = crypto.load_backend("cryptography").decrypt_ctr(data, KEY, IV)
+    assert backend.decrypt_ctr(data, KEY, IV) == reference
+    assert backend.decrypt_ctr(reference, KEY, IV) == data
+    decrypted = bytearray(data)
+    backend.decrypt_ctr_into(decrypted, KEY, IV, decrypted)
+    assert decrypted == reference
+    with pytest.raises(ValueError):
+        backend.decrypt_ctr(data, KEY, IV[:8])
+
+
+def test_crypto_backend_is_abstract():
+    with pytest.raises(TypeError):
+        crypto.CryptoBackend()
+
+
+def test_get_backend(tmp_path, monkeypatch):
+    assert crypto.load_backend("unknown") is None
+    monkeypatch.setattr(crypto, "_backend", None)
+    crypto.save_benchmarked_backend("pycryptodome", {}, str(tmp_path))
+    assert crypto.get_backend(str(tmp_path)).name == "pycryptodome"
+    # The backend is chosen once for the run.
+    assert crypto.get_backend() is crypto.get_backend(str(tmp_path))
+
+    monkeypatch.setattr(crypto, "_backend", None)
+    crypto.save_benchmarked_backend("unknown", {}, str(tmp_path))
+    assert crypto.get_backend(str(tmp_path)).name == crypto.BACKENDS[0]
+
+
+def test_benchmark():
+    results = crypto.benchmark(duration=0.05)
+    assert set(results) == set(crypto.BACKENDS)
+    assert all(result["cbc"] > 0 and result["ctr"] > 0 for result in results.values())
+    assert crypto.get_fastest_backend({"a": {"cbc": 10, "ctr": 10}, "b": {"cbc": 12, "ctr": 5}}) == "a"
+
+
+if __name__ == "__main__":
+    ...
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.action import Action
+from izneo_get.config import Config, ImageFormat
+from izneo_get.daemon import JobManager, JobOutput, create_server, get_job_config
+
+
+def fake_run(job):
+    print(f"Processing {job.url}")
+    if job.url == "fail":
+        raise RuntimeError("Nothing was downloaded.")
+    return f"DOWNLOADS/{job.url}.cbz"
+
+
+@pytest.fixture
+def api():
+    manager = JobManager(Config(), run=fake_run)
+    server = create_server(manager, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    manager.start()
+    yield manager, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_get_job_config():
+    config = get_job_config(Config(), {"image_format": "webp", "pause_sec": 0})
+    assert config.image_format == ImageFormat.WEBP
+    assert config.pause_sec == 0
+    with pytest.raises(ValueError):
+        get_job_config(Config(), {"unknown": 1})
+    config = get_job_config(Config(), {"continue_from_existing": True, "read_timeout_sec": 5, "output_folder": "out"})
+    assert (config.continue_from_existing, config.read_timeout_sec, config.output_folder) == (True, 5, "out")
+    for overrides in [
+        {"pause_sec": "5"},
+        {"pause_sec": 1.5},
+        {"continue_from_existing": "false"},
+        {"books_ahead": True},
+        {"output_folder": None},
+        {"image_format": "png"},
+        {"output_format": 1},
+    ]:
+        with pytest.raises(ValueError):
+            get_job_config(Config(), overrides)
+
+
+def test_jobs(api, monkeypatch):
+    manager, url = api
+    monkeypatch.setattr(sys, "stdout", JobOutput(manager, sys.stdout))
+    status, body = request(f"{url}/jobs", {"url": "book", "action": "download", "config": {"image_format": "jpeg"}})
+    assert status == 201
+    job = json.loads(body)
+    assert job["status"] == "queued" and job["action"] == "download"
+    assert manager.get_job(job["id"]).config.image_format == ImageFormat.JPEG
+    status, body = request(f"{url}/jobs", {"url": "fail"})
+    assert status == 201
+    assert manager.get_job(json.loads(body)["id"]).action == Action.PROCESS
+
+    assert request(f"{url}/jobs", {"action": "download"})[0] == 400
+    assert request(f"{url}/jobs", {"url": "book", "action": "unknown"})[0] == 400
+    assert request(f"{url}/jobs", {"url": "book", "config": {"pause_sec": "5"}})[0] == 400
+    assert request(f"{url}/jobs/999")[0] == 404
+
+    # Events of the 2 jobs: queued, running, printed line, finished.
+    events = []
+    for _ in range(8):
+        events += manager.get_events(events[-1]["id"] if events else 0, timeout=5)
+        if len(events) == 8:
+            break
+    status, body = request(f"{url}/events?since=0&follow=false")
+    assert status == 200
+    assert [json.loads(line) for line in body.splitlines()] == events
+    assert {"type": "log", "job_id": job["id"], "message": "Processing book"}.items() <= events[2].items()
+
+    status, body = request(f"{url}/jobs/{job['id']}")
+    assert json.loads(body)["status"] == "done"
+    assert json.loads(body)["result"] == "DOWNLOADS/book.cbz"
+    status, body = request(f"{url}/jobs")
+    jobs = json.loads(body)
+    assert [job["status"] for job in jobs] == ["done", "failed"]
+    assert jobs[1]["error"] == "Nothing was downloaded."
+
+
+if __name__ == "__main__":
+    ...
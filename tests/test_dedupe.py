@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.__main__ import dedupe_books, get_book_key, get_urls_from_file, get_watched_urls, iter_unique_books
+from izneo_get.config import Config
+
+ALBUM_URL = "https://www.izneo.com/fr/manga-et-simultrad/shonen/dr-stone-7060/dr-stone-vol-3-65097"
+READER_URL = "https://reader.izneo.com/read/65097?exiturl=https://www.izneo.com/fr/bibliotheque&page=1"
+SIGNED_URL = "https://reader.izneo.com/read/65097?login=cvs&sign=abcdef"
+SERIE_URL = "https://www.izneo.com/fr/manga-et-simultrad/shonen/dr-stone-7060"
+
+
+def test_get_book_key():
+    config = Config()
+    keys = {get_book_key(url, config) for url in [ALBUM_URL, f"{ALBUM_URL}?exiturl=x", READER_URL, SIGNED_URL]}
+    assert keys == {"izneo:65097"}
+    assert get_book_key(f"{ALBUM_URL}/read/1?exiturl=x", config) == "izneo:65097"
+    # A series is a list of books, not a book.
+    assert get_book_key(SERIE_URL, config) == f"list:{SERIE_URL}"
+    assert get_book_key("https://archive.org/details/tintin0000herg", config) == "archive:tintin0000herg"
+    assert get_book_key("https://www.webtoons.com/fr/a#b", config) == "webtoons:https://www.webtoons.com/fr/a"
+
+
+def test_dedupe_books():
+    books = [
+        (READER_URL, ""),
+        ("https://reader.izneo.com/read/1234", ""),
+        (f'"{SIGNED_URL}"', ""),
+        (ALBUM_URL, "Dr Stone 3"),
+        (SERIE_URL, ""),
+        (SERIE_URL, ""),
+    ]
+    # The signed URL replaces the first URL of the book, the forced title is kept.
+    assert dedupe_books(books, Config()) == [
+        (f'"{SIGNED_URL}"', "Dr Stone 3"),
+        ("https://reader.izneo.com/read/1234", ""),
+        (SERIE_URL, ""),
+    ]
+
+
+def test_get_urls_from_file(tmp_path):
+    list_file = tmp_path / "list.txt"
+    list_file.write_text(f"{ALBUM_URL}\n# --force-title Tome 3\n{SIGNED_URL}\n{READER_URL}\n", encoding="utf-8")
+    assert get_urls_from_file(str(list_file)) == [(SIGNED_URL, "Tome 3")]
+
+
+def test_iter_unique_books():
+    books = [(ALBUM_URL, ""), (SIGNED_URL, ""), ("https://reader.izneo.com/read/1234", "")]
+    assert list(iter_unique_books(books, Config())) == [books[0], books[2]]
+
+    # A book removed from the keys seen (failed) is yielded again.
+    seen = set()
+    assert list(iter_unique_books(books, Config(), seen)) == [books[0], books[2]]
+    seen.discard("izneo:65097")
+    assert list(iter_unique_books(books, Config(), seen)) == [books[0]]
+
+
+def test_get_watched_urls():
+    # The URLs are given as when their book is done, without quotes.
+    assert get_watched_urls([f'"{SIGNED_URL}"\n', f"{READER_URL}\n"], Config()) == [(SIGNED_URL, "")]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import http2
+from izneo_get.bandwidth import TokenBucket
+
+pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+BODY = b"\xff\xd8\xff" + bytes(range(256)) * 512
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/login":
+            self.send_response(403)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.send_header("X-Cookie", self.headers.get("Cookie", ""))
+        self.send_header("X-User-Agent", self.headers.get("User-Agent", ""))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        ...
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_use_http2():
+    assert not http2.use_http2(False)
+    assert http2.use_http2(True)
+
+
+def test_http2_get(server_url):
+    session = requests.Session()
+    session.cookies.set("session_id", "1234")
+    response = http2.http2_get(f"{server_url}/page", session, {"User-Agent": "test"}, TokenBucket(10**9))
+    assert isinstance(response, requests.Response)
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.encoding is None
+    assert response.headers["x-cookie"] == "session_id=1234"
+    assert response.headers["x-user-agent"] == "test"
+
+    response = http2.http2_get(f"{server_url}/login")
+    assert response.status_code == 403
+    assert response.encoding == "utf-8"
+
+
+def test_http2_get_errors():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(requests.ConnectionError):
+        http2.http2_get(f"http://127.0.0.1:{port}/page", timeout=(1, 1))
+
+
+if __name__ == "__main__":
+    ...
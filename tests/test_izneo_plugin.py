@@ -138,6 +138,15 @@ def test_uncrypt_image():
             assert uncrypted == f.read()
 
 
+def test_decrypt_page():
+    page_key = Izneo._decode_page_key({"key": "0t3WeNQ1HrrxJKo8qNTQQg==", "iv": "YQqHDniN+GSVSga02sekIA=="})
+    assert Izneo._decode_page_key({"key": "", "iv": ""}) is None
+    with open("tests/resources/crypted_image.bin", "rb") as f:
+        uncrypted = Izneo.decrypt_page(f.read(), page_key.key, page_key.iv)
+    with open("tests/resources/uncrypted_image.jpeg", "rb") as f:
+        assert uncrypted == f.read()
+
+
 def clean_output(output_path):
     if os.path.exists(output_path):
         shutil.rmtree(output_path)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.__main__ import iter_jobs, process_book
+from izneo_get.action import Action
+from izneo_get.book_infos import BookInfos
+from izneo_get.config import Config, OutputFormat
+from izneo_get.job_queue import CONVERTING, DONE, DOWNLOADING, FAILED, PACKING, QUEUED, JobQueue
+from izneo_get.plugins import site_processor
+from izneo_get.plugins.site_processor import SiteProcessor
+
+
+class PageProcessor(SiteProcessor):
+    def __init__(self, nb_pages):
+        super().__init__("")
+        self.book_infos = BookInfos(title="title", pages=nb_pages, page_urls=[str(i) for i in range(nb_pages)])
+
+    def get_book_infos(self):
+        return self.book_infos
+
+
+def test_job_queue(tmp_path):
+    job_queue = JobQueue(str(tmp_path))
+    job = job_queue.add("url 1", Action.PROCESS, "title")
+    assert (job.url, job.forced_title, job.stage) == ("url 1", "title", QUEUED)
+    job.set_stage(DOWNLOADING)
+    job.add_page(0, "page 0")
+    job.add_page(2, "page 2")
+    job_queue.add("url 2", Action.PROCESS).set_stage(DONE)
+    job_queue.add("url 3", Action.PROCESS).set_stage(FAILED, error="Nothing was downloaded.")
+    job_queue.add("stale url", Action.PROCESS).set_stage(DOWNLOADING)
+    job_queue.close()
+
+    # Another run: the unfinished books are resumed, the books done are skipped, the failed ones are queued again.
+    job_queue = JobQueue(str(tmp_path))
+    urls = [("url 2", ""), ("url 3", ""), ("url 1", "title"), ("url 4", "")]
+    jobs = list(job_queue.iter_jobs(urls, Action.PROCESS))
+    assert [(job.url, job.stage) for job in jobs] == [("url 3", QUEUED), ("url 1", DOWNLOADING), ("url 4", QUEUED)]
+    assert jobs[0].error == ""
+    assert jobs[1].get_pages() == {0: "page 0", 2: "page 2"}
+    # The unfinished books which are not in the list are left for a run which lists them.
+    assert job_queue.get("stale url", Action.PROCESS).stage == DOWNLOADING
+    # Each action has its own progress.
+    assert job_queue.add("url 2", Action.INFOS).stage == QUEUED
+    job_queue.close()
+
+
+def test_iter_jobs(tmp_path):
+    urls = [('"url 1"', ""), ("url 2", "title")]
+    assert list(iter_jobs(urls, Action.PROCESS)) == [("url 1", "", None), ("url 2", "title", None)]
+    books = list(iter_jobs(urls, Action.PROCESS, JobQueue(str(tmp_path))))
+    assert [(url, forced_title, job.url) for url, forced_title, job in books] == [
+        ("url 1", "", "url 1"),
+        ("url 2", "title", "url 2"),
+    ]
+
+
+def test_checkpointed_pages(tmp_path, monkeypatch):
+    requested = []
+
+    async def fake_http_get(url, **kwargs):
+        requested.append(url)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b"page"
+        return response
+
+    monkeypatch.setattr(site_processor, "async_http_get", fake_http_get)
+    monkeypatch.setattr(site_processor, "get_image_type", lambda content: "jpeg")
+    job = JobQueue(str(tmp_path)).add("url", Action.DOWNLOAD)
+    (tmp_path / "title 001.jpeg").write_bytes(b"page")
+    job.add_page(0, str(tmp_path / "title 001.jpeg"))
+    processor = PageProcessor(nb_pages=3)
+    processor.job = job
+    processor.checkpointed_pages = job.get_pages()
+    pages = asyncio.run(processor._async_download_all_pages("title", str(tmp_path)))
+    assert pages == [str(tmp_path / f"title 00{i}.jpeg") for i in range(1, 4)]
+    assert sorted(requested) == ["1", "2"]
+    assert job.get_pages() == dict(enumerate(pages))
+
+
+def test_process_book_resumed(tmp_path):
+    config = Config(output_format=OutputFormat.CBZ)
+    save_path = str(tmp_path / "title")
+    os.mkdir(save_path)
+    (tmp_path / "title" / "title 001.jpeg").write_bytes(b"page")
+    job = JobQueue(str(tmp_path)).add(save_path, Action.PACK)
+    job.set_stage(CONVERTING, save_path)
+    assert process_book(save_path, config, Action.PACK, job) == f"{save_path}.cbz"
+    assert job.stage == PACKING
+    assert not os.path.exists(save_path)
+
+    # Interrupted before the folder was deleted: the CBZ is complete and kept.
+    os.mkdir(save_path)
+    (tmp_path / "title.zip").write_bytes(b"partial")
+    assert process_book(save_path, config, Action.PACK, job) == f"{save_path}.cbz"
+    assert not os.path.exists(save_path)
+    assert not os.path.exists(f"{save_path}.zip")
+    assert [name for name in os.listdir(tmp_path) if name.startswith("title")] == ["title.cbz"]
+
+    # Interrupted after the folder was deleted.
+    assert process_book(save_path, config, Action.PACK, job) == f"{save_path}.cbz"
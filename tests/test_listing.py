@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import listing
+from izneo_get.watermark import Watermark
+
+
+class FakeLibrarySession:
+    """Library of `nb_albums` albums, the most recent first."""
+
+    def __init__(self, nb_albums):
+        self.nb_albums = nb_albums
+        self.calls = 0
+
+    def mount(self, prefix, adapter):
+        ...
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        offset, limit = (int(value) for value in url.rstrip("/").split("/")[-2:])
+        albums = [
+            {"title": f"Album {i}", "url": f"/fr/bd/humour/serie-1/album-{i}"}
+            for i in range(self.nb_albums - 1 - offset, max(self.nb_albums - 1 - offset - limit, -1), -1)
+        ]
+
+        class Response:
+            text = json.dumps({"totalAlbums": self.nb_albums, "albums": albums})
+
+        return Response()
+
+
+class FakeSerieSession:
+    """Categories of a series with `nb_albums` albums each, one page taking `delay` seconds."""
+
+    def __init__(self, nb_albums, delay=0.0):
+        self.nb_albums = nb_albums
+        self.delay = delay
+        self.timeouts = set()
+
+    def get(self, url, **kwargs):
+        url_base, offset, limit = url.rsplit("/", 2)
+        category = url_base.rsplit("/", 1)[1]
+        self.timeouts.add(kwargs.get("timeout"))
+        time.sleep(self.delay)
+        albums = [
+            {"id": f"{category}-{i}", "url": f"/{category}/{i}"}
+            for i in range(int(offset), min(int(offset) + int(limit), self.nb_albums[category]))
+        ]
+
+        class Response:
+            text = json.dumps({"albums": albums})
+
+        return Response()
+
+
+def test_is_listing_source():
+    assert listing.is_listing_source("bibliotheque") == True
+    assert listing.is_listing_source("search:largo") == True
+    assert listing.is_listing_source("https://www.izneo.com/fr/bibliotheque") == True
+    assert listing.is_listing_source("https://www.izneo.com/fr/bibliotheque/detail/mes-bd-1234") == True
+    assert listing.is_listing_source("https://www.izneo.com/fr/panier-fin/1020304") == True
+    assert listing.is_listing_source("https://www.izneo.com/fr/manga-et-simultrad/shonen/naruto-567") == True
+    assert listing.is_listing_source("https://www.izneo.com/fr/bd/humour/asterix-5841/asterix-le-gaulois-4707") == False
+    assert listing.is_listing_source("https://reader.izneo.com/read/123456789") == False
+    assert listing.is_listing_source("https://archive.org/details/id") == False
+
+
+def test_expand_listing_sources(monkeypatch):
+    sessions = []
+
+    def get_session():
+        sessions.append("session")
+        return "session"
+
+    monkeypatch.setattr(
+        listing, "iter_urls_from_source", lambda source, session, full_only, watermark, timeout: iter([("A", ""), ("B", "")])
+    )
+    url_list = [("URL1", "title"), ("bibliotheque", ""), ("URL2", ""), ("search:largo", "")]
+    expanded = list(listing.expand_listing_sources(url_list, get_session))
+    assert expanded == [("URL1", "title"), ("A", ""), ("B", ""), ("URL2", ""), ("A", ""), ("B", "")]
+    assert sessions == ["session"]
+
+    assert list(listing.expand_listing_sources([("URL1", "")], get_session)) == [("URL1", "")]
+    assert sessions == ["session"]
+
+
+def test_expand_listing_sources_baskets(monkeypatch):
+    baskets = []
+
+    def iter_baskets(session, basket_ids, timeout):
+        baskets.append(list(basket_ids))
+        return iter([(f"ALBUM{basket_id}", "") for basket_id in basket_ids])
+
+    monkeypatch.setattr(listing, "iter_baskets", iter_baskets)
+    url_list = [
+        ("https://www.izneo.com/fr/panier-fin/1", ""),
+        ("https://www.izneo.com/fr/panier-fin/2", ""),
+        ("URL1", ""),
+        ("https://www.izneo.com/fr/panier-fin/3", ""),
+    ]
+    expanded = list(listing.expand_listing_sources(url_list, lambda: "session"))
+    assert expanded == [("ALBUM1", ""), ("ALBUM2", ""), ("URL1", ""), ("ALBUM3", "")]
+    assert baskets == [["1", "2"], ["3"]]
+
+
+def test_expand_listing_sources_baskets_stream(monkeypatch):
+    baskets = []
+    albums = []
+    album_received = threading.Event()
+
+    def iter_baskets(session, basket_ids, timeout):
+        baskets.append(list(basket_ids))
+        return iter([(f"ALBUM{basket_id}", "") for basket_id in basket_ids])
+
+    def read_lines():
+        # Standard input: the next line only comes once the first basket was processed.
+        yield "https://www.izneo.com/fr/panier-fin/1", ""
+        album_received.wait(timeout=5)
+        yield "https://www.izneo.com/fr/panier-fin/2", ""
+
+    monkeypatch.setattr(listing, "iter_baskets", iter_baskets)
+    monkeypatch.setattr(listing, "BASKET_BATCH_DELAY", 0.1)
+    for album in listing.expand_listing_sources(read_lines(), lambda: "session"):
+        albums.append(album)
+        album_received.set()
+    assert albums == [("ALBUM1", ""), ("ALBUM2", "")]
+    assert baskets == [["1"], ["2"]]
+
+    # Long lists of baskets are fetched by batches.
+    baskets.clear()
+    monkeypatch.setattr(listing, "BASKET_WORKERS", 2)
+    url_list = [(f"https://www.izneo.com/fr/panier-fin/{basket_id}", "") for basket_id in range(1, 6)]
+    assert len(list(listing.expand_listing_sources(url_list, lambda: "session"))) == 5
+    assert baskets == [["1", "2"], ["3", "4"], ["5"]]
+
+
+def test_iter_albums():
+    url_bases = ["serie/volumes", "serie/others", "serie/chapters"]
+    session = FakeSerieSession({"volumes": 10, "others": 1, "chapters": 10}, delay=0.05)
+    started = time.monotonic()
+    albums = [album["id"] for album in listing.iter_albums(session, url_bases, page_size=1, prefetch=1)]
+    # Each category is fetched on its own: the time of the longest one (11 pages), not of their sum (23 pages).
+    assert time.monotonic() - started < 0.05 * 16
+    assert albums == [f"volumes-{i}" for i in range(10)] + ["others-0"] + [f"chapters-{i}" for i in range(10)]
+    assert session.timeouts == {listing.DEFAULT_TIMEOUT}
+
+    session = FakeSerieSession({"volumes": 10, "others": 5, "chapters": 10})
+    known = {"volumes-4", "others-0", "chapters-7"}
+    is_known = lambda album: album["id"] in known
+    albums = [album["id"] for album in listing.iter_albums(session, url_bases, 3, is_known=is_known, timeout=(1, 2))]
+    # Each category stops after its first page with a known album.
+    assert albums == (
+        [f"volumes-{i}" for i in [0, 1, 2, 3, 5]]
+        + ["others-1", "others-2"]
+        + [f"chapters-{i}" for i in [0, 1, 2, 3, 4, 5, 6, 8]]
+    )
+    assert session.timeouts == {(1, 2)}
+
+
+def test_iter_library_sync():
+    output_path = "tests/output_sync"
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+
+    session = FakeLibrarySession(100)
+    watermark = Watermark(output_path)
+    urls = list(listing.iter_library(session, watermark=watermark))
+    assert len(urls) == 100
+    assert session.calls == 4
+    for url, _ in urls:
+        watermark.complete(url)
+
+    # Three new albums: only the first page is read.
+    session = FakeLibrarySession(103)
+    watermark = Watermark(output_path)
+    urls = list(listing.iter_library(session, watermark=watermark))
+    assert urls == [(f"{listing.ROOT_PATH}/fr/bd/humour/serie-1/album-{i}", "") for i in (102, 101, 100)]
+    assert session.calls == 1
+    for url, _ in urls:
+        watermark.complete(url)
+
+    session = FakeLibrarySession(103)
+    assert list(listing.iter_library(session, watermark=Watermark(output_path))) == []
+    assert len(list(listing.iter_library(session))) == 103
+    shutil.rmtree(output_path)
+
+
+
+def test_iter_library_sync_failed_album():
+    output_path = "tests/output_sync_failed"
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+
+    watermark = Watermark(output_path)
+    urls = list(listing.iter_library(FakeLibrarySession(100), watermark=watermark))
+    failed_url = f"{listing.ROOT_PATH}/fr/bd/humour/serie-1/album-50"
+    for url, _ in urls:
+        if url != failed_url:
+            watermark.complete(url)
+
+    # The failed album is listed again, though its page is not read any more.
+    session = FakeLibrarySession(101)
+    watermark = Watermark(output_path)
+    urls = list(listing.iter_library(session, watermark=watermark))
+    assert urls == [(f"{listing.ROOT_PATH}/fr/bd/humour/serie-1/album-100", ""), (failed_url, "")]
+    assert session.calls == 1
+
+    # Interrupted before the books were done: they are still listed.
+    assert list(listing.iter_library(session, watermark=Watermark(output_path))) == urls
+    assert watermark.complete(failed_url)
+    assert list(listing.iter_library(session, watermark=Watermark(output_path))) == urls[:1]
+    shutil.rmtree(output_path)
+
+
+if __name__ == "__main__":
+    ...
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.retry_queue import RetryQueue
+
+
+def test_schedule():
+    retry_queue = RetryQueue(max_attempts=2, budget=5)
+    assert retry_queue.schedule(["a", "", "c", ""]) == [1, 3]
+    assert retry_queue.schedule(["a", "", "c", "d"]) == [1]
+    # Too many attempts for page 1.
+    assert retry_queue.schedule(["a", "", "c", "d"]) == []
+    # Budget of the book.
+    assert retry_queue.schedule(["", "", "", "", "", ""]) == [0, 2]
+    assert retry_queue.budget == 0
+
+
+def test_get_delay():
+    retry_queue = RetryQueue(base_delay=1, max_delay=3)
+    retry_queue.schedule([""])
+    assert 0.5 <= retry_queue.get_delay(0) <= 1
+    retry_queue.schedule([""])
+    assert 1 <= retry_queue.get_delay(0) <= 2
+    retry_queue.schedule([""])
+    assert 1.5 <= retry_queue.get_delay(0) <= 3
+
+
+if __name__ == "__main__":
+    ...
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import session_pool
+from izneo_get.config import Config
+from izneo_get.plugins.izneo import Izneo
+from izneo_get.session_pool import SessionPool
+
+URL = "https://www.izneo.com/fr/manga-et-simultrad/shonen/dr-stone-7060/dr-stone-vol-3-65097"
+
+
+def test_session_pool():
+    pool = SessionPool(ttl=0.2)
+    created = []
+
+    def create():
+        time.sleep(0.05)
+        created.append(requests.Session())
+        return created[-1]
+
+    threads = [threading.Thread(target=pool.get, args=("izneo", "a", create)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The processors waiting for the authentication get the same session.
+    assert len(created) == 1
+    assert pool.get("izneo", "a", create) is created[0]
+    assert pool.get("izneo", "b", create) is created[1]
+    assert pool.get("archive", "a", create) is created[2]
+
+    other_session = requests.Session()
+    pool.put("izneo", "a", other_session)
+    assert pool.get("izneo", "a", create) is other_session
+    pool.invalidate("izneo", "a")
+    assert pool.get("izneo", "a", create) is created[3]
+
+    # The authentication is done again once expired.
+    time.sleep(0.3)
+    assert pool.get("izneo", "a", create) is created[4]
+
+
+def test_izneo_authenticate_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_pool, "_session_pool", SessionPool())
+    (tmp_path / "izneo.cache").write_text("session_id", encoding="utf-8")
+    config = Config(cache_folder=str(tmp_path), authentication_from_cache=True)
+    processors = [Izneo(URL, config), Izneo(URL, config)]
+    read_cache = []
+    for processor in processors:
+        monkeypatch.setattr(processor, "_read_cache", lambda: read_cache.append(1) or "session_id")
+        processor.authenticate()
+    assert processors[0].session is processors[1].session
+    assert processors[0].session.cookies.get("c03aab1711dbd2a02ea11200dde3e3d1") == "session_id"
+    assert len(read_cache) == 1
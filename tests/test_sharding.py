@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from functools import partial
+
+from izneo_get.__main__ import get_book_key, is_selected
+from izneo_get.action import Action
+from izneo_get.config import Config
+from izneo_get.job_queue import DONE, JobQueue
+from izneo_get.sharding import LeaseQueue, get_shard, parse_shard
+
+
+def test_parse_shard():
+    assert parse_shard("1/3") == (1, 3)
+    assert parse_shard("3/3") == (3, 3)
+    for value in ["0/3", "4/3", "1", "a/b", "1/2/3"]:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_get_shard():
+    keys = [str(book_id) for book_id in range(1000)]
+    shards = [get_shard(key, 3) for key in keys]
+    assert shards == [get_shard(key, 3) for key in keys]
+    assert all(shards.count(shard) > 250 for shard in [1, 2, 3])
+
+
+def test_get_book_key():
+    config = Config()
+    url = "https://www.izneo.com/fr/manga-et-simultrad/shonen/dr-stone-7060/dr-stone-vol-3-65097"
+    assert get_book_key(url, config) == "izneo:65097"
+    assert get_book_key("https://reader.izneo.com/read/65097?exiturl=https://www.izneo.com", config) == "izneo:65097"
+    assert get_book_key("https://archive.org/details/tintin0000herg?view=theater", config) == "archive:tintin0000herg"
+    assert get_book_key("DOWNLOADS/title", config) == "DOWNLOADS/title"
+
+
+def test_is_selected(tmp_path):
+    urls = [f"https://reader.izneo.com/read/{book_id}" for book_id in range(30)]
+    selected = [[url for url in urls if is_selected(url, Config(), shard=(shard, 3))] for shard in [1, 2, 3]]
+    assert sorted(sum(selected, [])) == sorted(urls)
+
+    leases = LeaseQueue(str(tmp_path), node="node 1")
+    other_leases = LeaseQueue(str(tmp_path), node="node 2")
+    assert is_selected(urls[0], Config(), leases=leases)
+    assert not is_selected(urls[0], Config(), leases=other_leases)
+
+
+def test_is_selected_with_job_queue(tmp_path):
+    urls = [f"https://reader.izneo.com/read/{book_id}" for book_id in range(3)]
+    job_queue = JobQueue(str(tmp_path / "cache"))
+    job_queue.add(urls[0], Action.PROCESS).set_stage(DONE)
+    leases = LeaseQueue(str(tmp_path / "leases"), node="node 1")
+    selected = partial(is_selected, config=Config(), leases=leases)
+    jobs = list(job_queue.iter_jobs([(url, "") for url in urls], Action.PROCESS, selected))
+    assert [job.url for job in jobs] == urls[1:]
+    # The book done in the job queue is not claimed: another node can process it.
+    other_leases = LeaseQueue(str(tmp_path / "leases"), node="node 2")
+    assert other_leases.claim(get_book_key(urls[0], Config()))
+    assert not other_leases.claim(get_book_key(urls[1], Config()))
+    # The books of other nodes are not queued.
+    assert list(job_queue.iter_jobs([("other url", "")], Action.PROCESS, lambda url: False)) == []
+    assert job_queue.get("other url", Action.PROCESS) is None
+    leases.close()
+    other_leases.close()
+    job_queue.close()
+
+
+def test_lease_queue(tmp_path):
+    node_1 = LeaseQueue(str(tmp_path), node="node 1", ttl=0.3)
+    node_2 = LeaseQueue(str(tmp_path), node="node 2", ttl=0.3)
+    assert node_1.claim("1")
+    assert node_1.claim("2")
+    assert not node_2.claim("1")
+    node_1.release("1", done=True)
+    # Done books are not claimed again, released ones can be.
+    assert not node_2.claim("1")
+    node_1.release("2", done=False)
+    assert node_2.claim("2")
+
+    # The leases are renewed while the node is running.
+    assert node_1.claim("3")
+    time.sleep(0.5)
+    assert not node_2.claim("3")
+    node_1.close()
+    node_2.close()
+
+    # The lease of a stopped node is taken over once expired.
+    node_3 = LeaseQueue(str(tmp_path), node="node 3", ttl=0.3)
+    time.sleep(0.4)
+    assert node_3.claim("3")
+    node_1.renew()
+    assert "3" not in node_1._leases.values()
+    node_1.release("3", done=True)
+    assert not os.path.exists(node_3._get_paths("3")[1])
+    node_3.close()
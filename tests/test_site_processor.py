@@ -1,11 +1,60 @@
 # -*- coding: utf-8 -*-
+import asyncio
 import os
 import sys
+import time
+
+import pytest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from izneo_get.plugins.site_processor import SiteProcessor
 from izneo_get.book_infos import BookInfos
+from izneo_get import retry_queue
+from izneo_get.circuit_breaker import CircuitBreaker, CircuitOpen
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(retry_queue, "BASE_DELAY", 0.001)
+
+
+class RefusingProcessor(SiteProcessor):
+    """The server refuses every page from `first_refused` until the session is renewed.
+
+    Pages of `flaky_pages` fail the given number of times before being available.
+    """
+
+    def __init__(self, nb_pages, first_refused, can_reauthenticate, flaky_pages=None):
+        super().__init__("")
+        self.book_infos = BookInfos(title="title", pages=nb_pages, page_urls=[str(i) for i in range(nb_pages)])
+        self.first_refused = first_refused
+        self.can_reauthenticate = can_reauthenticate
+        self.flaky_pages = dict(flaky_pages or {})
+        self.requests = []
+        self.circuit_breaker = CircuitBreaker(threshold=3)
+
+    def get_book_infos(self):
+        return self.book_infos
+
+    def reauthenticate(self):
+        if self.can_reauthenticate:
+            self.first_refused = len(self.book_infos.page_urls)
+        return self.can_reauthenticate
+
+    async def _async_download_page(self, page_num, url, title_used, save_path, pause_sec=0):
+        if self.circuit_breaker.is_open:
+            raise CircuitOpen()
+        await asyncio.sleep(0.001 * page_num)
+        self.requests.append(page_num)
+        if page_num >= self.first_refused:
+            self._record_page_refused()
+            return ""
+        if self.flaky_pages.get(page_num):
+            self.flaky_pages[page_num] -= 1
+            return ""
+        self.circuit_breaker.record_success()
+        return f"page {page_num}"
 
 
 def test_get_default_title():
@@ -20,5 +69,55 @@ def test_get_default_title():
     assert processor.get_default_title(book_infos) == "title - 1234. subtitle"
 
 
+def test_async_download_all_pages_circuit_breaker():
+    processor = RefusingProcessor(nb_pages=50, first_refused=10, can_reauthenticate=False)
+    pages = asyncio.run(processor._async_download_all_pages("title", "path"))
+    assert pages == [f"page {i}" for i in range(10)] + [""] * 40
+    assert len(processor.requests) < 50
+
+    # The pages refused before the circuit opened are retried with the new session.
+    processor = RefusingProcessor(nb_pages=50, first_refused=10, can_reauthenticate=True)
+    pages = asyncio.run(processor._async_download_all_pages("title", "path"))
+    assert pages == [f"page {i}" for i in range(50)]
+
+
+def test_download_all_pages_circuit_breaker():
+    processor = RefusingProcessor(nb_pages=20, first_refused=10, can_reauthenticate=False)
+    pages = processor._download_all_pages("title", "path")
+    assert pages == [f"page {i}" for i in range(10)] + [""] * 10
+    assert processor.requests == list(range(13))
+
+    processor = RefusingProcessor(nb_pages=20, first_refused=10, can_reauthenticate=True)
+    pages = processor._download_all_pages("title", "path")
+    assert pages == [f"page {i}" for i in range(20)]
+
+
+def test_retry_failed_pages():
+    processor = RefusingProcessor(nb_pages=20, first_refused=20, can_reauthenticate=False, flaky_pages={3: 1, 7: 3})
+    pages = asyncio.run(processor._async_download_all_pages("title", "path"))
+    assert pages == [f"page {i}" for i in range(20)]
+
+    processor = RefusingProcessor(nb_pages=20, first_refused=20, can_reauthenticate=False, flaky_pages={3: 1, 7: 4})
+    pages = processor._download_all_pages("title", "path")
+    assert pages == [f"page {i}" if i != 7 else "" for i in range(20)]
+    assert processor.requests.count(7) == 4
+
+
+def test_book_deadline():
+    processor = RefusingProcessor(nb_pages=200, first_refused=200, can_reauthenticate=False)
+    processor.deadline = time.monotonic() + 0.05
+    pages = asyncio.run(processor._async_download_all_pages("title", "path"))
+    assert pages[0] == "page 0"
+    assert pages[-1] == ""
+    assert time.monotonic() < processor.deadline + 0.1
+
+    processor = RefusingProcessor(nb_pages=200, first_refused=200, can_reauthenticate=False)
+    processor.deadline = time.monotonic() + 0.05
+    pages = processor._download_all_pages("title", "path")
+    assert pages[0] == "page 0"
+    assert pages[-1] == ""
+    assert len(pages) == 200
+
+
 if __name__ == "__main__":
     ...
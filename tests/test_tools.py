@@ -56,6 +56,14 @@ def test_requests_retry_session():
     assert response.status_code == 200
 
 
+def test_requests_retry_session_keeps_adapter():
+    session = tools.requests_retry_session()
+    adapter = session.get_adapter("https://www.izneo.com")
+    # The connections of the adapter are kept when the settings don't change.
+    assert tools.requests_retry_session(session=session).get_adapter("https://www.izneo.com") is adapter
+    assert tools.requests_retry_session(session=session, retries=1).get_adapter("https://www.izneo.com") is not adapter
+
+
 def test_http_get():
     response = tools.http_get("https://httpstat.us/200")
     assert response.status_code == 200
@@ -88,6 +96,7 @@ def test_get_image_type():
         assert tools.get_image_type(f.read()) == "jpeg"
     with open("tests/resources/image.webp", "rb") as f:
         assert tools.get_image_type(f.read()) == "webp"
+    assert tools.get_image_type("tests/resources/image.jpeg") == "jpeg"
 
 
 def test_get_name_from_pattern():
@@ -219,5 +228,19 @@ def test_convert_images_in_folder():
     clean_output(output_path)
 
 
+def test_iterate_in_background():
+    assert list(tools.iterate_in_background(range(5))) == [0, 1, 2, 3, 4]
+    assert list(tools.iterate_in_background([])) == []
+
+    def failing():
+        yield 1
+        raise ValueError("dummy")
+
+    iterator = tools.iterate_in_background(failing())
+    assert next(iterator) == 1
+    with pytest.raises(ValueError):
+        next(iterator)
+
+
 if __name__ == "__main__":
     ...
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import os
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get import watch
+from izneo_get.__main__ import iter_urls_from_lines
+from izneo_get.watch import FolderWatcher
+
+
+@pytest.fixture(params=["watchdog", "scan"])
+def fast_watch(request, monkeypatch):
+    if request.param == "watchdog":
+        pytest.importorskip("watchdog")
+    else:
+        monkeypatch.setattr(watch, "Observer", None)
+    monkeypatch.setattr(watch, "SETTLE_DELAY", 0.1)
+    monkeypatch.setattr(watch, "SCAN_INTERVAL", 0.1)
+
+
+def get_urls(urls, nb_urls, timeout=5):
+    result = []
+    deadline = time.monotonic() + timeout
+    while len(result) < nb_urls and time.monotonic() < deadline:
+        try:
+            result.append(urls.get(timeout=0.1))
+        except queue.Empty:
+            pass
+    return result
+
+
+def test_folder_watcher(tmp_path, fast_watch):
+    folder = tmp_path / "drop"
+    folder.mkdir()
+    (folder / "list 1.txt").write_text("# --force-title Title\nurl 1\nurl 2\n", encoding="utf-8")
+    watcher = FolderWatcher(str(folder), iter_urls_from_lines, str(tmp_path / "cache"))
+    urls: queue.Queue = queue.Queue()
+    threading.Thread(target=lambda: [urls.put(url) for url in watcher], daemon=True).start()
+    try:
+        assert get_urls(urls, 2) == [("url 1", "Title"), ("url 2", "")]
+        assert os.listdir(folder / "done") == ["list 1.txt"]
+        # Books done (see main).
+        assert watcher.watermark.complete("url 1")
+        assert watcher.watermark.complete("url 2")
+
+        # Files being copied are ignored, URLs already done are not queued again.
+        (folder / "list 2.txt.part").write_text("url 3\n", encoding="utf-8")
+        (folder / "list 1.txt").write_text("url 2\nurl 3\n", encoding="utf-8")
+        assert get_urls(urls, 1) == [("url 3", "")]
+        time.sleep(0.3)
+        assert urls.empty()
+        assert sorted(os.listdir(folder / "done")) == ["list 1 (1).txt", "list 1.txt"]
+        assert sorted(os.listdir(folder)) == ["done", "list 2.txt.part"]
+    finally:
+        watcher.stop()
+
+    # The URLs done are kept for the next runs, the others (failed or interrupted) are queued again.
+    (folder / "list 3.txt").write_text("url 1\nurl 3\nurl 4\n", encoding="utf-8")
+    watcher = FolderWatcher(str(folder), iter_urls_from_lines, str(tmp_path / "cache"))
+    assert watcher.ingest(str(folder / "list 3.txt")) == [("url 3", ""), ("url 4", "")]
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from izneo_get.watermark import Watermark
+
+
+def clean_output(output_path):
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+
+
+def test_watermark():
+    output_path = "tests/output_watermark"
+    clean_output(output_path)
+    watermark = Watermark(output_path)
+    assert watermark.has_source("library") == False
+    assert watermark.is_known("library", "1234") == False
+    watermark.add("library", ["1234", "5678"])
+    assert watermark.is_known("library", "1234") == True
+    assert watermark.is_known("serie-42", "1234") == False
+    watermark.save()
+    assert os.path.exists(f"{output_path}/{Watermark.file_name}")
+
+    watermark = Watermark(output_path)
+    assert watermark.has_source("library") == True
+    assert watermark.is_known("library", "5678") == True
+    assert watermark.is_known("library", "0000") == False
+
+    # Pending albums are known once done, and kept by the next runs until then.
+    watermark.add_pending("library", "0000", "url")
+    watermark.save()
+    watermark = Watermark(output_path)
+    assert watermark.get_pending("library") == ["url"]
+    assert watermark.is_known("library", "0000") == False
+    assert watermark.complete("url") == True
+    assert watermark.complete("url") == False
+    assert Watermark(output_path).is_known("library", "0000") == True
+    assert Watermark(output_path).get_pending("library") == []
+    clean_output(output_path)
+
+
+if __name__ == "__main__":
+    ...